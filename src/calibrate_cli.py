@@ -1,11 +1,17 @@
 
 import os
 import cv2
+import io
 import time
 import argparse
+import contextlib
 import requests
 import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from processing.bundle import refine_calibration
 from processing.calibrate import CameraCalibrator
+from processing.detection_cache import SolveCache
 from utils.config import config
 
 
@@ -98,15 +104,119 @@ def capture_calibration_images(cam_indices, output_dir="calibration_images", num
     print("Capture finished.")
     return True
 
-def run_calibration(cam_indices, image_dir="calibration_images", output_file="calibration.npz"):
-    
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+def find_calibration_video(cam_dir):
+    """First board video (by name) in a camera's calibration directory, or None."""
+    videos = sorted(f for f in os.listdir(cam_dir) if f.lower().endswith(VIDEO_EXTENSIONS))
+    return os.path.join(cam_dir, videos[0]) if videos else None
+
+def calibrate_camera(cam_id, images, board, detect_workers=1, options=None, video=None):
+    """
+    Intrinsics and board pose of one camera, run in a pool worker.
+
+    Args:
+        board: (rows, columns, square_length, marker_length).
+        detect_workers: Processes for this camera's marker detection.
+        options: Extra CameraCalibrator keyword arguments (pyramid_scale, report_speedup, cache_dir).
+        video: Optional dict with "path", "max_frames", "scan_fps" and "pose_frame" to
+               calibrate from a board video instead of images.
+
+    Returns:
+        (cam_id, results, log, views): the calibration.npz entries found for this camera,
+        everything it printed (so logs can be shown in camera order) and its board views
+        per image name for bundle adjustment. With a detection cache, the results of the
+        last run are reused when the camera's input files and the settings are unchanged.
+    """
+    log = io.StringIO()
+    results = {}
+    views = {}
+    with contextlib.redirect_stdout(log):
+        try:
+            calibrator = CameraCalibrator(*board, workers=detect_workers, **(options or {}))
+            cam_dir = os.path.dirname(video["path"] if video else images[0])
+            img_path = os.path.join(cam_dir, "img_0000.jpg")
+
+            # Cameras whose inputs and settings did not change reuse their last solve
+            solve_cache = None
+            if calibrator.cache is not None:
+                settings = {key: value for key, value in (video or {}).items() if key != "path"}
+                solve_cache = SolveCache(calibrator.cache.directory, dict(calibrator.detection_config, **settings))
+                inputs = images
+                if video:
+                    inputs = [video["path"]] + ([img_path] if os.path.exists(img_path) else [])
+                solve_key = solve_cache.key(inputs)
+                cached = solve_cache.load(solve_key)
+                if cached is not None:
+                    print(f"Reusing the last calibration of {cam_id}: its inputs and settings did not change.")
+                    solved, views = cached
+                    results = {f"{name}_{cam_id}": value for name, value in solved.items()}
+                    return cam_id, results, log.getvalue(), views
+
+            if video:
+                print(f"Calibrating Intrinsics for {cam_id} from {os.path.basename(video['path'])}...")
+                res = calibrator.calibrate_video(video["path"], video["max_frames"], video["scan_fps"], video["pose_frame"])
+            else:
+                print(f"Calibrating Intrinsics for {cam_id} ({len(images)} images)...")
+                res = calibrator.calibrate_intrinsics(images)
+            if res:
+                mtx, dist, ret = res
+                results[f"mtx_{cam_id}"] = mtx
+                results[f"dist_{cam_id}"] = dist
+                results[f"ret_{cam_id}"] = ret
+            else:
+                print(f"  > Failed to calibrate {cam_id}")
+
+            # Extrinsics reuse the detections made for the intrinsics
+            if res and os.path.exists(img_path):
+                pose_source = "img_0000.jpg"
+                rvec, tvec = calibrator.estimate_pose(img_path, mtx, dist)
+            elif res and video:
+                pose_source = f"frame {video['pose_frame']} of the video"
+                rvec, tvec = calibrator.estimate_video_pose(video["pose_frame"], mtx, dist)
+            else:
+                rvec = None
+            if res and rvec is not None:
+                results[f"rvec_{cam_id}"] = rvec
+                results[f"tvec_{cam_id}"] = tvec
+                print(f"  > {cam_id} Pose Found.")
+                if not video:
+                    views = calibrator.board_views(images, mtx, dist)
+            elif res and (video or os.path.exists(img_path)):
+                print(f"  > {cam_id} Pose Failed for {cam_id}. Ensure board is visible in {pose_source}")
+            if solve_cache is not None and results:
+                solve_cache.save(solve_key, {name.split("_", 1)[0]: value for name, value in results.items()}, views)
+        except Exception:
+            print(f"  > {cam_id} calibration crashed:")
+            traceback.print_exc(file=log)
+            results = {}
+            views = {}
+    return cam_id, results, log.getvalue(), views
+
+def run_calibration(cam_indices, image_dir="calibration_images", output_file="calibration.npz", from_video=False):
+    """
+    Calibrates every camera subdirectory of image_dir and saves calibration.npz.
+
+    from_video: Use the board video in each subdirectory (see find_calibration_video)
+                instead of its img_*.jpg snapshots.
+    """
     calib_config = config.get("Calibration", {})
     rows = calib_config.get("rows", 7)
     cols = calib_config.get("columns", 5)
     sq_len = calib_config.get("square_length", 0.04)
     mk_len = calib_config.get("marker_length", 0.02)
-    
-    calibrator = CameraCalibrator(rows, cols, sq_len, mk_len)
+    workers = calib_config.get("workers", 0) or os.cpu_count() or 1
+    board = (rows, cols, sq_len, mk_len)
+    options = {
+        "pyramid_scale": calib_config.get("pyramid_scale", 1.0),
+        "report_speedup": calib_config.get("report_speedup", False),
+        "cache_dir": calib_config.get("detection_cache", ".calibration_cache") or None,
+    }
+    video_settings = {
+        "max_frames": calib_config.get("video_max_frames", 40),
+        "scan_fps": calib_config.get("video_scan_fps", 10.0),
+        "pose_frame": calib_config.get("video_pose_frame", 0),
+    }
     
     results = {}
     
@@ -120,40 +230,65 @@ def run_calibration(cam_indices, image_dir="calibration_images", output_file="ca
         print("Error: No camera subdirectories found in calibration_images.")
         return False
 
-    # 1. Intrinsic Calibration
-    for cam_dir in subdirs:
-        dirname = os.path.basename(cam_dir)
-        cam_id = dirname 
-        
-        images = [os.path.join(cam_dir, f) for f in os.listdir(cam_dir) if f.startswith("img_") and f.endswith(".jpg")]
-        if not images:
+    jobs = []
+    for cam_dir in sorted(subdirs):
+        if from_video:
+            video_path = find_calibration_video(cam_dir)
+            if video_path:
+                jobs.append((os.path.basename(cam_dir), [], dict(video_settings, path=video_path)))
             continue
-            
-        print(f"Calibrating Intrinsics for {cam_id} ({len(images)} images)...")
-        res = calibrator.calibrate_intrinsics(images)
-        if res:
-            mtx, dist, ret = res
-            results[f"mtx_{cam_id}"] = mtx
-            results[f"dist_{cam_id}"] = dist
-            results[f"ret_{cam_id}"] = ret
-        else:
-            print(f"  > Failed to calibrate {cam_id}")
+        images = sorted(
+            os.path.join(cam_dir, f) for f in os.listdir(cam_dir) if f.startswith("img_") and f.endswith(".jpg")
+        )
+        if images:
+            jobs.append((os.path.basename(cam_dir), images, None))
+    if not jobs:
+        print("Error: No calibration " + ("videos" if from_video else "img_*.jpg images") + " found.")
+        return False
 
-    # 2. Extrinsic Calibration
-    print("Calibrating Extrinsics (using img_0000.jpg)...")
-    for cam_dir in subdirs:
-        cam_id = os.path.basename(cam_dir)
-        img_path = os.path.join(cam_dir, "img_0000.jpg")
-        
-        if os.path.exists(img_path) and f"mtx_{cam_id}" in results:
-            rvec, tvec = calibrator.estimate_pose(img_path, results[f"mtx_{cam_id}"], results[f"dist_{cam_id}"])
-            if rvec is not None:
-                results[f"rvec_{cam_id}"] = rvec
-                results[f"tvec_{cam_id}"] = tvec
-                print(f"  > {cam_id} Pose Found.")
+    # Cameras run concurrently; spare processes go to marker detection within each camera
+    camera_workers = min(workers, len(jobs))
+    detect_workers = max(1, workers // camera_workers)
+    print(f"Calibrating {len(jobs)} camera(s) on {camera_workers} worker(s)...")
+    if camera_workers <= 1:
+        outcomes = [
+            calibrate_camera(cam_id, images, board, detect_workers, options, video) for cam_id, images, video in jobs
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=camera_workers) as pool:
+            futures = [
+                pool.submit(calibrate_camera, cam_id, images, board, detect_workers, options, video)
+                for cam_id, images, video in jobs
+            ]
+            outcomes = []
+            for (cam_id, _, _), future in zip(jobs, futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append((cam_id, {}, f"  > {cam_id} calibration worker failed: {e}\n", {}))
+
+    views = {}
+    for cam_id, cam_results, log, cam_views in outcomes:
+        print(log, end="")
+        results.update(cam_results)
+        if cam_views:
+            views[cam_id] = cam_views
+
+    # Joint refinement over every synchronized set (img_NNNN seen by several cameras)
+    if calib_config.get("bundle_adjust", True) and len(views) >= 2:
+        print("Refining extrinsics with bundle adjustment over all calibration sets...")
+        refined = refine_calibration(
+            results, views, cols, sq_len,
+            refine_intrinsics=calib_config.get("bundle_intrinsics", False),
+        )
+        if refined:
+            refined_results, rms_before, rms_after = refined
+            if rms_after < rms_before:
+                results = refined_results
+                results["bundle_rms"] = rms_after
             else:
-                print(f"  > {cam_id} Pose Failed for {cam_id}. Ensure board is visible in img_0000.jpg")
-    
+                print("  > Bundle adjustment did not lower the error; keeping single-image poses.")
+
     complete_ids = calibration_complete_ids(results)
     if len(complete_ids) < 2:
         print("Calibration failed: fewer than two cameras produced complete intrinsics and extrinsics.")
@@ -176,6 +311,8 @@ if __name__ == "__main__":
     parser.add_argument("--capture", action="store_true", help="Run capture sequence first")
     parser.add_argument("--process", action="store_true", help="Run calibration processing")
     parser.add_argument("--no-ssl", action="store_true", help="Don't use SSL for server triggers")
+    parser.add_argument("--video", action="store_true",
+                        help="With --process: calibrate from a board video in each calibration_images/<camera> folder")
     parser.add_argument("--indices", type=str, help="Comma separated camera indices (e.g. 0,1)")
     args = parser.parse_args()
     
@@ -193,7 +330,7 @@ if __name__ == "__main__":
             success = False
             
     if success and args.process:
-        if not run_calibration(cams, output_file=save_path):
+        if not run_calibration(cams, output_file=save_path, from_video=args.video):
             success = False
             
     if not args.capture and not args.process:
@@ -7,64 +7,156 @@ import time
 import os
 from scipy.signal import find_peaks
 
+from capture.preroll import PreRollBuffer
+from capture.wav import AudioFileWriter, AudioRing
+
 class AudioRecorder:
-    def __init__(self, filename="recording.wav", device=None, samplerate=44100, channels=1):
+    def __init__(self, filename="recording.wav", device=None, samplerate=44100, channels=1, preroll_seconds=0.0,
+                 buffer_seconds=5.0):
         self.filename = filename
         self.device = device
         self.samplerate = samplerate
         self.channels = channels
-        self.recording = []
+        # The callback copies blocks into a fixed ring; a writer thread streams them to the WAV file.
+        # The callback takes no locks: it only reads active_ring, which start()/close() swap in one assignment.
+        self.buffer_seconds = buffer_seconds
+        self.ring = None
+        self.active_ring = None
+        self.writer = None
         self.is_recording = False
         self.stream = None
         self.start_time = 0
+        # While monitoring, the last preroll_seconds of blocks are kept and become the start of the take
+        self.preroll = PreRollBuffer(preroll_seconds) if preroll_seconds > 0 else None
+        # Callback health: blocks handled, input overflows (samples lost) and other status flags
+        self.blocks = 0
+        self.head_samples = 0  # Pre-roll samples at the start of the current recording
+        self.overflows = 0
+        self.status_events = 0
 
     @staticmethod
     def list_devices():
         print(sd.query_devices())
         return sd.query_devices()
 
-    def callback(self, indata, frames, time, status):
+    def callback(self, indata, frames, time_info, status):
         if status:
             print(status)
-        self.recording.append(indata.copy())
+            self.status_events += 1
+            if getattr(status, "input_overflow", False):
+                self.overflows += 1
+        ring = self.active_ring
+        if ring is not None:
+            ring.write(indata)
+        elif self.preroll is not None:
+            # Wall-clock time of the block's first sample
+            block_start = time.time() - frames / self.samplerate
+            self.preroll.add(block_start, indata.copy(), indata.nbytes)
+        # Counted last: start() waits for it to know a block in flight has been handled
+        self.blocks += 1
+
+    def stats(self):
+        """Seconds recorded so far and callback status counts."""
+        return {
+            "recording": self.is_recording,
+            "seconds": (self.head_samples + (self.ring.written if self.ring else 0)) / self.samplerate,
+            "blocks": self.blocks,
+            "overflows": self.overflows,
+            "status_events": self.status_events,
+            "dropped_frames": self.ring.dropped if self.ring else 0,
+        }
+
+    def open_stream(self):
+        self.stream = sd.InputStream(
+            samplerate=self.samplerate,
+            device=self.device,
+            channels=self.channels,
+            dtype="int16",
+            callback=self.callback
+        )
+        self.stream.start()
+
+    def monitor(self):
+        """Opens the input without recording so the pre-roll buffer fills before start()."""
+        if self.stream is not None or self.preroll is None:
+            return
+        try:
+            self.open_stream()
+            print(f"[Audio] Monitoring device {self.device} ({self.preroll.seconds:.1f}s pre-roll)")
+        except Exception as e:
+            print(f"[Audio] Error starting stream: {e}")
+            self.stream = None
 
     def start(self):
         if self.is_recording:
             return
-        
-        self.recording = []
+
+        # Ring, file and writer thread are set up before the callback can see them
+        self.ring = AudioRing(int(self.buffer_seconds * self.samplerate), self.channels)
+        self.head_samples = 0
+        self.overflows = self.status_events = 0
         self.is_recording = True
+
+        if self.stream is not None:
+            # Already monitoring: switch the callback to the ring, then take the pre-roll. Once a block
+            # has been handled after the switch, the callback no longer touches the pre-roll buffer,
+            # so the block that was in flight is in one of the two and none is lost.
+            handled = self.blocks
+            self.active_ring = self.ring
+            deadline = time.monotonic() + 0.2
+            while self.blocks == handled and time.monotonic() < deadline:
+                time.sleep(0.002)
+            blocks = self.preroll.drain() if self.preroll is not None else []
+            self.start_time = blocks[0][0] if blocks else time.time()
+            self.open_file([block for _, block in blocks])
+            print(f"[Audio] Started recording on device {self.device} "
+                  f"with {time.time() - self.start_time:.1f}s pre-roll...")
+            return
+
         self.start_time = time.time()
-        
+        self.open_file()
+        self.active_ring = self.ring
         try:
-            self.stream = sd.InputStream(
-                samplerate=self.samplerate,
-                device=self.device,
-                channels=self.channels,
-                callback=self.callback
-            )
-            self.stream.start()
+            self.open_stream()
             print(f"[Audio] Started recording on device {self.device}...")
         except Exception as e:
             print(f"[Audio] Error starting stream: {e}")
-            self.is_recording = False
+            self.stream = None
+            self.close()
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
 
-    def stop(self):
-        if not self.is_recording:
-            return
+    def open_file(self, head=()):
+        """Starts the thread streaming self.ring to self.filename, beginning with the head blocks."""
+        self.writer = AudioFileWriter(self.ring, self.filename, self.samplerate, self.channels, head=head).start()
+        self.head_samples = sum(len(block) for block in head)
 
+    def close(self):
+        """Closes the input stream (monitoring or recording) and finishes the file written so far."""
         self.is_recording = False
         if self.stream:
             self.stream.stop()
             self.stream.close()
-        
-        # Concatenate and Save
-        if self.recording:
-            audio_data = np.concatenate(self.recording, axis=0)
-            wavfile.write(self.filename, self.samplerate, (audio_data * 32767).astype(np.int16))
-            print(f"[Audio] Saved to {self.filename}")
-            return self.analyze_clap(audio_data)
-        return None
+            self.stream = None
+        self.active_ring = None
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
+
+    def stop(self):
+        """
+        Stops recording. The file is already on disk apart from the last few blocks, so this returns
+        almost immediately; the clap is found afterwards with find_sync_spike(filename).
+        """
+        if not self.is_recording:
+            return None
+
+        writer = self.writer
+        self.close()
+        if writer.error is None:
+            dropped = f", {self.ring.dropped} samples dropped" if self.ring.dropped else ""
+            print(f"[Audio] Saved {writer.frames / self.samplerate:.1f}s to {self.filename}{dropped}")
+        return self.filename
 
     def analyze_clap(self, audio_data):
         # Flatten to mono if needed
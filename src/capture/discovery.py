@@ -0,0 +1,138 @@
+
+import glob
+import os
+import re
+import threading
+import time
+
+
+def video_nodes(pattern="/dev/video*"):
+    """
+    Linux V4L2 nodes as {index: (path, signature)}; the signature (device number, inode, ctime)
+    changes when a camera is unplugged or replugged. Empty where there is no /dev/video*.
+    """
+    nodes = {}
+    for path in glob.glob(pattern):
+        match = re.search(r"(\d+)$", path)
+        if not match:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        nodes[int(match.group(1))] = (path, (st.st_rdev, st.st_ino, st.st_ctime_ns))
+    return nodes
+
+
+class CameraDiscovery:
+    def __init__(self, open_capture, backend=0, max_devices=5, timeout=3.0, pattern="/dev/video*"):
+        """
+        Finds local cameras by opening their indices in parallel, each probe on its own daemon
+        thread so one slow driver cannot hold up the others (or the app's exit).
+
+        Results are cached by (device path, backend). Where /dev/video* exists only nodes whose
+        signature changed are probed again; elsewhere there is nothing to compare, so a cached
+        index is only probed again by scan(reprobe=True) or when the list of indices changes.
+
+        open_capture: Callable(index) returning a cv2.VideoCapture-like object
+        timeout: Seconds scan() waits; a probe still running then counts as missing until it finishes
+        """
+        self.open_capture = open_capture
+        self.backend = backend
+        self.max_devices = max_devices
+        self.timeout = timeout
+        self.pattern = pattern
+        self.cache = {}  # (path, backend) -> {"index", "signature", "ok", "seconds"}
+        self._pending = {}  # (path, backend) -> threading.Event set when the probe finishes
+        self._lock = threading.Lock()
+        self.last_nodes = None
+        self.late_results = False
+
+    def candidates(self):
+        """{index: (path, signature)} for every index worth probing."""
+        nodes = video_nodes(self.pattern)
+        if nodes:
+            return nodes
+        return {i: (f"index:{i}", None) for i in range(self.max_devices)}
+
+    def _probe(self, key, index, signature, done):
+        start = time.monotonic()
+        ok = False
+        try:
+            cap = self.open_capture(index)
+            if cap is not None:
+                ok = cap.isOpened()
+                cap.release()
+        except Exception as e:
+            print(f"[Discovery] Probing camera {index} failed: {e}")
+        with self._lock:
+            self.cache[key] = {"index": index, "signature": signature, "ok": ok, "seconds": time.monotonic() - start}
+            self._pending.pop(key, None)
+            # scan() sets the event of probes it stopped waiting for
+            if done.is_set():
+                self.late_results = True
+            done.set()
+
+    def scan(self, in_use=(), reprobe=False):
+        """
+        Probes new or changed devices and returns the sorted indices of the cameras found.
+
+        in_use: Indices currently open elsewhere (e.g. by a preview reader); they keep their cached
+                result because a second open of a busy camera usually fails.
+        reprobe: Also probe cached indices that have no signature to compare (an explicit refresh)
+        """
+        nodes = self.candidates()
+        in_use = {int(i) for i in in_use}
+        waits = []
+        with self._lock:
+            if self.last_nodes is not None and set(nodes) != set(self.last_nodes):
+                reprobe = True
+            for index, (path, signature) in nodes.items():
+                key = (path, self.backend)
+                cached = self.cache.get(key)
+                unchanged = cached and cached["signature"] == signature and (signature is not None or not reprobe)
+                if cached and (index in in_use or unchanged):
+                    continue
+                done = self._pending.get(key)
+                if done is None:
+                    done = threading.Event()
+                    self._pending[key] = done
+                    threading.Thread(
+                        target=self._probe, args=(key, index, signature, done),
+                        name=f"probe-{index}", daemon=True,
+                    ).start()
+                waits.append((index, done))
+
+        deadline = time.monotonic() + self.timeout
+        for index, done in waits:
+            if not done.wait(max(0.0, deadline - time.monotonic())):
+                print(f"[Discovery] Camera {index} did not open within {self.timeout:.1f}s; skipping it for now")
+
+        with self._lock:
+            # Probes finishing after this point are reported by changed()
+            for _, done in waits:
+                done.set()
+            self.late_results = False
+            self.last_nodes = {index: signature for index, (_, signature) in nodes.items()}
+            found = [
+                index for index, (path, _) in nodes.items()
+                if self.cache.get((path, self.backend), {}).get("ok")
+            ]
+        return sorted(found)
+
+    def changed(self):
+        """
+        Cheap check for polling: True when /dev/video* nodes were added, removed or replaced since
+        the last scan, or a probe that timed out has finished since.
+        """
+        with self._lock:
+            if self.late_results:
+                return True
+            last = self.last_nodes
+        if last is None:
+            return False
+        nodes = video_nodes(self.pattern)
+        if not nodes and all(signature is None for signature in last.values()):
+            # No /dev/video* here: nothing to watch
+            return False
+        return {index: signature for index, (_, signature) in nodes.items()} != last
@@ -0,0 +1,90 @@
+
+import collections
+import json
+import os
+import threading
+import time
+
+
+class RateMeter:
+    def __init__(self, window=2.0):
+        """Events (or bytes) per second over the last `window` seconds."""
+        self.window = window
+        self._events = collections.deque()  # (time, amount)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.started = time.monotonic()
+
+    def tick(self, amount=1, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append((now, amount))
+            self.total += amount
+            self._trim(now)
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            # A meter younger than the window is measured over its own age
+            span = min(self.window, now - self.started)
+            if not self._events or span <= 0:
+                return 0.0
+            return sum(amount for _, amount in self._events) / span
+
+    def _trim(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+
+def capture_report_path(scene, take):
+    return os.path.abspath(f"{scene}_{take}_capture.json")
+
+
+class CaptureReport:
+    def __init__(self, scene, take):
+        """
+        Health samples taken during one take (see LivePreviewWindow.health()), summarized per device
+        into {scene}_{take}_capture.json when the take stops.
+        """
+        self.scene = scene
+        self.take = take
+        self.started = time.time()
+        self.samples = []  # (seconds since start, {device: {metric: value}})
+
+    def add(self, devices, now=None):
+        now = time.time() if now is None else now
+        self.samples.append((now - self.started, devices))
+
+    def summary(self):
+        """Per device: min/mean/max of every numeric metric, plus the last value of the counters."""
+        series = collections.defaultdict(lambda: collections.defaultdict(list))
+        for _, devices in self.samples:
+            for device, metrics in devices.items():
+                for name, value in metrics.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        series[device][name].append(value)
+        summary = {}
+        for device, metrics in series.items():
+            summary[device] = {
+                name: {"min": min(values), "mean": sum(values) / len(values), "max": max(values), "last": values[-1]}
+                for name, values in metrics.items()
+            }
+        return summary
+
+    def write(self, path=None, **fields):
+        path = path or capture_report_path(self.scene, self.take)
+        report = {
+            "scene": self.scene,
+            "take": self.take,
+            "started": self.started,
+            "duration": self.samples[-1][0] if self.samples else 0.0,
+            "devices": self.summary(),
+            "samples": [{"t": round(t, 3), "devices": devices} for t, devices in self.samples],
+        }
+        report.update(fields)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+        return path
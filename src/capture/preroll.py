@@ -0,0 +1,45 @@
+
+import collections
+import threading
+
+
+class PreRollBuffer:
+    def __init__(self, seconds=3.0, max_bytes=64 * 1024 * 1024):
+        """
+        Rolling buffer of the last `seconds` of captured items (compressed frames, audio blocks),
+        kept all the time so a take can start with what happened just before START.
+
+        The buffer is bounded both in time and in bytes; whichever limit is hit first evicts
+        the oldest items.
+        """
+        self.seconds = float(seconds)
+        self.max_bytes = int(max_bytes)
+        self._items = collections.deque()  # (timestamp, item, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted = 0
+
+    def add(self, timestamp, item, nbytes):
+        with self._lock:
+            self._items.append((timestamp, item, nbytes))
+            self.bytes += nbytes
+            while self._items and (
+                self.bytes > self.max_bytes or timestamp - self._items[0][0] > self.seconds
+            ):
+                _, _, old_bytes = self._items.popleft()
+                self.bytes -= old_bytes
+                self.evicted += 1
+
+    def drain(self):
+        """Returns and removes everything buffered as (timestamp, item) pairs, oldest first."""
+        with self._lock:
+            items = [(t, item) for t, item, _ in self._items]
+            self._items.clear()
+            self.bytes = 0
+        return items
+
+    def stats(self):
+        """Buffered span in seconds, memory use in bytes, item count and items evicted so far."""
+        with self._lock:
+            span = self._items[-1][0] - self._items[0][0] if len(self._items) > 1 else 0.0
+            return {"seconds": span, "bytes": self.bytes, "items": len(self._items), "evicted": self.evicted}
@@ -0,0 +1,56 @@
+
+import collections
+import time
+
+import cv2
+import numpy as np
+
+
+def fit_size(width, height, box=(320, 180)):
+    """Largest size with the frame's aspect ratio that fits in box (never upscaled)."""
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+class PreviewRenderer:
+    def __init__(self, size=(320, 180), history=30):
+        """
+        Turns one device's frames into RGB preview thumbnails as cheaply as possible:
+        the frame is decimated with INTER_AREA first, so the color conversion only touches
+        thumbnail pixels, and both steps write into buffers reused from frame to frame.
+        """
+        self.size = size
+        self._buffers = {}  # (height, width) -> [bgr, rgb]
+        self.frames = 0
+        self.seconds = 0.0  # Total render time
+        self._times = collections.deque(maxlen=history)
+        self._costs = collections.deque(maxlen=history)
+
+    def render(self, image):
+        """Thumbnail of a BGR frame as an RGB array, valid until the next render (Image.fromarray copies it)."""
+        start = time.perf_counter()
+        height, width = image.shape[:2]
+        w, h = fit_size(width, height, self.size)
+        buffers = self._buffers.get((h, w))
+        if buffers is None:
+            buffers = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(2)]
+            self._buffers = {(h, w): buffers}
+        small = image
+        if (w, h) != (width, height):
+            small = cv2.resize(image, (w, h), dst=buffers[0], interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=buffers[1])
+
+        cost = time.perf_counter() - start
+        self.frames += 1
+        self.seconds += cost
+        self._costs.append(cost)
+        self._times.append(time.monotonic())
+        return rgb
+
+    def stats(self):
+        """Recent preview rate and render cost (ms per frame and ms of CPU per second)."""
+        fps = 0.0
+        if len(self._times) > 1 and self._times[-1] > self._times[0]:
+            fps = (len(self._times) - 1) / (self._times[-1] - self._times[0])
+        ms = 1000.0 * sum(self._costs) / len(self._costs) if self._costs else 0.0
+        return {"fps": fps, "ms": ms, "load_ms": ms * fps, "frames": self.frames}
@@ -0,0 +1,366 @@
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+
+from capture.health import RateMeter
+
+# One captured frame; timestamp is time.monotonic() right after the read returned.
+# data holds the camera's compressed (JPEG) bytes when the reader passes them through,
+# in which case image is None.
+Frame = collections.namedtuple("Frame", ["index", "timestamp", "image", "data"], defaults=(None,))
+
+
+def split_compressed(image):
+    """
+    With CAP_PROP_CONVERT_RGB off, an MJPEG camera returns its JPEG bytes as a one-row
+    uint8 buffer instead of a decoded image. Returns (image, data) with exactly one set.
+    """
+    if image is not None and (image.ndim == 1 or (image.ndim == 2 and image.shape[0] == 1)):
+        return None, image.tobytes()
+    return image, None
+
+
+class FrameQueue:
+    def __init__(self, maxsize=30, name=""):
+        """
+        Bounded frame queue between a camera reader and one consumer.
+
+        The reader never waits: when the queue is full the oldest frame is dropped and
+        counted, so a slow consumer loses frames instead of stalling capture.
+        """
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self._frames = collections.deque()
+        self._ready = threading.Condition()
+        self.delivered = 0
+        self.drops = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        return len(self._frames)
+
+    def put(self, frame):
+        """Queues a frame; returns False when an older frame had to be dropped for it."""
+        with self._ready:
+            dropped = len(self._frames) >= self.maxsize
+            if dropped:
+                self._frames.popleft()
+                self.drops += 1
+            self._frames.append(frame)
+            self.max_depth = max(self.max_depth, len(self._frames))
+            self._ready.notify()
+        return not dropped
+
+    def get(self, timeout=None):
+        """Oldest queued frame, or None if none arrived within timeout."""
+        with self._ready:
+            if not self._frames and not self._ready.wait_for(lambda: self._frames, timeout):
+                return None
+            self.delivered += 1
+            return self._frames.popleft()
+
+    def latest(self):
+        """Newest frame without waiting (None if empty); older ones are skipped, not counted as drops."""
+        with self._ready:
+            if not self._frames:
+                return None
+            frame = self._frames[-1]
+            self._frames.clear()
+            self.delivered += 1
+            return frame
+
+    def stats(self):
+        return {"depth": self.depth, "max_depth": self.max_depth, "delivered": self.delivered, "drops": self.drops}
+
+
+class CameraReader:
+    def __init__(self, device_id, open_capture, warmup_frames=5, retry_delay=1.0, passthrough=False):
+        """
+        One thread per camera that does nothing but read frames and hand them to subscribers.
+
+        device_id: Name used in logs and stats
+        open_capture: Callable returning an opened cv2.VideoCapture-like object; called again
+                      after a failed read, so an unplugged camera reconnects on its own
+        warmup_frames: Frames discarded after opening while exposure settles
+        passthrough: Keep compressed frames compressed (Frame.data) instead of decoding them;
+                     open_capture must then turn off CAP_PROP_CONVERT_RGB
+        """
+        self.device_id = str(device_id)
+        self.open_capture = open_capture
+        self.warmup_frames = warmup_frames
+        self.retry_delay = retry_delay
+        self.passthrough = passthrough
+        self.queues = {}
+        self._lock = threading.Lock()
+        self.running = False
+        self.connected = False
+        self.frames_read = 0
+        self.read_failures = 0
+        self.rate = RateMeter()
+        self.thread = None
+
+    def subscribe(self, name, maxsize=30):
+        """Returns a new FrameQueue that receives every frame read from now on."""
+        frames = FrameQueue(maxsize, name=f"{self.device_id}/{name}")
+        with self._lock:
+            self.queues[name] = frames
+        return frames
+
+    def unsubscribe(self, name):
+        with self._lock:
+            return self.queues.pop(name, None)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"CameraReader-{self.device_id}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+
+    def _run(self):
+        cap = None
+        while self.running:
+            if cap is None:
+                try:
+                    cap = self.open_capture()
+                except Exception as e:
+                    print(f"[Capture] Could not open camera {self.device_id}: {e}")
+                    cap = None
+                if cap is None or not cap.isOpened():
+                    if cap is not None:
+                        cap.release()
+                    cap = None
+                    time.sleep(self.retry_delay)
+                    continue
+                for _ in range(self.warmup_frames):
+                    cap.read()
+                self.connected = True
+
+            ret, image = cap.read()
+            timestamp = time.monotonic()
+            if not ret:
+                # Same recovery as before: drop the handle and reopen it
+                self.read_failures += 1
+                self.connected = False
+                cap.release()
+                cap = None
+                time.sleep(self.retry_delay)
+                continue
+
+            self.publish(image, timestamp)
+
+        self.connected = False
+        if cap is not None:
+            cap.release()
+
+    def publish(self, image, timestamp):
+        """Hands one read frame to every subscriber (also used by SynchronizedReader)."""
+        data = None
+        if self.passthrough:
+            image, data = split_compressed(image)
+        frame = Frame(self.frames_read, timestamp, image, data)
+        self.frames_read += 1
+        self.rate.tick()
+        with self._lock:
+            queues = list(self.queues.values())
+        for frames in queues:
+            frames.put(frame)
+
+    def stats(self):
+        with self._lock:
+            queues = dict(self.queues)
+        return {
+            "connected": self.connected,
+            "fps": self.rate.rate(),
+            "frames": self.frames_read,
+            "read_failures": self.read_failures,
+            "queues": {name: frames.stats() for name, frames in queues.items()},
+        }
+
+
+class FrameConsumer:
+    def __init__(self, frames, handle, on_close=None, name="consumer"):
+        """
+        Drains one FrameQueue on its own thread, so slow work (encoding, disk writes)
+        never delays the camera read.
+
+        handle: Called with every Frame in order
+        on_close: Called once on the consumer thread after the last frame (e.g. release a writer)
+        """
+        self.frames = frames
+        self.handle = handle
+        self.on_close = on_close
+        self.name = name
+        self.errors = 0
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"FrameConsumer-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Handles the frames still queued, then closes; returns once the thread has finished."""
+        self._stop.set()
+        self.thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            frame = self.frames.get(timeout=0.1)
+            if frame is None:
+                if self._stop.is_set():
+                    break
+                continue
+            try:
+                self.handle(frame)
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"[Capture] {self.name} failed on frame {frame.index}: {e}")
+        if self.on_close:
+            try:
+                self.on_close()
+            except Exception as e:
+                print(f"[Capture] {self.name} failed to close: {e}")
+
+
+class SynchronizedReader:
+    def __init__(self, passthrough=False, retry_delay=1.0, skew_history=9000):
+        """
+        Reads several cameras in lockstep: one tight loop calls grab() on every camera back
+        to back, then retrieve() runs for all of them in parallel. Corresponding frames are
+        latched within the time the grabs take instead of up to a frame interval apart.
+
+        Each camera is exposed as a CameraReader (not started) with the usual subscribe(),
+        unsubscribe() and stats(); the frame timestamp is the grab time.
+        """
+        self.passthrough = passthrough
+        self.retry_delay = retry_delay
+        self.channels = {}  # did -> CameraReader
+        self.caps = {}  # did -> opened capture
+        self._lock = threading.Lock()
+        self.running = False
+        self.closed = False
+        self.thread = None
+        self.executor = None
+        self.skews = collections.deque(maxlen=skew_history)
+        self.sets = 0
+
+    def add_camera(self, device_id, open_capture, warmup_frames=5):
+        """Registers a camera and opens it on a helper thread; returns its CameraReader channel."""
+        did = str(device_id)
+        with self._lock:
+            channel = self.channels.get(did)
+            if channel is None:
+                channel = CameraReader(did, open_capture, warmup_frames, self.retry_delay, self.passthrough)
+                self.channels[did] = channel
+                threading.Thread(target=self._open, args=(channel,), daemon=True).start()
+        return channel
+
+    def _open(self, channel):
+        while not self.closed:
+            try:
+                cap = channel.open_capture()
+            except Exception as e:
+                print(f"[Capture] Could not open camera {channel.device_id}: {e}")
+                cap = None
+            if cap is not None and cap.isOpened():
+                for _ in range(channel.warmup_frames):
+                    cap.read()
+                with self._lock:
+                    if self.closed:
+                        cap.release()
+                        return
+                    self.caps[channel.device_id] = cap
+                channel.connected = True
+                return
+            if cap is not None:
+                cap.release()
+            time.sleep(self.retry_delay)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieve")
+        self.thread = threading.Thread(target=self._run, name="SynchronizedReader", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        self.closed = True
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        with self._lock:
+            caps = self.caps
+            self.caps = {}
+        for did, cap in caps.items():
+            cap.release()
+            self.channels[did].connected = False
+
+    def reset_stats(self):
+        self.skews.clear()
+        self.sets = 0
+
+    def _run(self):
+        while self.running:
+            with self._lock:
+                caps = list(self.caps.items())
+            if not caps:
+                time.sleep(0.05)
+                continue
+
+            # Grab phase: nothing but grab() between the timestamps
+            grabbed = []
+            for did, cap in caps:
+                ok = cap.grab()
+                grabbed.append((did, cap, ok, time.monotonic()))
+            times = [t for _, _, ok, t in grabbed if ok]
+            if len(times) > 1:
+                self.skews.append(max(times) - min(times))
+            self.sets += 1
+
+            # Retrieve (decode) phase in parallel
+            jobs = [(did, cap, t, self.executor.submit(cap.retrieve)) for did, cap, ok, t in grabbed if ok]
+            failed = [(did, cap) for did, cap, ok, _ in grabbed if not ok]
+            for did, cap, t, job in jobs:
+                ret, image = job.result()
+                if ret:
+                    self.channels[did].publish(image, t)
+                else:
+                    failed.append((did, cap))
+            for did, cap in failed:
+                self._reconnect(did, cap)
+
+    def _reconnect(self, did, cap):
+        channel = self.channels[did]
+        channel.read_failures += 1
+        channel.connected = False
+        with self._lock:
+            self.caps.pop(did, None)
+        cap.release()
+        threading.Thread(target=self._open, args=(channel,), daemon=True).start()
+
+    def skew_stats(self):
+        """Inter-camera grab skew over the recent frame sets, in milliseconds."""
+        skews = np.array(self.skews) * 1000.0
+        if len(skews) == 0:
+            return {"sets": self.sets, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "sets": self.sets,
+            "mean_ms": float(skews.mean()),
+            "p95_ms": float(np.percentile(skews, 95)),
+            "max_ms": float(skews.max()),
+        }
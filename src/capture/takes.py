@@ -0,0 +1,35 @@
+
+import json
+import os
+
+
+def take_metadata_path(scene, take):
+    return os.path.abspath(f"{scene}_{take}_take.json")
+
+def write_take_metadata(scene, take, replace=False, **fields):
+    """
+    Merges fields into the take's {scene}_{take}_take.json sidecar (wall-clock times are time.time() seconds).
+
+    replace: Start a new sidecar instead (at record start, so a re-recorded take keeps
+             nothing from the previous attempt)
+    """
+    path = take_metadata_path(scene, take)
+    metadata = {} if replace else read_take_metadata(scene, take)
+    metadata.update(scene=scene, take=take, **fields)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def read_take_metadata(scene, take):
+    """Returns the take sidecar as a dict, empty if it is missing or unreadable."""
+    path = take_metadata_path(scene, take)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[Take] Could not read {path}: {e}")
+        return {}
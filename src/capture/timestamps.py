@@ -0,0 +1,136 @@
+
+import os
+import struct
+import subprocess
+import time
+
+import numpy as np
+
+# Sidecar layout: a 32 byte header followed by fixed 16 byte records, appended while recording
+# so a crash only loses the last buffered records.
+#   header: magic, version, nominal fps, wall-clock offset (time.time() - time.monotonic() at open)
+#   record: kind, count, frame, time
+TIMESTAMP_MAGIC = b"MCTS"
+TIMESTAMP_VERSION = 1
+HEADER = struct.Struct("<4sI d d 8x")
+RECORD_DTYPE = np.dtype([("kind", "<u2"), ("count", "<u2"), ("frame", "<u4"), ("time", "<f8")])
+FRAME = 0  # frame: index in the video file, time: capture time (monotonic seconds)
+DROP = 1  # count frames are missing before video frame `frame`, time: capture time of that frame
+
+
+def timestamp_path(video_path):
+    """{scene}_{take}_cam0.mp4 -> {scene}_{take}_cam0_frames.bin"""
+    return os.path.splitext(video_path)[0] + "_frames.bin"
+
+
+class TimestampWriter:
+    def __init__(self, path, fps=30.0, wall_offset=None):
+        """
+        Appends per-frame capture timestamps and dropped-frame events next to a recording.
+
+        A drop is recorded when the capture index skips (frames dropped before the writer)
+        or when consecutive frames are more than 1.5 nominal intervals apart (camera stall).
+        """
+        self.path = path
+        self.fps = float(fps)
+        self.frames = 0
+        self.dropped = 0
+        self.last_source = None
+        self.last_time = None
+        self.file = open(path, "wb")
+        if wall_offset is None:
+            wall_offset = time.time() - time.monotonic()
+        self.file.write(HEADER.pack(TIMESTAMP_MAGIC, TIMESTAMP_VERSION, self.fps, wall_offset))
+
+    def add(self, timestamp, source_index=None):
+        """Records the next video frame captured at timestamp (time.monotonic() seconds)."""
+        missing = 0
+        if source_index is not None and self.last_source is not None:
+            missing = max(0, source_index - self.last_source - 1)
+        if self.last_time is not None and self.fps > 0:
+            gap = timestamp - self.last_time
+            if gap > 1.5 / self.fps:
+                missing = max(missing, int(round(gap * self.fps)) - 1)
+        records = []
+        if missing:
+            self.dropped += missing
+            records.append((DROP, min(missing, 0xFFFF), self.frames, timestamp))
+        records.append((FRAME, 0, self.frames, timestamp))
+        self.file.write(np.array(records, dtype=RECORD_DTYPE).tobytes())
+        self.frames += 1
+        self.last_source = source_index
+        self.last_time = timestamp
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def write_timestamps(path, times, fps=30.0, wall_offset=0.0):
+    """Writes a whole sidecar at once (e.g. for frame times probed from an uploaded video)."""
+    writer = TimestampWriter(path, fps, wall_offset)
+    try:
+        for t in times:
+            writer.add(float(t))
+    finally:
+        writer.close()
+    return writer
+
+def read_timestamps(path):
+    """
+    Returns:
+        Dict with fps, wall_offset, times (per video frame, seconds on the recorder's clock),
+        and drops as an (N, 2) array of (video frame, missing count).
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a frame timestamp file")
+        magic, version, fps, wall_offset = HEADER.unpack(header)
+        if magic != TIMESTAMP_MAGIC or version > TIMESTAMP_VERSION:
+            raise ValueError(f"{path} is not a frame timestamp file")
+        data = f.read()
+    # A crash can leave a partial last record
+    usable = len(data) - len(data) % RECORD_DTYPE.itemsize
+    records = np.frombuffer(data[:usable], dtype=RECORD_DTYPE)
+    frames = records[records["kind"] == FRAME]
+    drops = records[records["kind"] == DROP]
+    times = np.full(int(frames["frame"].max()) + 1 if len(frames) else 0, np.nan)
+    times[frames["frame"]] = frames["time"]
+    return {
+        "fps": fps,
+        "wall_offset": wall_offset,
+        "times": times,
+        "drops": np.column_stack([drops["frame"], drops["count"]]).astype(np.int64),
+    }
+
+def probe_frame_times(video_path, ffprobe="ffprobe"):
+    """Presentation time of every video frame from the container (for variable-rate mobile uploads)."""
+    cmd = [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "frame=best_effort_timestamp_time", "-of", "csv=p=0", video_path,
+    ]
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    times = [float(line.split(",")[0]) for line in result.stdout.split() if line and line.split(",")[0] != "N/A"]
+    return np.asarray(times, dtype=np.float64)
+
+def frames_at_times(frame_times, targets, tolerance):
+    """
+    Index of the frame captured closest to each target time, or -1 if none is within
+    tolerance seconds (a dropped frame stays missing instead of shifting the rest of the view).
+
+    Args:
+        frame_times: (frames,) capture times, increasing; NaN for frames without a time.
+        targets: (N,) wanted times on the same clock.
+    """
+    frame_times = np.asarray(frame_times, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    known = np.flatnonzero(np.isfinite(frame_times))
+    if len(known) == 0:
+        return np.full(len(targets), -1, dtype=np.int64)
+    times = frame_times[known]
+    right = np.clip(np.searchsorted(times, targets), 0, len(times) - 1)
+    left = np.clip(right - 1, 0, len(times) - 1)
+    nearest = np.where(np.abs(times[left] - targets) <= np.abs(times[right] - targets), left, right)
+    index = known[nearest]
+    return np.where(np.abs(times[nearest] - targets) <= tolerance, index, -1)
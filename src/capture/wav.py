@@ -0,0 +1,151 @@
+
+import struct
+import threading
+import time
+
+import numpy as np
+
+# 44 byte PCM WAV header; the two sizes are written as 0 first and fixed up as data arrives
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+class AudioRing:
+    def __init__(self, frames, channels=1, dtype=np.int16):
+        """
+        Fixed-size ring buffer between the audio callback (the only writer) and one reader thread.
+
+        No locks: each side only advances its own counter, after its copy is complete, so the
+        callback never waits. When the reader falls behind by more than the capacity the newest
+        samples are dropped and counted.
+        """
+        self.capacity = int(frames)
+        self.buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self.written = 0  # Frames ever written (advanced by the writer only)
+        self.read = 0  # Frames ever consumed (advanced by the reader only)
+        self.dropped = 0
+
+    @property
+    def available(self):
+        return self.written - self.read
+
+    def write(self, block):
+        """Copies a (frames, channels) block in; returns the number of frames that fit."""
+        n = min(len(block), self.capacity - self.available)
+        if n < len(block):
+            self.dropped += len(block) - n
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        self.buffer[:n - first] = block[first:n]
+        self.written += n
+        return n
+
+    def peek(self):
+        """Views of the unread frames, oldest first (one or two, when the data wraps around)."""
+        n = self.available
+        start = self.read % self.capacity
+        first = min(n, self.capacity - start)
+        views = [self.buffer[start:start + first]]
+        if n > first:
+            views.append(self.buffer[:n - first])
+        return views
+
+    def advance(self, frames):
+        self.read += frames
+
+
+class WavStreamWriter:
+    def __init__(self, path, samplerate, channels=1, sample_width=2):
+        """16-bit PCM WAV written as it arrives; update_header() makes the file valid so far."""
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.data_bytes = 0
+        self.file = open(path, "wb")
+        self.file.write(self._header())
+
+    def _header(self):
+        block_align = self.channels * self.sample_width
+        return WAV_HEADER.pack(
+            b"RIFF", 36 + self.data_bytes, b"WAVE", b"fmt ", 16, 1, self.channels, self.samplerate,
+            self.samplerate * block_align, block_align, 8 * self.sample_width, b"data", self.data_bytes,
+        )
+
+    def write(self, samples):
+        data = np.ascontiguousarray(samples, dtype="<i2")
+        self.file.write(memoryview(data).cast("B"))
+        self.data_bytes += data.nbytes
+
+    def update_header(self):
+        """Rewrites the sizes for the data written so far (a crash then keeps a playable file)."""
+        self.file.flush()
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self._header())
+        self.file.seek(position)
+
+    def close(self):
+        if not self.file.closed:
+            self.update_header()
+            self.file.close()
+
+
+class AudioFileWriter:
+    def __init__(self, ring, path, samplerate, channels=1, head=(), header_interval=5.0, poll=0.05):
+        """
+        Drains an AudioRing into a WAV file on its own thread, so the audio callback only copies
+        into the ring and memory stays at the ring's size however long the take runs.
+
+        head: Blocks written before the ring's data (the pre-roll)
+        header_interval: Seconds between header fix-ups while recording
+        """
+        self.ring = ring
+        self.wav = WavStreamWriter(path, samplerate, channels)
+        self.head = list(head)
+        self.header_interval = header_interval
+        self.poll = poll
+        self.error = None
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="AudioFileWriter", daemon=True)
+
+    @property
+    def frames(self):
+        return self.wav.data_bytes // (self.wav.channels * self.wav.sample_width)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Writes what is still buffered, fixes up the header and closes the file."""
+        self._stop.set()
+        self.thread.join(timeout=timeout)
+
+    def _drain(self):
+        views = self.ring.peek()
+        frames = sum(len(view) for view in views)
+        for view in views:
+            if len(view):
+                self.wav.write(view)
+        self.ring.advance(frames)
+        return frames
+
+    def _run(self):
+        try:
+            for block in self.head:
+                self.wav.write(block)
+            self.head = []
+            last_header = time.monotonic()
+            while not self._stop.is_set():
+                if not self._drain():
+                    self._stop.wait(self.poll)
+                if time.monotonic() - last_header > self.header_interval:
+                    self.wav.update_header()
+                    last_header = time.monotonic()
+            self._drain()
+        except Exception as e:
+            self.error = e
+            print(f"[Audio] Writing {self.wav.path} failed: {e}")
+        finally:
+            self.wav.close()
@@ -0,0 +1,233 @@
+
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from capture.health import RateMeter
+
+WRITER_KINDS = ("mjpeg", "ffmpeg", "opencv")
+
+
+def frame_image(frame, flags=None):
+    """BGR image of a Frame, decoding the camera's JPEG bytes for passthrough frames (imdecode flags)."""
+    if frame.image is not None:
+        return frame.image
+    return cv2.imdecode(np.frombuffer(frame.data, dtype=np.uint8), cv2.IMREAD_COLOR if flags is None else flags)
+
+def compress_frame(frame, quality=90):
+    """The Frame with its image replaced by JPEG bytes (passthrough frames are returned as they are)."""
+    if frame.data is not None:
+        return frame
+    ok, encoded = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return frame._replace(image=None, data=encoded.tobytes())
+
+
+class RecordingWriter:
+    def __init__(self, path, fps=30.0):
+        """
+        Base class for the take recorders: opens on the first frame (when the size is known)
+        and keeps throughput counters for write().
+
+        Subclasses implement _open(frame), _write(frame) -> bytes handed to the encoder, and _close().
+        """
+        self.path = path
+        self.fps = float(fps)
+        self.opened = False
+        self.frames = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self.first_write = None
+        self.last_write = None
+        self.recent_seconds = collections.deque(maxlen=30)
+        self.input_rate = RateMeter()
+
+    def write(self, frame):
+        start = time.perf_counter()
+        if not self.opened:
+            self._open(frame)
+            self.opened = True
+            self.first_write = start
+        written = self._write(frame)
+        self.bytes_written += written
+        self.last_write = time.perf_counter()
+        self.write_seconds += self.last_write - start
+        self.recent_seconds.append(self.last_write - start)
+        self.input_rate.tick(written)
+        self.frames += 1
+
+    def close(self):
+        if self.opened:
+            self._close()
+            self.opened = False
+
+    def stats(self):
+        """
+        frames, megabytes handed to the encoder, average ms per write(), MB/s while writing,
+        and load: the fraction of the take spent inside write() (1.0 or more means it cannot keep up).
+        latency_ms covers the last 30 writes, input_mb_per_second the bytes handed over in the last
+        seconds of wall time, and file_megabytes is the output file's current size on disk.
+        """
+        elapsed = (self.last_write - self.first_write) if self.frames > 1 else 0.0
+        recent = list(self.recent_seconds)
+        try:
+            file_bytes = os.path.getsize(self.path)
+        except OSError:
+            file_bytes = 0
+        return {
+            "frames": self.frames,
+            "megabytes": self.bytes_written / 1e6,
+            "ms_per_frame": 1000.0 * self.write_seconds / self.frames if self.frames else 0.0,
+            "mb_per_second": self.bytes_written / 1e6 / self.write_seconds if self.write_seconds else 0.0,
+            "load": self.write_seconds / elapsed if elapsed else 0.0,
+            "latency_ms": 1000.0 * sum(recent) / len(recent) if recent else 0.0,
+            "input_mb_per_second": self.input_rate.rate() / 1e6,
+            "file_megabytes": file_bytes / 1e6,
+        }
+
+    def _open(self, frame):
+        raise NotImplementedError
+
+    def _write(self, frame):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class OpenCVWriter(RecordingWriter):
+    """cv2.VideoWriter with the mp4v codec (the original recorder; encodes on the calling thread)."""
+
+    def _open(self, frame):
+        h, w = frame_image(frame).shape[:2]
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (w, h))
+
+    def _write(self, frame):
+        image = frame_image(frame)
+        self.writer.write(image)
+        return image.nbytes
+
+    def _close(self):
+        self.writer.release()
+
+
+class FFmpegPipeWriter(RecordingWriter):
+    def __init__(self, path, fps=30.0, ffmpeg="ffmpeg"):
+        """Streams frames into an ffmpeg subprocess, which encodes on its own cores."""
+        super().__init__(path, fps)
+        self.ffmpeg = ffmpeg
+        self.process = None
+        self.log = None
+
+    def _command(self, frame):
+        raise NotImplementedError
+
+    def _open(self, frame):
+        cmd = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y"] + self._command(frame) + [self.path]
+        # stderr goes to a file: an unread pipe would fill up and block ffmpeg (and then our writes)
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self.log)
+
+    def _write(self, frame):
+        data = self._payload(frame)
+        try:
+            self.process.stdin.write(data)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg exited while writing {self.path}: {self._error()}")
+        return memoryview(data).nbytes
+
+    def _close(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.process.returncode != 0:
+            print(f"[Writer] ffmpeg failed for {self.path}: {self._error()}")
+        self.log.close()
+
+    def _error(self, limit=4096):
+        """The end of ffmpeg's error output."""
+        try:
+            self.log.seek(0, os.SEEK_END)
+            self.log.seek(max(0, self.log.tell() - limit))
+            return self.log.read().decode("utf-8", "replace").strip() or "no details"
+        except (OSError, ValueError):
+            return "no details"
+
+
+class FFmpegEncodeWriter(FFmpegPipeWriter):
+    def __init__(self, path, fps=30.0, ffmpeg="ffmpeg", codec="libx264", preset="ultrafast", crf=18):
+        """Raw BGR frames piped to ffmpeg and encoded with a fast x264 preset."""
+        super().__init__(path, fps, ffmpeg)
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+
+    def _command(self, frame):
+        h, w = frame_image(frame).shape[:2]
+        return [
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{w}x{h}", "-framerate", f"{self.fps:g}", "-i", "-",
+            "-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", "yuv420p",
+        ]
+
+    def _payload(self, frame):
+        return np.ascontiguousarray(frame_image(frame)).data
+
+
+class MJPEGPassthroughWriter(FFmpegPipeWriter):
+    def __init__(self, path, fps=30.0, ffmpeg="ffmpeg", quality=90):
+        """
+        Stores the camera's own JPEG frames unchanged (ffmpeg only muxes them, -c:v copy).
+        Frames that arrive decoded (the backend ignored CAP_PROP_CONVERT_RGB) are JPEG
+        encoded here at quality and counted in reencoded.
+        """
+        super().__init__(path, fps, ffmpeg)
+        self.quality = quality
+        self.reencoded = 0
+
+    def _command(self, frame):
+        return ["-f", "mjpeg", "-framerate", f"{self.fps:g}", "-i", "-", "-c:v", "copy"]
+
+    def _payload(self, frame):
+        if frame.data is None:
+            self.reencoded += 1
+        return compress_frame(frame, self.quality).data
+
+    def stats(self):
+        stats = super().stats()
+        stats["reencoded"] = self.reencoded
+        return stats
+
+
+def create_writer(kind, path, fps=30.0, ffmpeg="ffmpeg", **options):
+    """
+    Recording writer by config name ("mjpeg", "ffmpeg" or "opencv").
+    The ffmpeg-based writers fall back to OpenCV when the ffmpeg binary is not found.
+    """
+    if kind not in WRITER_KINDS:
+        raise ValueError(f"Unknown writer '{kind}'; expected one of {', '.join(WRITER_KINDS)}")
+    if kind != "opencv" and shutil.which(ffmpeg) is None:
+        print(f"[Writer] {ffmpeg} not found; recording {path} with OpenCV mp4v instead.")
+        kind = "opencv"
+    if kind == "mjpeg":
+        return MJPEGPassthroughWriter(path, fps, ffmpeg, quality=options.get("quality", 90))
+    if kind == "ffmpeg":
+        return FFmpegEncodeWriter(
+            path, fps, ffmpeg,
+            codec=options.get("codec", "libx264"),
+            preset=options.get("preset", "ultrafast"),
+            crf=options.get("crf", 18),
+        )
+    return OpenCVWriter(path, fps)
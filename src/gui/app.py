@@ -6,6 +6,14 @@ import sys
 import os
 from osc.client import MocapOSC
 from capture.audio import AudioRecorder
+from capture.discovery import CameraDiscovery
+from capture.health import CaptureReport, RateMeter
+from capture.preroll import PreRollBuffer
+from capture.preview import PreviewRenderer
+from capture.stream import CameraReader, FrameConsumer, SynchronizedReader
+from capture.timestamps import TimestampWriter, timestamp_path
+from capture.writers import compress_frame, create_writer, frame_image
+from capture.takes import write_take_metadata
 from processing.pipeline import MocapPipeline
 from utils.config import config
 import tkinter.messagebox as msgbox
@@ -14,6 +22,7 @@ import requests
 import time
 import cv2
 from PIL import Image
+import numpy as np
 import concurrent.futures
 import qrcode
 import shutil
@@ -37,9 +46,12 @@ except AttributeError:
 CAMERA_BACKEND = getattr(cv2, "CAP_MSMF", 0)
 
 
-import io
 
-def configure_capture(cap):
+def configure_capture(cap, passthrough=False, low_latency=False):
+    """
+    Applies the [Camera] settings; passthrough keeps MJPEG frames compressed (no decode on read),
+    low_latency asks the driver to queue a single frame so grab() returns the newest one.
+    """
     cam_config = config.get("Camera", {})
     width = cam_config.get("width", 1920)
     height = cam_config.get("height", 1080)
@@ -49,6 +61,10 @@ def configure_capture(cap):
     cap.set(cv2.CAP_PROP_FPS, fps)
     if hasattr(cv2, "CAP_PROP_FOURCC"):
         cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    if passthrough and hasattr(cv2, "CAP_PROP_CONVERT_RGB"):
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+    if low_latency and hasattr(cv2, "CAP_PROP_BUFFERSIZE"):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
     if hasattr(cv2, "CAP_PROP_AUTOFOCUS"):
         cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
     if hasattr(cv2, "CAP_PROP_AUTO_EXPOSURE"):
@@ -66,20 +82,65 @@ class LivePreviewWindow(ctk.CTkToplevel):
         
         self.scroll = ctk.CTkScrollableFrame(self)
         self.scroll.grid(row=0, column=0, sticky="nsew")
-        
+
+        # Preview rate (independent of the capture rate) and total preview cost
+        self.preview_fps = config.get("Capture", {}).get("preview_fps", 10)
+        self.status_bar = ctk.CTkFrame(self)
+        self.status_bar.grid(row=1, column=0, sticky="ew")
+        ctk.CTkLabel(self.status_bar, text="Preview FPS").pack(side="left", padx=10, pady=5)
+        self.combo_preview_fps = ctk.CTkOptionMenu(
+            self.status_bar, values=["2", "5", "10", "15", "30"], width=70, command=self.set_preview_fps
+        )
+        self.combo_preview_fps.set(str(self.preview_fps))
+        self.combo_preview_fps.pack(side="left", pady=5)
+        self.label_preview_cost = ctk.CTkLabel(self.status_bar, text="")
+        self.label_preview_cost.pack(side="left", padx=10, pady=5)
+
         self.previews = {} # id -> label
+        self.preview_images = {} # id -> CTkImage reused for every preview frame
+        self.renderers = {} # id -> PreviewRenderer
         self.running = True
         
         # State Management
         self.is_recording = False
         self.is_calibrating = False
-        self.writers = {} # did -> cv2.VideoWriter
+        self.writers = {} # did -> RecordingWriter
+        self.frame_logs = {} # did -> TimestampWriter of the take (counts dropped frames)
+        self.mobile_arrivals = {} # did -> RateMeter of new preview images from the phone
+        self.mobile_last = {} # did -> hash of the last preview image
+        self.disk_samples = {} # did -> (time, file bytes) for the disk write rate
         self.record_params = {} # scene, take
         self.calib_params = {} # count, delay, last_time, no_ssl
         
         self.calib_saved_count = {} # did -> count
         
-        self.caps = {} # id -> cv2.VideoCapture (Persistent)
+        # One reader thread per local camera; recording, calibration saving and the
+        # preview each drain their own bounded queue (see capture/stream.py)
+        self.readers = {} # did -> CameraReader (Persistent)
+        self.preview_queues = {} # did -> FrameQueue
+        self.recorders = {} # did -> FrameConsumer writing the take
+        self.calib_savers = {} # did -> FrameConsumer saving calibration images
+        self.prerolls = {} # did -> (PreRollBuffer, FrameConsumer) between takes
+        self.thumbnails = {} # did -> last preview image
+        self.capture_lock = threading.Lock()
+        capture_cfg = config.get("Capture", {})
+        self.record_queue_size = capture_cfg.get("record_queue", 60)
+        self.writer_kind = capture_cfg.get("writer", "mjpeg")
+        self.writer_options = {
+            "ffmpeg": capture_cfg.get("ffmpeg_path", "ffmpeg"),
+            "preset": capture_cfg.get("ffmpeg_preset", "ultrafast"),
+            "crf": capture_cfg.get("ffmpeg_crf", 18),
+            "quality": capture_cfg.get("jpeg_quality", 90),
+        }
+        # MJPEG passthrough only works if the reader leaves frames compressed
+        self.passthrough = self.writer_kind == "mjpeg"
+        self.record_fps = config.get("Camera", {}).get("fps", 30)
+        self.preroll_seconds = capture_cfg.get("preroll_seconds", 3.0)
+        self.preroll_bytes = int(capture_cfg.get("preroll_megabytes", 64) * 1024 * 1024)
+        # Lockstep grab/retrieve of all local cameras instead of one free-running reader each
+        self.sync_reader = SynchronizedReader(self.passthrough) if capture_cfg.get("sync_grab", False) else None
+        if self.sync_reader:
+            self.sync_reader.start()
         self.session = requests.Session() # Reuse connections
 
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=8) # Parallel fetch
@@ -97,24 +158,213 @@ class LivePreviewWindow(ctk.CTkToplevel):
         except Exception as e:
             logger.warning("Preview HTTP session cleanup failed: %s", e)
         self.executor.shutdown(wait=False)
-        # Cleanup any active writers
-        for w in self.writers.values():
-            w.release()
-        # Release caps
-        for cap in self.caps.values():
-            cap.release()
+        # Finish any active writers, then stop the readers (they release their caps)
+        self.stop_recording()
+        self.stop_calibration()
+        with self.capture_lock:
+            prerolls = self.prerolls
+            self.prerolls = {}
+        for did, (_, consumer) in prerolls.items():
+            self.readers[did].unsubscribe("preroll")
+            consumer.stop()
+        for reader in self.readers.values():
+            reader.stop()
+        if self.sync_reader:
+            self.sync_reader.stop()
         self.destroy()
 
+    def ensure_reader(self, did):
+        """Starts the reader thread for a local camera on first use."""
+        with self.capture_lock:
+            reader = self.readers.get(did)
+            if reader is None:
+                low_latency = self.sync_reader is not None
+
+                def open_capture():
+                    return configure_capture(cv2.VideoCapture(int(did), CAMERA_BACKEND), self.passthrough, low_latency)
+
+                if self.sync_reader:
+                    reader = self.sync_reader.add_camera(did, open_capture)
+                else:
+                    reader = CameraReader(did, open_capture, passthrough=self.passthrough)
+                    reader.start()
+                self.preview_queues[did] = reader.subscribe("preview", maxsize=1)
+                self.readers[did] = reader
+                if not self.is_recording:
+                    self.start_preroll(did)
+            if self.is_recording and did not in self.recorders:
+                self.start_recorder(did)
+            if self.is_calibrating and did in self.calib_params['indices'] and did not in self.calib_savers:
+                self.start_calib_saver(did)
+        return reader
+
+    def start_preroll(self, did):
+        """Keeps the last [Capture] preroll_seconds of the camera as JPEG frames until the next take."""
+        if self.preroll_seconds <= 0 or did in self.prerolls:
+            return
+        buffer = PreRollBuffer(self.preroll_seconds, self.preroll_bytes)
+        frames = self.readers[did].subscribe("preroll", maxsize=self.record_queue_size)
+        quality = self.writer_options["quality"]
+
+        def keep(frame):
+            frame = compress_frame(frame, quality)
+            buffer.add(frame.timestamp, frame, len(frame.data))
+
+        consumer = FrameConsumer(frames, keep, name=f"preroll cam{did}").start()
+        self.prerolls[did] = (buffer, consumer)
+
+    def preroll_stats(self):
+        """Seconds and bytes held in every camera's pre-roll buffer."""
+        with self.capture_lock:
+            prerolls = dict(self.prerolls)
+        return {did: buffer.stats() for did, (buffer, _) in prerolls.items()}
+
+    def start_recorder(self, did):
+        """
+        Writes the camera's frames to {scene}_{take}_cam{did}.mp4 on a consumer thread ([Capture] writer),
+        with their capture times and dropped-frame events in the _frames.bin sidecar.
+        The pre-roll buffer is written first, so the take starts preroll_seconds before START.
+        """
+        frames = self.readers[did].subscribe("record", self.record_queue_size)
+        preroll = self.prerolls.pop(did, None)
+        v_file = f"{self.record_params['scene']}_{self.record_params['take']}_cam{did}.mp4"
+        writer = create_writer(self.writer_kind, v_file, self.record_fps, **self.writer_options)
+        timestamps = TimestampWriter(timestamp_path(v_file), self.record_fps)
+        self.writers[did] = writer
+        self.frame_logs[did] = timestamps
+        print(f"[Preview] Recording Cam {did} to {v_file} ({type(writer).__name__})")
+
+        def write(frame):
+            nonlocal preroll
+            if preroll is not None:
+                # The pre-roll consumer runs until the first live frame, so its buffer ends
+                # right before that frame: no gap and, after the index filter, no duplicates
+                buffer, consumer = preroll
+                preroll = None
+                self.readers[did].unsubscribe("preroll")
+                consumer.stop()
+                flushed = [old for _, old in buffer.drain() if old.index < frame.index]
+                for old in flushed:
+                    writer.write(old)
+                    timestamps.add(old.timestamp, old.index)
+                if flushed:
+                    print(f"[Preview] Cam {did}: flushed {len(flushed)} pre-roll frames "
+                          f"({frame.timestamp - flushed[0].timestamp:.1f}s before START)")
+            writer.write(frame)
+            timestamps.add(frame.timestamp, frame.index)
+
+        def close():
+            if preroll is not None:
+                # Stopped before the first live frame
+                self.readers[did].unsubscribe("preroll")
+                preroll[1].stop()
+            self.writers.pop(did, None)
+            self.frame_logs.pop(did, None)
+            writer.close()
+            timestamps.close()
+            stats = writer.stats()
+            queue = frames.stats()
+            print(f"[Preview] Cam {did}: {stats['frames']} frames, {stats['megabytes']:.1f} MB at "
+                  f"{stats['mb_per_second']:.0f} MB/s ({stats['ms_per_frame']:.1f} ms/frame, load {stats['load']:.0%}), "
+                  f"queue max depth {queue['max_depth']}/{frames.maxsize}, {timestamps.dropped} frames dropped")
+
+        self.recorders[did] = FrameConsumer(frames, write, close, name=f"record cam{did}").start()
+
+    def start_calib_saver(self, did):
+        """Saves one frame per calibration step as calibration_images/cam{did}/img_NNNN.jpg."""
+        frames = self.readers[did].subscribe("calibration", maxsize=1)
+
+        def save(frame):
+            current_count = self.calib_params['count']
+            # If the master count has advanced, but we haven't saved for THIS camera yet
+            if current_count > 0 and self.calib_saved_count.get(did, -1) < current_count:
+                # Save the frame. Filenames are 0-indexed (img_0000)
+                fname = os.path.join("calibration_images", f"cam{did}", f"img_{current_count-1:04d}.jpg")
+                if frame.data is not None:
+                    # Passthrough frames already are JPEGs
+                    with open(fname, "wb") as f:
+                        f.write(frame.data)
+                else:
+                    cv2.imwrite(fname, frame.image)
+                self.calib_saved_count[did] = current_count
+
+        self.calib_savers[did] = FrameConsumer(frames, save, name=f"calibration cam{did}").start()
+
+    def capture_stats(self):
+        """Per-camera reader stats with depth and drop counters of every queue."""
+        with self.capture_lock:
+            readers = dict(self.readers)
+        return {did: reader.stats() for did, reader in readers.items()}
+
+    def health(self):
+        """
+        Live capture health per device, keyed like the calibration ids (cam0, mobile_<id>):
+        delivered fps, dropped frames, record queue depth, encoder latency, disk write rate
+        and, for phones, the rate at which new preview images arrive.
+        """
+        now = time.monotonic()
+        report = {}
+        for did, stats in self.capture_stats().items():
+            queue = stats["queues"].get("record", {})
+            frame_log = self.frame_logs.get(did)
+            writer = self.writers.get(did)
+            metrics = {
+                "connected": stats["connected"],
+                "fps": round(stats["fps"], 1),
+                "read_failures": stats["read_failures"],
+                "dropped": frame_log.dropped if frame_log else 0,
+                "queue_depth": queue.get("depth", 0),
+                "queue_max_depth": queue.get("max_depth", 0),
+            }
+            if writer is not None:
+                writer_stats = writer.stats()
+                file_bytes = writer_stats["file_megabytes"] * 1e6
+                last_time, last_bytes = self.disk_samples.get(did, (None, 0))
+                disk_rate = (file_bytes - last_bytes) / (now - last_time) if last_time and now > last_time else 0.0
+                self.disk_samples[did] = (now, file_bytes)
+                metrics.update(
+                    encoder_ms=round(writer_stats["latency_ms"], 2),
+                    encoder_load=round(writer_stats["load"], 3),
+                    disk_mb_per_second=round(max(0.0, disk_rate) / 1e6, 2),
+                )
+            else:
+                self.disk_samples.pop(did, None)
+            report[f"cam{did}"] = metrics
+        for did, arrivals in list(self.mobile_arrivals.items()):
+            report[f"mobile_{did}"] = {"preview_fps": round(arrivals.rate(now), 1), "previews": arrivals.total}
+        return report
+
     def start_recording(self, scene, take):
-        self.record_params = {'scene': scene, 'take': take}
-        self.is_recording = True
+        for did, stats in self.preroll_stats().items():
+            print(f"[Preview] Cam {did}: {stats['seconds']:.1f}s pre-roll ({stats['bytes'] / 1e6:.1f} MB)")
+        with self.capture_lock:
+            self.record_params = {'scene': scene, 'take': take}
+            self.is_recording = True
+            if self.sync_reader:
+                self.sync_reader.reset_stats()
+            for did in self.readers:
+                self.start_recorder(did)
         print(f"[Preview] Started recording for {scene}_{take}")
 
     def stop_recording(self):
-        self.is_recording = False
-        for did in list(self.writers.keys()):
-            self.writers[did].release()
-            del self.writers[did]
+        with self.capture_lock:
+            self.is_recording = False
+            recorders = self.recorders
+            self.recorders = {}
+            for did in recorders:
+                self.readers[did].unsubscribe("record")
+        # Queued frames are still encoded before the writers are released
+        for consumer in recorders.values():
+            consumer.stop()
+        if self.running:
+            with self.capture_lock:
+                for did in self.readers:
+                    self.start_preroll(did)
+        if self.sync_reader and recorders:
+            skew = self.sync_reader.skew_stats()
+            print(f"[Preview] Grab skew over {skew['sets']} frame sets: mean {skew['mean_ms']:.1f} ms, "
+                  f"p95 {skew['p95_ms']:.1f} ms, max {skew['max_ms']:.1f} ms")
+            write_take_metadata(self.record_params['scene'], self.record_params['take'], grab_skew_ms=skew)
         print("[Preview] Stopped recording and released writers.")
 
     def start_calibration(self, indices, num_images=20, delay=3.0, no_ssl=False):
@@ -127,16 +377,38 @@ class LivePreviewWindow(ctk.CTkToplevel):
             'last_time': time.time() + 5.0 # Set last_time to far in future to delay start
         }
         self.calib_saved_count = {} # Reset
-        self.is_calibrating = True
         # Ensure subdirs exist
         os.makedirs("calibration_images", exist_ok=True)
         for idx in indices:
             os.makedirs(os.path.join("calibration_images", f"cam{idx}"), exist_ok=True)
+        with self.capture_lock:
+            self.is_calibrating = True
+            for did in self.calib_params['indices']:
+                if did in self.readers:
+                    self.start_calib_saver(did)
         print(f"[Preview] Multi-Cam Calibration Mode Active ({num_images} images, {delay}s delay). Starting in 5 seconds...")
 
     def stop_calibration(self):
-        self.is_calibrating = False
-        print("[Preview] Calibration Capture Finished.")
+        with self.capture_lock:
+            was_calibrating = self.is_calibrating
+            self.is_calibrating = False
+            savers = self.calib_savers
+            self.calib_savers = {}
+            for did in savers:
+                self.readers[did].unsubscribe("calibration")
+        for consumer in savers.values():
+            consumer.stop()
+        if was_calibrating:
+            print("[Preview] Calibration Capture Finished.")
+
+    def set_preview_fps(self, value):
+        self.preview_fps = float(value)
+
+    def renderer(self, did):
+        renderer = self.renderers.get(did)
+        if renderer is None:
+            renderer = self.renderers.setdefault(did, PreviewRenderer((320, 180)))
+        return renderer
 
     def fetch_frame(self, dev, protocol):
         did = str(dev['id'])
@@ -145,54 +417,30 @@ class LivePreviewWindow(ctk.CTkToplevel):
         
         try:
             if dtype == 'local':
-                if did not in self.caps:
-                    self.caps[did] = configure_capture(cv2.VideoCapture(int(did), CAMERA_BACKEND))
-                    for _ in range(5):
-                        self.caps[did].read()
-                
-                cap = self.caps[did]
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret:
-                        # 1. Handle Recording (Full Res BGR)
-                        if self.is_recording:
-                            if did not in self.writers:
-                                scene = self.record_params['scene']
-                                take = self.record_params['take']
-                                v_file = f"{scene}_{take}_cam{did}.mp4"
-                                h, w = frame.shape[:2]
-                                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                                self.writers[did] = cv2.VideoWriter(v_file, fourcc, 30.0, (w, h))
-                                print(f"[Preview] Recording Cam {did} to {v_file}")
-                            self.writers[did].write(frame)
-
-                        # 2. Handle Calibration (State Driven)
-                        if self.is_calibrating and did in self.calib_params['indices']:
-                            p = self.calib_params
-                            current_count = p['count']
-                            # If the master count has advanced, but we haven't saved for THIS camera yet
-                            if current_count > 0 and self.calib_saved_count.get(did, -1) < current_count:
-                                # Save the frame. Filenames are 0-indexed (img_0000)
-                                fname = os.path.join("calibration_images", f"cam{did}", f"img_{current_count-1:04d}.jpg")
-                                cv2.imwrite(fname, frame)
-                                self.calib_saved_count[did] = current_count
-                                # print(f"[Preview] Cam {did} saved img_{current_count-1}")
-
-                        # 3. Create UI Thumbnail (RGB)
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        img = Image.fromarray(frame_rgb)
-                        img.thumbnail((320, 180))
-                    else:
-                        cap.release()
-                        del self.caps[did]
+                # Recording and calibration frames are handled by the reader's consumers;
+                # the preview only takes the newest frame
+                reader = self.ensure_reader(did)
+                frame = self.preview_queues[did].latest()
+                if frame is not None:
+                    # JPEG frames decode at quarter size, plenty for a 320x180 thumbnail
+                    image = frame_image(frame, getattr(cv2, "IMREAD_REDUCED_COLOR_4", cv2.IMREAD_COLOR))
+                    self.thumbnails[did] = Image.fromarray(self.renderer(did).render(image))
+                img = self.thumbnails.get(did) if reader.connected else None
 
             elif dtype == 'mobile':
                 url = f"{protocol}://127.0.0.1:5000/api/preview/{did}"
                 res = self.session.get(url, verify=False, timeout=0.5)
                 if res.status_code == 200:
-                    img_bytes = io.BytesIO(res.content)
-                    img = Image.open(img_bytes)
-                    img.thumbnail((320, 180))
+                    # The server returns the phone's latest preview; only new ones are decoded
+                    digest = hash(res.content)
+                    if digest != self.mobile_last.get(did):
+                        self.mobile_last[did] = digest
+                        self.mobile_arrivals.setdefault(did, RateMeter()).tick()
+                        data = np.frombuffer(res.content, dtype=np.uint8)
+                        image = cv2.imdecode(data, getattr(cv2, "IMREAD_REDUCED_COLOR_2", cv2.IMREAD_COLOR))
+                        if image is not None:
+                            self.thumbnails[did] = Image.fromarray(self.renderer(did).render(image))
+                    img = self.thumbnails.get(did)
         except Exception as e:
             logger.warning("Preview fetch failed for %s: %s", did, e)
             
@@ -200,6 +448,7 @@ class LivePreviewWindow(ctk.CTkToplevel):
 
     def update_loop(self):
         while self.running:
+            tick_start = time.monotonic()
             # READ STATE FROM CACHE (Thread Safe)
             with self.parent.thread_lock:
                 devices = list(self.parent.enabled_devices_cache)
@@ -227,7 +476,7 @@ class LivePreviewWindow(ctk.CTkToplevel):
                     selected = p['indices']
                     all_saved = all(self.calib_saved_count.get(did, 0) >= p['num_images'] for did in selected)
                     if all_saved:
-                        self.is_calibrating = False
+                        self.stop_calibration()
 
             current_ids = [str(d['id']) for d in devices]
             
@@ -247,7 +496,8 @@ class LivePreviewWindow(ctk.CTkToplevel):
             # Schedule UI Update on Main Thread
             self.after(0, lambda res=results: self.update_ui(res))
 
-            time.sleep(0.05)
+            # Preview at [Capture] preview_fps; capture runs at full rate regardless
+            time.sleep(max(0.01, 1.0 / self.preview_fps - (time.monotonic() - tick_start)))
 
     def trigger_calib_step(self, p):
         print(f"[Preview] Capturing Calibration Set {p['count']}/{p['num_images']}...")
@@ -270,6 +520,10 @@ class LivePreviewWindow(ctk.CTkToplevel):
             self.previews[pid].grid_forget()
             self.previews[pid].destroy()
             self.previews.pop(pid, None)
+            self.preview_images.pop(pid, None)
+            self.renderers.pop(pid, None)
+            self.mobile_arrivals.pop(pid, None)
+            self.mobile_last.pop(pid, None)
             self.realign_grid()
 
     def update_ui(self, results):
@@ -277,22 +531,32 @@ class LivePreviewWindow(ctk.CTkToplevel):
 
         for did, img in results:
             if did not in self.previews:
-                lbl = ctk.CTkLabel(self.scroll, text=f"Loading {did}...")
+                lbl = ctk.CTkLabel(self.scroll, text=f"Loading {did}...", compound="top")
                 self.previews[did] = lbl
                 self.realign_grid()
 
             if did in self.previews:
                 try:
                     if img:
-                        # Keep refernece to image to prevent garbage collection
-                        ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
-                        self.previews[did].configure(image=ctk_img, text="")
-                        self.previews[did]._img_ref = ctk_img 
+                        # One CTkImage per preview, swapped to the new frame in place
+                        ctk_img = self.preview_images.get(did)
+                        if ctk_img is None or ctk_img.cget("size") != img.size:
+                            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+                            self.preview_images[did] = ctk_img
+                            self.previews[did].configure(image=ctk_img)
+                        else:
+                            ctk_img.configure(light_image=img, dark_image=img)
+                        stats = self.renderer(did).stats()
+                        self.previews[did].configure(text=f"{did}: {stats['fps']:.1f} fps, {stats['ms']:.1f} ms/frame")
                     else:
+                        self.preview_images.pop(did, None)
                         self.previews[did].configure(text=f"No Signal ({did})", image=None)
                 except Exception as e:
                     logger.warning("Preview UI update failed for %s: %s", did, e)
 
+        load = sum(renderer.stats()["load_ms"] for renderer in list(self.renderers.values()))
+        self.label_preview_cost.configure(text=f"Preview cost: {load:.0f} ms CPU per second")
+
     def realign_grid(self):
         sorted_ids = sorted(self.previews.keys())
         cols = 2
@@ -332,6 +596,16 @@ class MocapApp(ctk.CTk):
         # Video Subprocesses
         self.video_processes = []
 
+        # Local cameras are probed in parallel on a background thread, cached between refreshes
+        camera_cfg = config.get("Camera", {})
+        self.camera_discovery = CameraDiscovery(
+            lambda i: cv2.VideoCapture(i, CAMERA_BACKEND),
+            backend=CAMERA_BACKEND,
+            max_devices=camera_cfg.get("max_devices", 5),
+            timeout=camera_cfg.get("probe_timeout", 3.0),
+        )
+        self.discovery_thread = None
+
         # Pipeline
         self.pipeline = MocapPipeline()
 
@@ -372,7 +646,9 @@ class MocapApp(ctk.CTk):
         self.discovered_devices = [] # list of dicts {id, type, name}
         
         # Refresh Button
-        self.btn_refresh = ctk.CTkButton(self.main_frame, text="Refresh Devices", command=self.refresh_devices)
+        self.btn_refresh = ctk.CTkButton(
+            self.main_frame, text="Refresh Devices", command=lambda: self.refresh_devices(reprobe=True)
+        )
         self.btn_refresh.grid(row=2, column=2, padx=5, pady=10)
  
         
@@ -380,7 +656,7 @@ class MocapApp(ctk.CTk):
 
         self.label_mic = ctk.CTkLabel(self.main_frame, text="Microphone:")
         self.label_mic.grid(row=3, column=0, padx=10, pady=10, sticky="w")
-        self.combo_mic = ctk.CTkComboBox(self.main_frame, values=["Default"])
+        self.combo_mic = ctk.CTkComboBox(self.main_frame, values=["Default"], command=self.on_mic_changed)
         self.combo_mic.grid(row=3, column=1, padx=10, pady=10, sticky="ew")
         self.populate_mics()
 
@@ -446,6 +722,12 @@ class MocapApp(ctk.CTk):
         if default_path:
             self.entry_unreal.insert(0, default_path)
 
+        # Capture Health (per device, refreshed every second)
+        self.text_health = ctk.CTkTextbox(self.main_frame, height=120, font=("Courier New", 12))
+        self.text_health.grid(row=10, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
+        self.text_health.configure(state="disabled")
+        self.capture_report = None
+
         # Exit Button (Bottom Row)
         self.btn_exit = ctk.CTkButton(self.main_frame, text="EXIT APP", command=self.exit_app, fg_color="#444444", hover_color="#222222")
         self.btn_exit.grid(row=11, column=0, columnspan=3, padx=10, pady=20, sticky="ew")
@@ -456,8 +738,11 @@ class MocapApp(ctk.CTk):
         self.start_server()
         self.update_url_display()
         self.preview_window = LivePreviewWindow(self)
+        self.arm_audio()
         self.refresh_devices()
         self.check_calibration()
+        self.after(2000, self.poll_devices)
+        self.after(1000, self.update_health)
 
 
         
@@ -516,46 +801,111 @@ class MocapApp(ctk.CTk):
             logger.warning("Could not sync GUI state for background threads: %s", e)
         self.after(500, self.sync_state)
 
-    def refresh_devices(self):
-        # Clear existing checkboxes
-        for cb in self.device_checkboxes.values():
-            cb.destroy()
-        self.device_checkboxes = {}
-        self.discovered_devices = []
-        
+    def refresh_devices(self, reprobe=False):
+        """
+        Rediscovers devices on a background thread; the list is rebuilt on the Tk thread afterwards.
+
+        reprobe: Also reopen cameras whose cached result cannot be checked otherwise (the Refresh button)
+        """
+        if self.discovery_thread and self.discovery_thread.is_alive():
+            return
+        protocol = "https" if self.check_ssl.get() else "http"
+        # Cameras the preview already has open keep their cached result instead of a second open
+        in_use = []
+        if self.preview_window and self.preview_window.winfo_exists():
+            in_use = [did for did, reader in self.preview_window.readers.items() if reader.connected]
+        self.discovery_thread = threading.Thread(
+            target=self.discover_devices, args=(protocol, in_use, reprobe), name="DeviceDiscovery", daemon=True
+        )
+        self.discovery_thread.start()
+
+    def discover_devices(self, protocol, in_use, reprobe=False):
+        devices = []
+
         # 1. Discover Local Cams
-        # Brute force 0-5
-        for i in range(5):
-            try:
-                cap = configure_capture(cv2.VideoCapture(i, CAMERA_BACKEND))
-                if cap.isOpened():
-                    self.discovered_devices.append({'id': i, 'type': 'local', 'name': f"Local Cam {i}"})
-                    cap.release()
-            except Exception as e:
-                logger.warning("Camera discovery failed for index %s: %s", i, e)
-                
+        start = time.time()
+        for i in self.camera_discovery.scan(in_use, reprobe=reprobe):
+            devices.append({'id': i, 'type': 'local', 'name': f"Local Cam {i}"})
+        print(f"[MocapApp] Found {len(devices)} local cameras in {time.time() - start:.1f}s")
+
         # 2. Discover Remote Cams
         try:
-            protocol = "https" if self.check_ssl.get() else "http"
             url = f"{protocol}://127.0.0.1:5000/api/devices"
             res = requests.get(url, verify=False, timeout=1)
             if res.status_code == 200:
                 mobiles = res.json()
                 for m in mobiles:
                     dev_id = m.get('id') or m.get('sid')
-                    self.discovered_devices.append({'id': dev_id, 'type': 'mobile', 'name': f"Mobile {m['address']}"})
+                    devices.append({'id': dev_id, 'type': 'mobile', 'name': f"Mobile {m['address']}"})
         except Exception as e:
             print(f"Error fetching mobile devices: {e}")
-            
-        # Repopulate
+
+        self.after(0, lambda: self.show_devices(devices))
+
+    def show_devices(self, devices):
+        """Rebuilds the device checkboxes, keeping the selection of devices that were already listed."""
+        selected = {did: cb.get() for did, cb in self.device_checkboxes.items()}
+        for cb in self.device_checkboxes.values():
+            cb.destroy()
+        self.device_checkboxes = {}
+        self.discovered_devices = devices
+
         for dev in self.discovered_devices:
             did = str(dev['id'])
             name = dev['name']
             cb = ctk.CTkCheckBox(self.scroll_devices, text=name)
             cb.pack(anchor="w", padx=5, pady=2)
-            cb.select() # Default enable
+            if selected.get(did, 1):
+                cb.select() # Default enable
             self.device_checkboxes[did] = cb
 
+    def capture_health(self):
+        """Health of every capture device (see LivePreviewWindow.health) plus the microphone."""
+        health = {}
+        if self.preview_window and self.preview_window.winfo_exists():
+            health.update(self.preview_window.health())
+        if self.audio_recorder:
+            health["audio"] = self.audio_recorder.stats()
+        return health
+
+    def update_health(self):
+        """Shows the capture health dashboard and samples it into the take's capture report."""
+        try:
+            health = self.capture_health()
+            if self.is_recording and self.capture_report:
+                self.capture_report.add(health)
+            fps = config.get("Camera", {}).get("fps", 30)
+            lines = []
+            for name, m in sorted(health.items()):
+                if name == "audio":
+                    lines.append(f"{name:<12} {m['seconds']:7.1f} s  overruns {m['overflows']}  "
+                                 f"status flags {m['status_events']}")
+                elif name.startswith("mobile_"):
+                    lines.append(f"{name:<12} {m['preview_fps']:5.1f} previews/s")
+                else:
+                    line = (f"{name:<12} {m['fps']:5.1f} fps  dropped {m['dropped']}  "
+                            f"queue {m['queue_depth']}/{m['queue_max_depth']}")
+                    if "encoder_ms" in m:
+                        line += f"  enc {m['encoder_ms']:.1f} ms  disk {m['disk_mb_per_second']:.1f} MB/s"
+                    if not m["connected"]:
+                        line += "  NO SIGNAL"
+                    elif m["fps"] < 0.9 * fps:
+                        line += "  LOW FPS"
+                    lines.append(line)
+            self.text_health.configure(state="normal")
+            self.text_health.delete("1.0", "end")
+            self.text_health.insert("1.0", "\n".join(lines) if lines else "No capture devices active.")
+            self.text_health.configure(state="disabled")
+        except Exception as e:
+            logger.warning("Capture health update failed: %s", e)
+        self.after(1000, self.update_health)
+
+    def poll_devices(self):
+        """Refreshes the list when cameras are plugged in or out (/dev/video* on Linux)."""
+        if not self.is_recording and self.camera_discovery.changed():
+            self.refresh_devices()
+        self.after(2000, self.poll_devices)
+
     def update_url_display(self):
         protocol = "https" if self.check_ssl.get() else "http"
         url = f"{protocol}://{self.local_ip}:5000"
@@ -584,6 +934,25 @@ class MocapApp(ctk.CTk):
 
     def open_preview(self):
         self.preview_window = LivePreviewWindow(self)
+        self.arm_audio()
+
+    def arm_audio(self):
+        """Keeps the selected mic open between takes so each take starts with its pre-roll."""
+        preroll = config.get("Capture", {}).get("preroll_seconds", 3.0)
+        if preroll <= 0:
+            return
+        mic_idx = getattr(self, "mic_indices", {}).get(self.combo_mic.get(), None)
+        if self.audio_recorder and self.audio_recorder.device != mic_idx:
+            self.audio_recorder.close()
+            self.audio_recorder = None
+        if self.audio_recorder is None:
+            self.audio_recorder = AudioRecorder(device=mic_idx, preroll_seconds=preroll)
+        self.audio_recorder.monitor()
+
+    def on_mic_changed(self, choice):
+        # The next take's pre-roll comes from the newly selected mic
+        if not self.is_recording:
+            self.arm_audio()
 
     def show_troubleshooting(self):
         protocol = "https" if self.check_ssl.get() else "http"
@@ -653,7 +1022,6 @@ class MocapApp(ctk.CTk):
         
         if os.path.exists(calib_path):
             try:
-                import numpy as np
                 data = np.load(calib_path)
                 calibrated_ids = []
                 for key in data.files:
@@ -799,12 +1167,15 @@ class MocapApp(ctk.CTk):
         scene = self.entry_scene.get()
         take = self.entry_take.get()
         print(f"Starting recording: Scene={scene}, Take={take}")
+        self.capture_report = CaptureReport(scene, take)
         
         # 2. Start Audio
         audio_filename = f"{scene}_{take}_audio.wav"
-        mic_name = self.combo_mic.get()
-        mic_idx = self.mic_indices.get(mic_name, None)
-        self.audio_recorder = AudioRecorder(filename=audio_filename, device=mic_idx)
+        self.arm_audio()
+        if self.audio_recorder is None:
+            mic_idx = self.mic_indices.get(self.combo_mic.get(), None)
+            self.audio_recorder = AudioRecorder(device=mic_idx)
+        self.audio_recorder.filename = audio_filename
         self.audio_recorder.start()
 
         # 3. Trigger Mobile Nodes
@@ -815,8 +1186,12 @@ class MocapApp(ctk.CTk):
         self.preview_window.start_recording(scene, take)
 
         # 5. Trigger OSC (Unreal/Remote)
+        trigger_time = time.time()
         self.osc_client.start_recording(scene, take)
 
+        # Wall-clock anchors for merging the Live Link Face take later
+        write_take_metadata(scene, take, replace=True, audio_start=self.audio_recorder.start_time, trigger_time=trigger_time)
+
     def stop_recording(self):
         self.is_recording = False
         self.btn_record.configure(state="normal")
@@ -828,15 +1203,28 @@ class MocapApp(ctk.CTk):
         print(f"Stopping recording: {scene}_{take}...")
         self.label_status.configure(text="Processing...")
         
+        # Last health sample while the writers and their counters are still live
+        if self.capture_report:
+            self.capture_report.add(self.capture_health())
+
         # 2. Stop Master Controller (Local Video)
         if self.preview_window:
             self.preview_window.stop_recording()
             
-        # 3. Stop Audio
+        # 3. Stop Audio (the sync spike is found by the pipeline on the processing thread)
         if self.audio_recorder:
             self.audio_recorder.stop()
-            spike_time = AudioRecorder.find_sync_spike(self.audio_recorder.filename)
-            print(f"Detected Sync Spike: {spike_time}")
+
+        # Per-take capture report: the health samples taken during the take
+        if self.capture_report:
+            try:
+                path = self.capture_report.write()
+                print(f"[MocapApp] Capture report saved to {path}")
+            except Exception as e:
+                logger.warning("Could not write the capture report: %s", e)
+            self.capture_report = None
+        if self.audio_recorder:
+            self.audio_recorder.monitor()
             
         # 4. Stop Remote Triggers (OSC/Mobile)
         self.osc_client.stop_recording()
@@ -880,11 +1268,12 @@ class MocapApp(ctk.CTk):
                 if unreal_path:
                     try:
                         os.makedirs(unreal_path, exist_ok=True)
-                        csv_src = os.path.join("MocapExports", f"{scene}_{take}.csv")
-                        csv_dest = os.path.join(unreal_path, f"{scene}_{take}.csv")
-                        if os.path.exists(csv_src):
-                            shutil.copy2(csv_src, csv_dest)
-                            print(f"Auto-imported to Unreal: {csv_dest}")
+                        # One export per persistent actor ID
+                        for export_src in self.pipeline.exported_files:
+                            export_dest = os.path.join(unreal_path, os.path.basename(export_src))
+                            if os.path.exists(export_src):
+                                shutil.copy2(export_src, export_dest)
+                                print(f"Auto-imported to Unreal: {export_dest}")
                     except Exception as e:
                         print(f"Failed to copy to Unreal: {e}")
             else:
@@ -944,6 +1333,9 @@ class MocapApp(ctk.CTk):
             except Exception as e:
                 logger.warning("Video process cleanup failed: %s", e)
 
+        if self.audio_recorder:
+            self.audio_recorder.close()
+
         # 4. Final Cleanup
         print("[MocapApp] Application Closed.")
         self.destroy()
@@ -0,0 +1,213 @@
+
+import time
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.sparse import coo_matrix
+from scipy.spatial.transform import Rotation
+
+from processing.frame_selection import charuco_board_points
+
+# fx, fy, cx, cy, k1, k2, p1, p2, k3 (OpenCV distortion order)
+NUM_INTRINSICS = 9
+
+
+def intrinsics_vector(camera_matrix, dist_coeffs):
+    """Packs a 3x3 camera matrix and OpenCV distortion coefficients into one NUM_INTRINSICS vector."""
+    K = np.asarray(camera_matrix, dtype=np.float64)
+    dist = np.zeros(5)
+    coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()[:5]
+    dist[:len(coeffs)] = coeffs
+    return np.concatenate([[K[0, 0], K[1, 1], K[0, 2], K[1, 2]], dist])
+
+def intrinsics_matrices(vector):
+    """Inverse of intrinsics_vector: (camera_matrix, dist_coeffs as a (1, 5) array)."""
+    fx, fy, cx, cy = vector[:4]
+    return np.array([[fx, 0, cx], [0, fy, cy], [0, 0, 1.0]]), np.asarray(vector[4:9], dtype=np.float64).reshape(1, 5)
+
+def project_points(points_cam, intrinsics):
+    """
+    Pinhole projection with OpenCV radial/tangential distortion.
+
+    Args:
+        points_cam: (M, 3) points in camera coordinates.
+        intrinsics: (M, NUM_INTRINSICS) per-point intrinsics (usually indexed by camera).
+
+    Returns:
+        (M, 2) pixel coordinates.
+    """
+    z = points_cam[:, 2]
+    z = np.where(np.abs(z) < 1e-12, 1e-12, z)
+    x = points_cam[:, 0] / z
+    y = points_cam[:, 1] / z
+    fx, fy, cx, cy, k1, k2, p1, p2, k3 = intrinsics.T
+    r2 = x * x + y * y
+    radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+    xd = x * radial + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+    yd = y * radial + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+    return np.column_stack([fx * xd + cx, fy * yd + cy])
+
+def compose_inverse(rvec, tvec, rvec_b, tvec_b):
+    """Pose B expressed in the frame that pose A (x_cam = R x + t) maps from: T_A^-1 * T_B, as (rvec, tvec)."""
+    R_a = Rotation.from_rotvec(np.ravel(rvec)).as_matrix()
+    R_b = Rotation.from_rotvec(np.ravel(rvec_b)).as_matrix()
+    R = R_a.T @ R_b
+    t = R_a.T @ (np.ravel(tvec_b) - np.ravel(tvec))
+    return Rotation.from_matrix(R).as_rotvec(), t
+
+def bundle_adjust(camera_poses, intrinsics, set_poses, cam_idx, set_idx, object_points, image_points,
+                  fixed_set=0, refine_intrinsics=False, f_scale=1.0, max_nfev=100):
+    """
+    Jointly refines camera poses, board poses and optionally intrinsics by minimizing reprojection error.
+
+    A board observation is projected as K_c(dist_c)(R_c (R_s X + t_s) + t_c). The fixed set's
+    pose stays at its initial value and defines the world frame. Every residual only
+    depends on one camera and one board pose, which is passed to least_squares as a
+    sparse Jacobian structure so the cost grows with the number of observations.
+
+    Args:
+        camera_poses: (C, 6) world-to-camera rotation vector and translation per camera.
+        intrinsics: (C, NUM_INTRINSICS) from intrinsics_vector.
+        set_poses: (S, 6) board-to-world pose per synchronized set.
+        cam_idx, set_idx: (M,) camera and set of every observed corner.
+        object_points: (M, 3) corner positions in the board frame.
+        image_points: (M, 2) detected pixel positions.
+        refine_intrinsics: Also optimize focal lengths, principal points and distortion.
+        f_scale: Huber loss scale in pixels.
+
+    Returns:
+        (camera_poses, intrinsics, set_poses, rms_before, rms_after)
+    """
+    camera_poses = np.asarray(camera_poses, dtype=np.float64)
+    intrinsics = np.asarray(intrinsics, dtype=np.float64)
+    set_poses = np.asarray(set_poses, dtype=np.float64)
+    cam_idx = np.asarray(cam_idx, dtype=np.int64)
+    set_idx = np.asarray(set_idx, dtype=np.int64)
+    object_points = np.asarray(object_points, dtype=np.float64)
+    image_points = np.asarray(image_points, dtype=np.float64)
+    num_cams = len(camera_poses)
+    num_sets = len(set_poses)
+    cam_size = 6 + (NUM_INTRINSICS if refine_intrinsics else 0)
+    free_sets = np.array([s for s in range(num_sets) if s != fixed_set], dtype=np.int64)
+    set_column = np.full(num_sets, -1, dtype=np.int64)
+    set_column[free_sets] = num_cams * cam_size + 6 * np.arange(len(free_sets))
+
+    # Focal lengths and principal points are optimized in units of the initial focal length
+    # so every parameter has a similar scale
+    intrinsics_scale = np.ones_like(intrinsics)
+    intrinsics_scale[:, :4] = intrinsics[:, :1]
+
+    def unpack(x):
+        cams = x[:num_cams * cam_size].reshape(num_cams, cam_size)
+        sets = set_poses.copy()
+        sets[free_sets] = x[num_cams * cam_size:].reshape(-1, 6)
+        intr = cams[:, 6:] * intrinsics_scale if refine_intrinsics else intrinsics
+        return cams[:, :6], intr, sets
+
+    def residuals(x):
+        cams, intr, sets = unpack(x)
+        R_set = Rotation.from_rotvec(sets[:, :3]).as_matrix()
+        R_cam = Rotation.from_rotvec(cams[:, :3]).as_matrix()
+        world = np.einsum("mij,mj->mi", R_set[set_idx], object_points) + sets[set_idx, 3:]
+        cam = np.einsum("mij,mj->mi", R_cam[cam_idx], world) + cams[cam_idx, 3:]
+        return (project_points(cam, intr[cam_idx]) - image_points).ravel()
+
+    # Each observation's two residuals touch one camera block and (unless fixed) one set block
+    rows = np.arange(2 * len(cam_idx)).reshape(-1, 2)
+    cam_cols = cam_idx[:, None] * cam_size + np.arange(cam_size)
+    parts_r = [np.repeat(rows, cam_size, axis=1).ravel()]
+    parts_c = [np.tile(cam_cols, 2).ravel()]
+    moving = set_column[set_idx] >= 0
+    set_cols = set_column[set_idx[moving]][:, None] + np.arange(6)
+    parts_r.append(np.repeat(rows[moving], 6, axis=1).ravel())
+    parts_c.append(np.tile(set_cols, 2).ravel())
+    num_params = num_cams * cam_size + 6 * len(free_sets)
+    r = np.concatenate(parts_r)
+    c = np.concatenate(parts_c)
+    sparsity = coo_matrix((np.ones(len(r)), (r, c)), shape=(2 * len(cam_idx), num_params)).tocsr()
+
+    cams0 = np.hstack([camera_poses, intrinsics / intrinsics_scale]) if refine_intrinsics else camera_poses
+    x0 = np.concatenate([cams0.ravel(), set_poses[free_sets].ravel()])
+    rms_before = float(np.sqrt(np.mean(residuals(x0) ** 2) * 2))
+    start = time.perf_counter()
+    # Plain least squares converges in a few iterations from the board-pose start; a Huber
+    # pass around that solution follows only if some corners are clear outliers
+    result = least_squares(residuals, x0, jac_sparsity=sparsity, method="trf", ftol=1e-6, max_nfev=max_nfev)
+    if np.any(np.abs(result.fun) > 3 * f_scale):
+        result = least_squares(
+            residuals, result.x, jac_sparsity=sparsity, method="trf",
+            loss="huber", f_scale=f_scale, max_nfev=max_nfev,
+        )
+    rms_after = float(np.sqrt(np.mean(residuals(result.x) ** 2) * 2))
+    print(f"[Bundle] {num_cams} cameras, {num_sets} sets, {len(cam_idx)} corners: "
+          f"RMS {rms_before:.3f} -> {rms_after:.3f} px in {time.perf_counter() - start:.2f}s")
+    cams, intr, sets = unpack(result.x)
+    return cams, np.array(intr), sets, rms_before, rms_after
+
+def refine_calibration(results, views, columns, square_length, reference="img_0000.jpg",
+                       refine_intrinsics=False, f_scale=1.0):
+    """
+    Bundle-adjusts a calibration.npz-style dict with the board views of every synchronized set.
+
+    The board at the reference set defines the world frame, as it does for estimate_pose.
+    Sets seen by a single camera only constrain that camera's intrinsics, so they are
+    used only when refine_intrinsics is set.
+
+    Args:
+        results: Dict with mtx_/dist_/rvec_/tvec_ entries per camera id.
+        views: {camera id: {set name: (charuco_ids, image_points (N, 2), board rvec, board tvec)}}
+               with the board pose in that camera's frame (see CameraCalibrator.board_views).
+        columns, square_length: Board layout, for the 3D corner positions.
+
+    Returns:
+        (refined results dict, rms_before, rms_after), or None when there is nothing to refine.
+    """
+    cam_ids = sorted(cid for cid in views if f"rvec_{cid}" in results and f"mtx_{cid}" in results)
+    if len(cam_ids) < 2:
+        return None
+    seen_by = {}
+    for cid in cam_ids:
+        for name in views[cid]:
+            seen_by.setdefault(name, []).append(cid)
+    min_views = 1 if refine_intrinsics else 2
+    set_names = sorted(name for name, cams in seen_by.items() if len(cams) >= min_views or name == reference)
+    if reference not in set_names:
+        print(f"[Bundle] Reference set {reference} not observed; skipping bundle adjustment.")
+        return None
+    set_names.remove(reference)
+    set_names.insert(0, reference)
+
+    camera_poses = np.array([
+        np.concatenate([np.ravel(results[f"rvec_{cid}"]), np.ravel(results[f"tvec_{cid}"])]) for cid in cam_ids
+    ])
+    intrinsics = np.array([intrinsics_vector(results[f"mtx_{cid}"], results[f"dist_{cid}"]) for cid in cam_ids])
+    set_poses = np.zeros((len(set_names), 6))
+    cam_idx, set_idx, object_points, image_points = [], [], [], []
+    for s, name in enumerate(set_names):
+        for c, cid in enumerate(cam_ids):
+            if name not in views[cid]:
+                continue
+            ids, points, rvec, tvec = views[cid][name]
+            if s > 0 and not set_poses[s].any():
+                # Board pose in world = camera-to-world applied to the board pose in this camera
+                set_poses[s, :3], set_poses[s, 3:] = compose_inverse(camera_poses[c, :3], camera_poses[c, 3:], rvec, tvec)
+            ids = np.asarray(ids).ravel()
+            board = charuco_board_points(ids, columns) * square_length
+            cam_idx.append(np.full(len(ids), c))
+            set_idx.append(np.full(len(ids), s))
+            object_points.append(np.column_stack([board, np.zeros(len(ids))]))
+            image_points.append(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+
+    cams, intr, _, rms_before, rms_after = bundle_adjust(
+        camera_poses, intrinsics, set_poses,
+        np.concatenate(cam_idx), np.concatenate(set_idx),
+        np.concatenate(object_points), np.concatenate(image_points),
+        fixed_set=0, refine_intrinsics=refine_intrinsics, f_scale=f_scale,
+    )
+    refined = dict(results)
+    for c, cid in enumerate(cam_ids):
+        refined[f"rvec_{cid}"] = cams[c, :3].reshape(3, 1)
+        refined[f"tvec_{cid}"] = cams[c, 3:].reshape(3, 1)
+        if refine_intrinsics:
+            refined[f"mtx_{cid}"], refined[f"dist_{cid}"] = intrinsics_matrices(intr[c])
+    return refined, rms_before, rms_after
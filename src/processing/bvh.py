@@ -0,0 +1,249 @@
+
+import os
+import numpy as np
+
+from processing.skeleton import BODY_25_BONES, BODY_25_NAMES, SkeletonFitter
+from processing.gaps import hold_missing, joint_mask_to_channels
+
+# T-pose direction of every BODY_25 bone (parent -> child): Y up, facing +Z, actor's right is -X
+BODY_25_REST_DIRECTIONS = {
+    (8, 1): (0, 1, 0), (1, 0): (0, 1, 0.2),
+    (1, 2): (-1, 0, 0), (2, 3): (-1, 0, 0), (3, 4): (-1, 0, 0),
+    (1, 5): (1, 0, 0), (5, 6): (1, 0, 0), (6, 7): (1, 0, 0),
+    (8, 9): (-1, 0, 0), (9, 10): (0, -1, 0), (10, 11): (0, -1, 0),
+    (8, 12): (1, 0, 0), (12, 13): (0, -1, 0), (13, 14): (0, -1, 0),
+    (0, 15): (-0.5, 0.5, 0), (15, 17): (-1, 0, -0.5),
+    (0, 16): (0.5, 0.5, 0), (16, 18): (1, 0, -0.5),
+    (14, 19): (0, -0.5, 1), (19, 20): (1, 0, 0), (14, 21): (0, -1, -0.3),
+    (11, 22): (0, -0.5, 1), (22, 23): (-1, 0, 0), (11, 24): (0, -1, -0.3),
+}
+
+
+def _normalize(v):
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.maximum(norm, 1e-12), norm[..., 0]
+
+def _hierarchy(bones):
+    """Root joint, {joint: parent}, {joint: [children]} and parents-first joint order."""
+    parent_of = {child: parent for parent, child in bones}
+    children = {}
+    for parent, child in bones:
+        children.setdefault(parent, []).append(child)
+    root = next(p for p, _ in bones if p not in parent_of)
+    order = [root]
+    for joint in order:
+        order.extend(children.get(joint, []))
+    return root, parent_of, children, order
+
+def swing_rotation(a, b):
+    """
+    Batched minimal rotation taking unit vectors a onto b.
+
+    Args:
+        a, b: (..., 3) unit vectors.
+
+    Returns:
+        (..., 3, 3) rotation matrices. Opposite vectors rotate 180 degrees about a perpendicular axis.
+    """
+    v = np.cross(a, b)
+    c = np.sum(a * b, axis=-1)
+    vx = np.zeros(v.shape + (3,))
+    vx[..., 0, 1], vx[..., 0, 2] = -v[..., 2], v[..., 1]
+    vx[..., 1, 0], vx[..., 1, 2] = v[..., 2], -v[..., 0]
+    vx[..., 2, 0], vx[..., 2, 1] = -v[..., 1], v[..., 0]
+    opposite = c < -1 + 1e-9
+    scale = 1.0 / np.where(opposite, 1.0, 1.0 + c)
+    R = np.eye(3) + vx + (vx @ vx) * scale[..., None, None]
+    if np.any(opposite):
+        axis = np.cross(a[opposite], [1.0, 0.0, 0.0])
+        small = np.linalg.norm(axis, axis=-1) < 1e-6
+        axis[small] = np.cross(a[opposite][small], [0.0, 1.0, 0.0])
+        axis, _ = _normalize(axis)
+        R[opposite] = 2 * axis[..., :, None] * axis[..., None, :] - np.eye(3)
+    return R
+
+def _frame(primary, secondary):
+    """Orthonormal basis (as matrix columns) with x along primary and y in the primary/secondary plane."""
+    x, _ = _normalize(primary)
+    z, _ = _normalize(np.cross(x, secondary))
+    y = np.cross(z, x)
+    return np.stack([x, y, z], axis=-1)
+
+def align_rotation(rest, observed):
+    """
+    Batched two-vector (TRIAD) alignment of a joint with several children.
+
+    The first child direction is matched exactly; the remaining children fix the roll
+    (for three or more, the line from the second to the last child, e.g. hip to hip).
+
+    Args:
+        rest: (K, 3) unit vectors, K >= 2.
+        observed: (frames, K, 3) unit vectors.
+
+    Returns:
+        (frames, 3, 3) rotation matrices.
+    """
+    def secondary(dirs):
+        return dirs[..., -1, :] - dirs[..., 1, :] if dirs.shape[-2] > 2 else dirs[..., 1, :]
+
+    rest_basis = _frame(rest[0], secondary(rest))
+    observed_basis = _frame(observed[:, 0], secondary(observed))
+    return observed_basis @ rest_basis.T
+
+def solve_rotations(points, bones=BODY_25_BONES, rest_directions=BODY_25_REST_DIRECTIONS):
+    """
+    Local joint rotations that pose the rest skeleton like the given positions, vectorized over frames.
+
+    Joints with one child get the minimal swing on top of their parent's rotation (twist is
+    inherited); joints with several children are aligned to them with align_rotation.
+    Missing or zero-length bones keep their rest direction.
+
+    Args:
+        points: (frames, joints, 3) positions (use hold_missing first for masked joints).
+
+    Returns:
+        (frames, joints, 3, 3) local rotation matrices (identity for leaf joints).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    num_frames, num_joints = points.shape[:2]
+    root, parent_of, children, order = _hierarchy(bones)
+
+    identity = np.broadcast_to(np.eye(3), (num_frames, 3, 3))
+    local_rot = np.tile(np.eye(3), (num_frames, num_joints, 1, 1))
+    global_rot = {}
+    for joint in order:
+        parent_rot = global_rot[parent_of[joint]] if joint in parent_of else identity
+        kids = children.get(joint, [])
+        if not kids:
+            continue
+
+        rest, _ = _normalize(np.array([rest_directions[(joint, k)] for k in kids], dtype=np.float64))
+        observed, length = _normalize(points[:, kids] - points[:, joint][:, None])
+        # Bones with no data point where the parent already takes them
+        expected = np.einsum("fij,kj->fki", parent_rot, rest)
+        observed = np.where((length > 1e-9)[..., None], observed, expected)
+
+        if len(kids) == 1:
+            rot = swing_rotation(expected[:, 0], observed[:, 0]) @ parent_rot
+        else:
+            rot = align_rotation(rest, observed)
+        global_rot[joint] = rot
+        local_rot[:, joint] = parent_rot.transpose(0, 2, 1) @ rot
+    return local_rot
+
+def rest_offsets(lengths, bones=BODY_25_BONES, rest_directions=BODY_25_REST_DIRECTIONS, num_joints=25):
+    """(joints, 3) offset of every joint from its parent in the rest pose; bones never seen get zero length."""
+    offsets = np.zeros((num_joints, 3))
+    for (parent, child), length in zip(bones, lengths):
+        direction, _ = _normalize(np.asarray(rest_directions[(parent, child)], dtype=np.float64))
+        offsets[child] = direction * (length if np.isfinite(length) else 0.0)
+    return offsets
+
+def forward_kinematics(local_rot, root_positions, offsets, bones=BODY_25_BONES):
+    """Joint positions (frames, joints, 3) of a posed rest skeleton."""
+    root, parent_of, _, order = _hierarchy(bones)
+    num_frames, num_joints = local_rot.shape[:2]
+    global_rot = np.zeros_like(local_rot)
+    positions = np.zeros((num_frames, num_joints, 3))
+    for joint in order:
+        if joint == root:
+            global_rot[:, joint] = local_rot[:, joint]
+            positions[:, joint] = root_positions
+            continue
+        parent = parent_of[joint]
+        positions[:, joint] = positions[:, parent] + global_rot[:, parent] @ offsets[joint]
+        global_rot[:, joint] = global_rot[:, parent] @ local_rot[:, joint]
+    return positions
+
+def matrix_to_euler_zxy(R):
+    """Batched R = Rz(a) @ Rx(b) @ Ry(c) decomposition; returns (..., 3) degrees as (a, b, c)."""
+    b = np.arcsin(np.clip(R[..., 2, 1], -1.0, 1.0))
+    a = np.arctan2(-R[..., 0, 1], R[..., 1, 1])
+    c = np.arctan2(-R[..., 2, 0], R[..., 2, 2])
+    return np.degrees(np.stack([a, b, c], axis=-1))
+
+def euler_zxy_to_matrix(angles):
+    """Inverse of matrix_to_euler_zxy."""
+    a, b, c = np.radians(np.moveaxis(np.asarray(angles, dtype=np.float64), -1, 0))
+    ca, sa, cb, sb, cc, sc = np.cos(a), np.sin(a), np.cos(b), np.sin(b), np.cos(c), np.sin(c)
+    zero, one = np.zeros_like(a), np.ones_like(a)
+    Rz = np.stack([ca, -sa, zero, sa, ca, zero, zero, zero, one], -1).reshape(a.shape + (3, 3))
+    Rx = np.stack([one, zero, zero, zero, cb, -sb, zero, sb, cb], -1).reshape(a.shape + (3, 3))
+    Ry = np.stack([cc, zero, sc, zero, one, zero, -sc, zero, cc], -1).reshape(a.shape + (3, 3))
+    return Rz @ Rx @ Ry
+
+def write_bvh(filename, times, points, valid=None, bones=BODY_25_BONES, names=BODY_25_NAMES, scale=100.0):
+    """
+    Writes one track as a BVH with a rest pose built from the take's median bone lengths.
+
+    Args:
+        times: (frames,) timestamps; the median interval becomes the BVH frame time.
+        points: (frames, joints, 3) positions in world units.
+        valid: Optional (frames, joints) mask. Masked joints hold their nearest valid position.
+        scale: World units to BVH units (100 turns metres into centimetres).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    num_frames, num_joints = points.shape[:2]
+    if valid is None:
+        valid = np.ones((num_frames, num_joints), dtype=bool)
+    lengths = SkeletonFitter(bones).estimate_lengths(points, valid)
+    held = hold_missing(points.reshape(num_frames, -1), joint_mask_to_channels(valid)).reshape(points.shape)
+
+    local_rot = solve_rotations(held, bones)
+    offsets = rest_offsets(lengths, bones, num_joints=num_joints) * scale
+    root, _, children, _ = _hierarchy(bones)
+
+    lines = ["HIERARCHY"]
+    channel_order = []
+
+    def emit(joint, depth):
+        pad = "  " * depth
+        if joint == root:
+            lines.append(f"ROOT {names[joint]}")
+            lines.append("{")
+            lines.append(f"{pad}  OFFSET 0.000000 0.000000 0.000000")
+            lines.append(f"{pad}  CHANNELS 6 Xposition Yposition Zposition Zrotation Xrotation Yrotation")
+        else:
+            lines.append(f"{pad}JOINT {names[joint]}")
+            lines.append(f"{pad}{{")
+            lines.append(f"{pad}  OFFSET " + " ".join(f"{v:.6f}" for v in offsets[joint]))
+            lines.append(f"{pad}  CHANNELS 3 Zrotation Xrotation Yrotation")
+        channel_order.append(joint)
+        kids = children.get(joint, [])
+        for child in kids:
+            emit(child, depth + 1)
+        if not kids:
+            lines.append(f"{pad}  End Site")
+            lines.append(f"{pad}  {{")
+            lines.append(f"{pad}    OFFSET 0.000000 0.000000 0.000000")
+            lines.append(f"{pad}  }}")
+        lines.append(f"{pad}}}")
+
+    emit(root, 0)
+
+    frame_time = float(np.median(np.diff(times))) if len(times) > 1 else 1.0 / 30.0
+    euler = matrix_to_euler_zxy(local_rot[:, channel_order])
+    motion = np.concatenate([held[:, root] * scale, euler.reshape(num_frames, -1)], axis=1)
+
+    with open(filename, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+        f.write("MOTION\n")
+        f.write(f"Frames: {num_frames}\n")
+        f.write(f"Frame Time: {frame_time:.6f}\n")
+        np.savetxt(f, motion, fmt="%.4f")
+    print(f"[Export] Exported {filename}")
+
+def verify_bvh(filename, num_joints=25):
+    if not os.path.exists(filename) or os.path.getsize(filename) <= 0:
+        return False
+    try:
+        with open(filename) as f:
+            text = f.read()
+        header, _, motion = text.partition("MOTION\n")
+        joints = header.count("ROOT ") + header.count("JOINT ")
+        rows = [line for line in motion.splitlines()[2:] if line.strip()]
+        expected_cols = 6 + (num_joints - 1) * 3
+        return bool(joints == num_joints and rows and len(rows[0].split()) == expected_cols)
+    except Exception as e:
+        print(f"[Export] BVH verification error: {e}")
+        return False
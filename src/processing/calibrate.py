@@ -3,10 +3,35 @@ import cv2
 import cv2.aruco as aruco
 import numpy as np
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from processing.detection_cache import DetectionCache, file_digest
+from processing.frame_selection import board_view_features, coverage_cells, select_diverse_frames
+
+# Calibrators built inside pool workers, one per board/detection setup (cv2 boards cannot be pickled)
+_WORKER_CALIBRATORS = {}
+
+
+def _detect_image_job(job):
+    image_path, options, candidates = job
+    key = tuple(sorted(options.items()))
+    if key not in _WORKER_CALIBRATORS:
+        _WORKER_CALIBRATORS[key] = CameraCalibrator(workers=1, **options)
+    return image_path, _WORKER_CALIBRATORS[key].detect_image(image_path, candidates)
 
 
 class CameraCalibrator:
-    def __init__(self, rows=7, columns=5, square_length=0.04, marker_length=0.02):
+    def __init__(self, rows=7, columns=5, square_length=0.04, marker_length=0.02, workers=None,
+                 pyramid_scale=1.0, report_speedup=False, cache_dir=None):
+        """
+        workers: Processes used for marker detection (None = CPU count, 1 = in this process)
+        pyramid_scale: Markers are searched on the image resized by this factor and refined
+                       at full resolution (1.0 = detect at full resolution)
+        report_speedup: Also time full-resolution detection per image to report the pyramid speedup
+        cache_dir: Folder for per-image detections keyed by file hash and board config
+                   (None = no persistent cache)
+        """
         self.CHARUCOBOARD_ROWCOUNT = rows
         self.CHARUCOBOARD_COLCOUNT = columns
         self.square_length = square_length
@@ -23,7 +48,38 @@ class CameraCalibrator:
         self.dictionary_name = "DICT_6X6_250"
         self.ARUCO_DICT = aruco.getPredefinedDictionary(aruco.DICT_6X6_250)
         self.board = self._make_board(self.ARUCO_DICT, legacy=False)
+        self.board_key = (self.dictionary_name, False)
         self.blur_threshold = 80.0
+        self.workers = workers or os.cpu_count() or 1
+        self.pyramid_scale = float(pyramid_scale)
+        self.report_speedup = bool(report_speedup)
+        self.subpix_criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+        self._boards = {}
+        # image path -> detect_image result, reused by intrinsics and extrinsics
+        self.detections = {}
+        self.cache = DetectionCache(cache_dir, self.detection_config) if cache_dir else None
+        # frame index -> detection of the last scanned calibration video
+        self.video_detections = {}
+
+    @property
+    def detection_config(self):
+        """Settings that change detection results; the persistent cache is keyed by them."""
+        return {
+            "rows": self.CHARUCOBOARD_ROWCOUNT,
+            "columns": self.CHARUCOBOARD_COLCOUNT,
+            "square_length": self.square_length,
+            "marker_length": self.marker_length,
+            "pyramid_scale": self.pyramid_scale,
+        }
+
+    @property
+    def options(self):
+        """Constructor arguments that pool workers need to reproduce this calibrator's detections."""
+        return dict(self.detection_config, report_speedup=self.report_speedup)
+
+    def board_candidates(self):
+        """Every (dictionary name, legacy layout) pair tried during auto-detection."""
+        return [(dict_name, legacy) for dict_name, _ in self.dictionary_candidates for legacy in (False, True)]
 
     def sharpness_score(self, gray):
         return float(cv2.Laplacian(gray, cv2.CV_64F).var())
@@ -57,51 +113,163 @@ class CameraCalibrator:
             return None, None
         return None, None
 
-    def _detect_charuco_with_board(self, gray, dictionary, board):
-        corners, ids, _ = self._detect_markers(gray, dictionary)
-        c_corners, c_ids = self._interpolate_charuco(gray, corners, ids, board)
-        return corners, ids, c_corners, c_ids
+    def _refine_corners(self, gray, corners, window):
+        """cornerSubPix on (N, 1, 2) points of the full-resolution image; only a window around each point is read."""
+        points = np.ascontiguousarray(corners, dtype=np.float32).reshape(-1, 1, 2)
+        if len(points):
+            cv2.cornerSubPix(gray, points, (window, window), (-1, -1), self.subpix_criteria)
+        return points
+
+    def _detect_markers_pyramid(self, gray, small, dictionary):
+        """
+        Finds markers on the downscaled image, maps them back and refines them at full resolution.
+        Falls back to full-resolution detection when the coarse pass finds nothing (e.g. a distant board).
+        """
+        corners, ids, _ = self._detect_markers(small, dictionary)
+        if ids is None or len(corners) == 0:
+            corners, ids, _ = self._detect_markers(gray, dictionary)
+            return corners, ids
+        scale = self.pyramid_scale
+        coarse = (np.concatenate([np.asarray(c, dtype=np.float32).reshape(-1, 2) for c in corners]) + 0.5) / scale - 0.5
+        window = max(3, int(np.ceil(2.0 / scale)))
+        refined = self._refine_corners(gray, coarse, window).reshape(-1, 1, 4, 2)
+        return tuple(refined), ids
+
+    def _detect_boards(self, gray, small, candidates):
+        boards = {}
+        markers = {}
+        for dict_name, legacy in candidates:
+            dictionary, board = self._board_for(dict_name, legacy)
+            if dict_name not in markers:
+                if small is None:
+                    corners, ids, _ = self._detect_markers(gray, dictionary)
+                else:
+                    corners, ids = self._detect_markers_pyramid(gray, small, dictionary)
+                markers[dict_name] = (corners, ids)
+            corners, ids = markers[dict_name]
+            c_corners, c_ids = self._interpolate_charuco(gray, corners, ids, board)
+            if small is not None and c_corners is not None:
+                c_corners = self._refine_corners(gray, c_corners, 5)
+            boards[(dict_name, legacy)] = (corners, ids, c_corners, c_ids)
+        return boards
+
+    def _board_for(self, dict_name, legacy):
+        key = (dict_name, legacy)
+        if key not in self._boards:
+            dictionary = aruco.getPredefinedDictionary(getattr(aruco, dict_name))
+            self._boards[key] = (dictionary, self._make_board(dictionary, legacy=legacy))
+        return self._boards[key]
+
+    def detect_image(self, image_path, candidates):
+        """
+        Decodes one image straight to grayscale and detects every candidate board in it.
+        Markers are detected once per dictionary and shared by both layouts.
+
+        Returns:
+            None if the image cannot be read, else a dict with "size", "sharpness",
+            "detect_seconds", "full_seconds" (full-resolution timing, only with report_speedup
+            in pyramid mode) and "boards": {(dict_name, legacy): (corners, ids, charuco_corners, charuco_ids)}.
+        """
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+        result = {"size": gray.shape[::-1], "sharpness": self.sharpness_score(gray)}
+
+        start = time.perf_counter()
+        small = None
+        if self.pyramid_scale < 1.0:
+            small = cv2.resize(gray, None, fx=self.pyramid_scale, fy=self.pyramid_scale, interpolation=cv2.INTER_AREA)
+        result["boards"] = self._detect_boards(gray, small, candidates)
+        result["detect_seconds"] = time.perf_counter() - start
+
+        if self.report_speedup and small is not None:
+            start = time.perf_counter()
+            self._detect_boards(gray, None, candidates)
+            result["full_seconds"] = time.perf_counter() - start
+        return result
+
+    def detect_images(self, image_files, candidates):
+        """
+        Runs detect_image over many images on a process pool and adds the results to self.detections.
+        Images already detected for all candidates, in this run or in the persistent cache,
+        are not decoded again.
+
+        Returns:
+            {image path: detect_image result} for the requested files.
+        """
+        def missing(fname):
+            result = self.detections.get(fname)
+            return result is None or not all(c in result["boards"] for c in candidates)
+
+        todo = [fname for fname in image_files if missing(fname)]
+        digests = {}
+        if self.cache is not None and todo:
+            for fname in todo:
+                if not os.path.exists(fname):
+                    continue
+                digests[fname] = file_digest(fname)
+                cached = self.cache.load(digests[fname])
+                if cached is not None:
+                    previous = self.detections.get(fname)
+                    if previous is not None:
+                        cached["boards"].update(previous["boards"])
+                    self.detections[fname] = cached
+            reused = len(todo)
+            todo = [fname for fname in todo if missing(fname)]
+            reused -= len(todo)
+            if reused:
+                print(f"[Calibration] Reused cached detections for {reused} image(s), detecting {len(todo)}.")
+
+        if len(todo) > 1 and self.workers > 1:
+            jobs = [(fname, self.options, list(candidates)) for fname in todo]
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                results = list(pool.map(_detect_image_job, jobs))
+        else:
+            results = [(fname, self.detect_image(fname, candidates)) for fname in todo]
+
+        for fname, result in results:
+            previous = self.detections.get(fname)
+            if previous is not None and result is not None:
+                previous["boards"].update(result["boards"])
+            else:
+                self.detections[fname] = result
+            if fname in digests and self.detections[fname] is not None:
+                self.cache.save(digests[fname], self.detections[fname])
+        return {fname: self.detections.get(fname) for fname in image_files}
 
     def _select_board(self, image_files):
-        best = None
         sample_files = image_files[: min(len(image_files), 8)]
         print("Auto-detecting ChArUco dictionary/layout...")
+        detections = self.detect_images(sample_files, self.board_candidates())
+        return self._choose_board(detections.values())
 
-        for dict_name, dict_id in self.dictionary_candidates:
-            dictionary = aruco.getPredefinedDictionary(dict_id)
-            for legacy in (False, True):
-                board = self._make_board(dictionary, legacy=legacy)
-                marker_hits = 0
-                charuco_hits = 0
-                max_corners = 0
-
-                for fname in sample_files:
-                    img = cv2.imread(fname)
-                    if img is None:
-                        continue
-                    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                    corners, ids, c_corners, c_ids = self._detect_charuco_with_board(gray, dictionary, board)
-                    marker_count = 0 if ids is None else len(ids)
-                    corner_count = 0 if c_ids is None else len(c_ids)
-                    marker_hits += marker_count
-                    charuco_hits += corner_count
-                    max_corners = max(max_corners, corner_count)
-
-                print(f"  {dict_name}, legacy={legacy}: markers={marker_hits}, charuco_corners={charuco_hits}")
-                score = (charuco_hits, marker_hits, max_corners)
-                if best is None or score > best["score"]:
-                    best = {
-                        "score": score,
-                        "dict_name": dict_name,
-                        "dictionary": dictionary,
-                        "legacy": legacy,
-                        "board": board,
-                    }
+    def _choose_board(self, results):
+        """Picks the candidate board with the most ChArUco corners over detect_image results."""
+        best = None
+        results = list(results)
+        for dict_name, legacy in self.board_candidates():
+            marker_hits = 0
+            charuco_hits = 0
+            max_corners = 0
+            for result in results:
+                if result is None:
+                    continue
+                corners, ids, c_corners, c_ids = result["boards"][(dict_name, legacy)]
+                marker_count = 0 if ids is None else len(ids)
+                corner_count = 0 if c_ids is None else len(c_ids)
+                marker_hits += marker_count
+                charuco_hits += corner_count
+                max_corners = max(max_corners, corner_count)
+
+            print(f"  {dict_name}, legacy={legacy}: markers={marker_hits}, charuco_corners={charuco_hits}")
+            score = (charuco_hits, marker_hits, max_corners)
+            if best is None or score > best["score"]:
+                best = {"score": score, "dict_name": dict_name, "legacy": legacy}
 
         if best and best["score"][0] > 0:
             self.dictionary_name = best["dict_name"]
-            self.ARUCO_DICT = best["dictionary"]
-            self.board = best["board"]
+            self.ARUCO_DICT, self.board = self._board_for(best["dict_name"], best["legacy"])
+            self.board_key = (best["dict_name"], best["legacy"])
             print(f"Selected {best['dict_name']} with legacy={best['legacy']}.")
             return True
 
@@ -122,17 +290,20 @@ class CameraCalibrator:
 
         per_image_counts = []
         sharpness_scores = []
+        detections = self.detect_images(image_files, [self.board_key])
         for fname in image_files:
-            img = cv2.imread(fname)
-            if img is None: continue
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            imsize = gray.shape[::-1]
-            sharpness = self.sharpness_score(gray)
-            sharpness_scores.append(sharpness)
-            corners, ids, c_corners, c_ids = self._detect_charuco_with_board(gray, self.ARUCO_DICT, self.board)
+            result = detections[fname]
+            if result is None: continue
+            imsize = result["size"]
+            sharpness_scores.append(result["sharpness"])
+            corners, ids, c_corners, c_ids = result["boards"][self.board_key]
             marker_count = 0 if ids is None else len(ids)
             corner_count = 0 if c_ids is None else len(c_ids)
             per_image_counts.append((os.path.basename(fname), marker_count, corner_count))
+            if "full_seconds" in result:
+                speedup = result["full_seconds"] / max(result["detect_seconds"], 1e-9)
+                print(f"  {os.path.basename(fname)}: pyramid {result['detect_seconds'] * 1000:.1f} ms vs "
+                      f"full-res {result['full_seconds'] * 1000:.1f} ms ({speedup:.1f}x), charuco_corners={corner_count}")
             if c_ids is not None and len(c_ids) > 6:
                 all_corners.append(c_corners)
                 all_ids.append(c_ids)
@@ -149,6 +320,116 @@ class CameraCalibrator:
                 print(f"  {fname}: markers={marker_count}, charuco_corners={corner_count}")
             return None
 
+        return self._solve_intrinsics(all_corners, all_ids, imsize)
+
+    def scan_video(self, video_path, scan_fps=10.0, pose_frame=0):
+        """
+        Decodes a board video once and detects the board in its sharp frames.
+
+        Frames between scan steps are only grabbed, not decoded. The board is auto-detected
+        on the first 8 frames showing corners; after that only the selected board is searched.
+        pose_frame is always detected, even when blurry, so extrinsics can use it.
+
+        Returns:
+            {frame index: detect_image-style result} for frames with ChArUco corners and pose_frame.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"Could not open video {video_path}")
+            return {}
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        stride = max(1, int(round(fps / scan_fps))) if scan_fps else 1
+
+        def has_corners(result):
+            return any(c_ids is not None and len(c_ids) > 6 for _, _, _, c_ids in result["boards"].values())
+
+        candidates = self.board_candidates()
+        locked = False
+        found = {}
+        index = -1
+        scanned = blurry = 0
+        start = time.perf_counter()
+        print(f"Scanning {os.path.basename(video_path)} for board views (every {stride} frame(s))...")
+        while True:
+            index += 1
+            if index % stride and index != pose_frame:
+                if not cap.grab():
+                    break
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            scanned += 1
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            sharpness = self.sharpness_score(gray)
+            if sharpness < self.blur_threshold and index != pose_frame:
+                blurry += 1
+                continue
+            small = None
+            if self.pyramid_scale < 1.0:
+                small = cv2.resize(gray, None, fx=self.pyramid_scale, fy=self.pyramid_scale, interpolation=cv2.INTER_AREA)
+            result = {"size": gray.shape[::-1], "sharpness": sharpness,
+                      "boards": self._detect_boards(gray, small, candidates)}
+            if index == pose_frame or has_corners(result):
+                found[index] = result
+            if not locked and sum(has_corners(r) for r in found.values()) >= 8:
+                locked = self._choose_board(found.values())
+                if locked:
+                    candidates = [self.board_key]
+        cap.release()
+        if not locked and found:
+            self._choose_board(found.values())
+
+        print(f"Scanned {scanned} of {index} frames in {time.perf_counter() - start:.1f}s: "
+              f"{blurry} blurry, {sum(has_corners(r) for r in found.values())} with board corners.")
+        return found
+
+    def calibrate_video(self, video_path, max_frames=40, scan_fps=10.0, pose_frame=0):
+        """
+        Intrinsics from a continuous board video.
+
+        After scan_video, a bounded subset of views that differ in board pose and image
+        coverage is chosen (select_diverse_frames); only that subset goes to the solver.
+
+        Returns:
+            (camera_matrix, dist_coeffs, ret) like calibrate_intrinsics, or None.
+            Frame detections stay in self.video_detections for estimate_video_pose.
+        """
+        self.video_detections = self.scan_video(video_path, scan_fps, pose_frame)
+        views = []
+        for index, result in sorted(self.video_detections.items()):
+            if self.board_key not in result["boards"]:
+                continue
+            _, _, c_corners, c_ids = result["boards"][self.board_key]
+            if c_ids is None or len(c_ids) <= 6:
+                continue
+            features = board_view_features(
+                c_corners, c_ids, self.CHARUCOBOARD_COLCOUNT, self.CHARUCOBOARD_ROWCOUNT, result["size"]
+            )
+            if features is not None:
+                views.append((index, features, coverage_cells(c_corners, result["size"]), len(c_ids)))
+        if not views:
+            print("No usable board views found in the video.")
+            return None
+
+        chosen = select_diverse_frames(
+            [v[1] for v in views], [v[2] for v in views], [v[3] for v in views], max_frames=max_frames
+        )
+        print(f"Selected {len(chosen)} of {len(views)} board views for calibration.")
+        all_corners = []
+        all_ids = []
+        for i in chosen:
+            _, _, c_corners, c_ids = self.video_detections[views[i][0]]["boards"][self.board_key]
+            all_corners.append(c_corners)
+            all_ids.append(c_ids)
+        imsize = self.video_detections[views[0][0]]["size"]
+        return self._solve_intrinsics(all_corners, all_ids, imsize)
+
+    def estimate_video_pose(self, frame_index, camera_matrix, dist_coeffs):
+        """Board pose in one frame of the last calibrate_video call."""
+        return self._pose_from_detection(self.video_detections.get(frame_index), camera_matrix, dist_coeffs)
+
+    def _solve_intrinsics(self, all_corners, all_ids, imsize):
         print("Calibrating camera...")
         # Note: calibrateCameraCharuco still exists in both versions but behavior slightly varies
         try:
@@ -166,10 +447,36 @@ class CameraCalibrator:
     def estimate_pose(self, image_path, camera_matrix, dist_coeffs):
         """
         Estimates the camera pose relative to the board (World Origin).
+        Reuses the detection from calibrate_intrinsics when the image was part of it.
         """
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        corners, ids, c_corners, c_ids = self._detect_charuco_with_board(gray, self.ARUCO_DICT, self.board)
+        result = self.detect_images([image_path], [self.board_key])[image_path]
+        return self._pose_from_detection(result, camera_matrix, dist_coeffs)
+
+    def board_views(self, image_files, camera_matrix, dist_coeffs):
+        """
+        Board observations of already-detected images for bundle adjustment.
+
+        Returns:
+            {image basename: (charuco_ids (N,), corners (N, 2), board rvec, board tvec)} for
+            every image with a board pose, the pose being in this camera's frame.
+        """
+        views = {}
+        for fname in image_files:
+            result = self.detections.get(fname)
+            rvec, tvec = self._pose_from_detection(result, camera_matrix, dist_coeffs)
+            if rvec is None:
+                continue
+            _, _, c_corners, c_ids = result["boards"][self.board_key]
+            views[os.path.basename(fname)] = (
+                np.asarray(c_ids).ravel(), np.asarray(c_corners, dtype=np.float64).reshape(-1, 2),
+                np.ravel(rvec), np.ravel(tvec),
+            )
+        return views
+
+    def _pose_from_detection(self, result, camera_matrix, dist_coeffs):
+        if result is None or self.board_key not in result["boards"]:
+            return None, None
+        corners, ids, c_corners, c_ids = result["boards"][self.board_key]
         if c_ids is not None and len(c_ids) > 6:
             valid, rvec, tvec = aruco.estimatePoseCharucoBoard(
                 c_corners, c_ids, self.board, camera_matrix, dist_coeffs, None, None)
@@ -0,0 +1,143 @@
+
+import hashlib
+import os
+
+import numpy as np
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-1 of a file's bytes, so renamed or re-copied images still hit the cache."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    def __init__(self, directory, board_config):
+        """
+        Board detections stored per image on disk, one .npz per image content and board config.
+
+        directory: Cache folder (created on first save)
+        board_config: Dict of everything that changes detections (board geometry, pyramid scale, ...);
+                      changing any value starts a fresh set of entries
+        """
+        self.directory = directory
+        key = repr(sorted(board_config.items())).encode("utf-8")
+        self.config_key = hashlib.sha1(key).hexdigest()[:12]
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}_{self.config_key}.npz")
+
+    def load(self, digest):
+        """Returns the cached detect_image-style result for an image digest, or None."""
+        path = self._path(digest)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            with np.load(path) as data:
+                result = {
+                    "size": tuple(int(v) for v in data["size"]),
+                    "sharpness": float(data["sharpness"]),
+                    "boards": {},
+                }
+                for name in data.files:
+                    if not name.endswith("__corners"):
+                        continue
+                    dict_name, legacy, _ = name.split("__")
+                    prefix = f"{dict_name}__{legacy}__"
+
+                    def optional(field):
+                        return data[prefix + field] if prefix + field in data.files else None
+
+                    corners = tuple(data[name])
+                    result["boards"][(dict_name, legacy == "1")] = (
+                        corners, optional("ids"), optional("charuco_corners"), optional("charuco_ids")
+                    )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Calibration] Ignoring unreadable detection cache {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def save(self, digest, result):
+        """Writes a detect_image result (all boards it contains) atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {"size": np.asarray(result["size"]), "sharpness": np.float64(result["sharpness"])}
+        for (dict_name, legacy), (corners, ids, c_corners, c_ids) in result["boards"].items():
+            prefix = f"{dict_name}__{int(legacy)}__"
+            arrays[prefix + "corners"] = np.asarray(
+                [np.asarray(c, dtype=np.float32).reshape(1, 4, 2) for c in corners], dtype=np.float32
+            ).reshape(-1, 1, 4, 2)
+            for field, value in (("ids", ids), ("charuco_corners", c_corners), ("charuco_ids", c_ids)):
+                if value is not None:
+                    arrays[prefix + field] = np.asarray(value)
+        path = self._path(digest)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+
+class SolveCache:
+    def __init__(self, directory, config):
+        """
+        Per-camera calibration results stored on disk, one .npz per camera input, so a camera
+        whose images (or video) and settings did not change is not solved again.
+
+        directory: Cache folder (the detection cache's)
+        config: Dict of everything besides the input files that changes the solve
+                (board geometry, pyramid scale, video settings)
+        """
+        self.directory = directory
+        self.config = repr(sorted(config.items()))
+
+    def key(self, paths):
+        """Digest of the config plus the names and contents of one camera's input files."""
+        digest = hashlib.sha1(self.config.encode("utf-8"))
+        for path in paths:
+            digest.update(f"{os.path.basename(path)}:{file_digest(path)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"solve_{key}.npz")
+
+    def load(self, key):
+        """
+        Returns:
+            (results, views) saved for key, or None. results are the calibration.npz entries
+            without the camera id suffix (mtx, dist, ret, rvec, tvec); views as from board_views.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                results = {name: data[name] for name in data.files if not name.startswith("view__")}
+                views = {}
+                for name in data.files:
+                    if name.startswith("view__") and name.endswith("__ids"):
+                        prefix = name[:-len("ids")]
+                        views[name[len("view__"):-len("__ids")]] = tuple(
+                            data[prefix + field] for field in ("ids", "corners", "rvec", "tvec")
+                        )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Calibration] Ignoring unreadable solve cache {path}: {e}")
+            return None
+        return results, views
+
+    def save(self, key, results, views):
+        """Writes one camera's results and board views atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = dict(results)
+        for image, view in views.items():
+            for field, value in zip(("ids", "corners", "rvec", "tvec"), view):
+                arrays[f"view__{image}__{field}"] = np.asarray(value)
+        path = self._path(key)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
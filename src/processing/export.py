@@ -0,0 +1,106 @@
+
+import csv
+import os
+import numpy as np
+
+from processing.gaps import hold_missing, joint_mask_to_channels
+
+
+def csv_header(num_joints=25, joint_names=None):
+    """Time column plus X/Y/Z per joint; joints are Bone_0.. unless joint_names (e.g. a KeypointSchema's) are given."""
+    names = joint_names or [f"Bone_{i}" for i in range(num_joints)]
+    return ["Time"] + [f"{name}_{axis}" for name in names for axis in ["X","Y","Z"]]
+
+def _rows(times, points, valid=None):
+    """Flattens (frames, joints, 3) points into (frames, 1 + joints*3) rows, holding masked joints."""
+    points = np.asarray(points, dtype=np.float64)
+    flat = points.reshape(len(points), -1)
+    if valid is not None:
+        flat = hold_missing(flat, joint_mask_to_channels(valid))
+    return np.column_stack([np.asarray(times, dtype=np.float64), flat])
+
+def _held_curves(blendshapes):
+    """(names, values) of a (names, values, valid) face track, holding frames outside the face take."""
+    names, values, valid = blendshapes
+    values = np.asarray(values, dtype=np.float64)
+    channel_valid = np.repeat(np.asarray(valid, dtype=bool)[:, None], values.shape[1], axis=1)
+    return list(names), hold_missing(values, channel_valid)
+
+def write_csv(filename, times, points, valid=None, blendshapes=None, joint_names=None):
+    """
+    Writes one track as an Unreal Data Table CSV.
+
+    Args:
+        times: (frames,) timestamps in seconds.
+        points: (frames, joints, 3) positions.
+        valid: Optional (frames, joints) mask. Masked joints hold their nearest valid
+               position (zeros if the joint is never seen) so Unreal never snaps to the origin.
+        blendshapes: Optional (names, (frames, channels) values, (frames,) valid) face curves,
+                     appended as extra columns after the bones.
+        joint_names: Optional column name per joint (defaults to Bone_0..).
+    """
+    rows = _rows(times, points, valid)
+    header = csv_header(np.asarray(points).shape[1], joint_names)
+    if blendshapes is not None:
+        names, curves = _held_curves(blendshapes)
+        rows = np.column_stack([rows, curves])
+        header = header + names
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows.tolist())
+    print(f"[Export] Exported {filename}")
+
+def write_binary(filename, times, points, valid=None, track_id=0, blendshapes=None, joint_names=None):
+    """
+    Writes one track as a compressed .npz with times, positions, validity mask and track ID.
+    Face curves, if given, are stored unheld as blendshapes, blendshape_names and blendshape_valid.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if valid is None:
+        valid = np.ones(points.shape[:2], dtype=bool)
+    arrays = {}
+    if joint_names is not None:
+        arrays["joint_names"] = np.asarray(list(joint_names))
+    if blendshapes is not None:
+        names, values, face_valid = blendshapes
+        arrays.update(
+            blendshapes=np.asarray(values, dtype=np.float32),
+            blendshape_names=np.asarray(list(names)),
+            blendshape_valid=np.asarray(face_valid, dtype=bool),
+        )
+    np.savez_compressed(
+        filename,
+        times=np.asarray(times, dtype=np.float64),
+        points=points,
+        valid=np.asarray(valid, dtype=bool),
+        track_id=np.int64(track_id),
+        **arrays,
+    )
+    print(f"[Export] Exported {filename}")
+
+def verify_csv(filename, num_joints=25, joint_names=None):
+    if not os.path.exists(filename) or os.path.getsize(filename) <= 0:
+        return False
+    try:
+        with open(filename, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            first_row = next(reader, None)
+        # Bone columns first; face curves may follow
+        expected = csv_header(num_joints, joint_names)
+        return bool(header and first_row and header[:len(expected)] == expected and len(first_row) == len(header))
+    except Exception as e:
+        print(f"[Export] CSV verification error: {e}")
+        return False
+
+def verify_binary(filename, num_joints=25):
+    if not os.path.exists(filename) or os.path.getsize(filename) <= 0:
+        return False
+    try:
+        with np.load(filename) as data:
+            points = data["points"]
+            return bool(len(data["times"]) > 0 and points.shape[1:] == (num_joints, 3))
+    except Exception as e:
+        print(f"[Export] Binary verification error: {e}")
+        return False
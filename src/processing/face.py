@@ -0,0 +1,96 @@
+
+import csv
+import glob
+import os
+import time
+import numpy as np
+
+DAY = 86400.0
+
+
+def find_live_link_csv(directory, scene, take):
+    """Newest Live Link Face CSV named after the slate and take (the app appends its own suffixes)."""
+    pattern = os.path.join(directory, "**", f"{scene}_{take}*.csv")
+    matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+    return max(matches, key=os.path.getmtime) if matches else None
+
+def parse_timecode(timecodes, fps=60.0):
+    """
+    Converts Live Link Face "HH:MM:SS:FF[.sub]" timecodes to seconds of the day, vectorized.
+    Samples that cross midnight keep counting upwards.
+    """
+    fields = np.array([tc.strip().split(":") for tc in timecodes], dtype=np.float64).reshape(-1, 4)
+    seconds = fields[:, 0] * 3600 + fields[:, 1] * 60 + fields[:, 2] + fields[:, 3] / fps
+    wraps = np.concatenate([[0.0], np.cumsum(np.diff(seconds) < -DAY / 2)])
+    return seconds + wraps * DAY
+
+def read_live_link_csv(filename):
+    """
+    Reads a Live Link Face take.
+
+    Returns:
+        (timecodes, names, values): timecode strings, blendshape/head channel names and
+        a (samples, channels) float array.
+    """
+    with open(filename, newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        rows = [row for row in reader if len(row) == len(header)]
+    skip = {"Timecode", "BlendShapeCount"}
+    columns = [i for i, name in enumerate(header) if name not in skip]
+    timecodes = [row[header.index("Timecode")] for row in rows]
+    values = np.array([[row[i] for i in columns] for row in rows], dtype=np.float64).reshape(len(rows), len(columns))
+    return timecodes, [header[i] for i in columns], values
+
+def seconds_of_day(epoch):
+    """Local time of day (seconds) of a time.time() value, as Live Link Face stamps it."""
+    local = time.localtime(epoch)
+    return local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + (epoch % 1.0)
+
+def face_sample_times(timecode_seconds, body_start, trigger_time=None, mode="timecode", latency=0.0):
+    """
+    Places face samples on the body timeline (seconds after the first exported body frame).
+
+    Args:
+        timecode_seconds: (samples,) output of parse_timecode.
+        body_start: Wall-clock time (time.time()) of the first body frame.
+        trigger_time: Wall-clock time the start trigger was sent, needed for mode "trigger".
+        mode: "timecode" trusts the phone's time-of-day timecode (clocks in sync);
+              "trigger" starts the face take at the trigger and only uses timecode spacing.
+        latency: Extra seconds between the trigger and the first face sample.
+    """
+    timecode_seconds = np.asarray(timecode_seconds, dtype=np.float64)
+    if mode == "trigger":
+        if trigger_time is None:
+            raise ValueError("Trigger alignment needs the take's trigger_time")
+        return trigger_time + latency - body_start + (timecode_seconds - timecode_seconds[0])
+
+    offset = timecode_seconds - seconds_of_day(body_start)
+    # Face take recorded around midnight relative to the body start
+    offset = offset - DAY * np.round(offset[0] / DAY)
+    return offset + latency
+
+def interpolate_channels(times, values, target_times):
+    """
+    Linear interpolation of every channel to new times in one pass.
+
+    Args:
+        times: (samples,) increasing source times.
+        values: (samples, channels) source values.
+        target_times: (frames,) times to sample.
+
+    Returns:
+        (frames, channels) values and a (frames,) mask, False outside the source time range.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    target_times = np.asarray(target_times, dtype=np.float64)
+    if len(times) < 2:
+        return np.zeros((len(target_times), values.shape[1])), np.zeros(len(target_times), dtype=bool)
+
+    idx = np.clip(np.searchsorted(times, target_times, side="right") - 1, 0, len(times) - 2)
+    span = times[idx + 1] - times[idx]
+    w = np.clip((target_times - times[idx]) / np.where(span > 0, span, 1.0), 0.0, 1.0)[:, None]
+    out = values[idx] * (1.0 - w) + values[idx + 1] * w
+    valid = (target_times >= times[0]) & (target_times <= times[-1])
+    return out, valid
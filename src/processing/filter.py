@@ -1,5 +1,6 @@
 
 import math
+import numpy as np
 
 class LowPassFilter(object):
     def __init__(self, alpha):
@@ -78,40 +79,93 @@ class OneEuroFilter(object):
         return r / (r + 1)
 
 class MocapFilter:
-    def __init__(self, num_points=25, min_cutoff=1.0, beta=0.0):
-        self.filters = []
-        for _ in range(num_points * 3): # x, y, z for each point
-            self.filters.append(OneEuroFilter(0, 0, min_cutoff, beta))
-            
+    def __init__(self, num_points=25, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        """
+        One Euro filter over every x, y, z channel at once.
+        Missing samples are skipped and never enter the filter state.
+        """
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.reset(num_points * 3)
+
+    def reset(self, num_channels):
+        self.num_channels = num_channels
+        self.t_prev = np.zeros(num_channels)
+        self.x_prev = np.zeros(num_channels)
+        self.dx_prev = np.zeros(num_channels)
+        self.started = np.zeros(num_channels, dtype=bool)
+
+    @staticmethod
+    def smoothing_factor(dt, cutoff):
+        r = 2 * math.pi * cutoff * dt
+        return r / (r + 1)
+
+    def step(self, t, x, valid):
+        """
+        Filters one sample for every channel.
+
+        Args:
+            t: Timestamp in seconds.
+            x: (channels,) values.
+            valid: (channels,) mask. Invalid channels keep their state untouched.
+
+        Returns:
+            (channels,) filtered values; invalid channels return their input unchanged.
+        """
+        started = self.started
+        dt = np.where(started, t - self.t_prev, 1.0 / 30.0)
+        dt = np.where(dt > 0, dt, 1.0 / 30.0)
+
+        dx = np.where(started, (x - self.x_prev) / dt, 0.0)
+        a_d = self.smoothing_factor(dt, self.d_cutoff)
+        edx = np.where(started, a_d * dx + (1.0 - a_d) * self.dx_prev, dx)
+        cutoff = self.min_cutoff + self.beta * np.abs(edx)
+        a = self.smoothing_factor(dt, cutoff)
+        x_filtered = np.where(started, a * x + (1.0 - a) * self.x_prev, x)
+
+        self.t_prev = np.where(valid, t, self.t_prev)
+        self.x_prev = np.where(valid, x_filtered, self.x_prev)
+        self.dx_prev = np.where(valid, edx, self.dx_prev)
+        self.started = started | valid
+        return np.where(valid, x_filtered, x)
+
     def filter_frame(self, t, points_3d):
         """
-        points_3d: List of [x, y, z] or flatted list
+        points_3d: List of [x, y, z] or None for a missing joint.
+        Returns the filtered list; missing joints stay None.
         """
-        filtered = []
-        # Flatten input if needed or iterate
-        # Assumes points_3d is list of [x, y, z]
-        
-        flat_points = []
-        for p in points_3d:
-            if p is None:
-                flat_points.extend([0.0, 0.0, 0.0])
-            else:
-                flat_points.extend(p)
-
-        if len(flat_points) != len(self.filters):
-            self.filters = [
-                OneEuroFilter(t, flat_points[i], self.filters[0].min_cutoff, self.filters[0].beta)
-                for i in range(len(flat_points))
-            ]
-            
-        filtered_flat = []
-        for i, val in enumerate(flat_points):
-            f_val = self.filters[i](t, val)
-            filtered_flat.append(f_val)
-            
-        # Re-structure
-        filtered_points = []
-        for i in range(0, len(filtered_flat), 3):
-            filtered_points.append(filtered_flat[i:i+3])
-            
-        return filtered_points
+        present = np.array([p is not None for p in points_3d], dtype=bool)
+        flat = np.zeros((len(points_3d), 3))
+        if present.any():
+            flat[present] = [p for p in points_3d if p is not None]
+
+        if flat.size != self.num_channels:
+            self.reset(flat.size)
+
+        filtered = self.step(t, flat.ravel(), np.repeat(present, 3)).reshape(-1, 3)
+        return [filtered[i].tolist() if ok else None for i, ok in enumerate(present)]
+
+    def filter_array(self, times, data, valid=None):
+        """
+        Filters a whole take.
+
+        Args:
+            times: (frames,) timestamps.
+            data: (frames, channels) values.
+            valid: Optional (frames, channels) mask; masked samples pass through and are excluded from state.
+
+        Returns:
+            (frames, channels) filtered values.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        if valid is None:
+            valid = np.ones(data.shape, dtype=bool)
+        valid = np.asarray(valid, dtype=bool)
+        if data.shape[1] != self.num_channels:
+            self.reset(data.shape[1])
+
+        out = np.empty_like(data)
+        for f in range(data.shape[0]):
+            out[f] = self.step(times[f], data[f], valid[f])
+        return out
@@ -0,0 +1,127 @@
+
+import numpy as np
+
+
+def charuco_board_points(corner_ids, columns):
+    """Board-plane position (in squares) of ChArUco inner corners: id = row * (columns - 1) + col."""
+    corner_ids = np.asarray(corner_ids).reshape(-1)
+    per_row = columns - 1
+    return np.column_stack([corner_ids % per_row + 1, corner_ids // per_row + 1]).astype(np.float64)
+
+def fit_homography(src, dst):
+    """
+    Normalized DLT homography mapping (N, 2) src points onto dst points.
+
+    Returns:
+        3x3 matrix, or None with fewer than 4 points or a degenerate layout.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    if len(src) < 4:
+        return None
+
+    def normalizer(points):
+        mean = points.mean(axis=0)
+        spread = np.sqrt(((points - mean) ** 2).sum(axis=1).mean())
+        if spread < 1e-12:
+            return None
+        s = np.sqrt(2) / spread
+        return np.array([[s, 0, -s * mean[0]], [0, s, -s * mean[1]], [0, 0, 1]])
+
+    T_src, T_dst = normalizer(src), normalizer(dst)
+    if T_src is None or T_dst is None:
+        return None
+    a = src * T_src[0, 0] + T_src[:2, 2]
+    b = dst * T_dst[0, 0] + T_dst[:2, 2]
+    zeros = np.zeros((len(a), 3))
+    ones = np.ones((len(a), 1))
+    ah = np.hstack([a, ones])
+    rows_u = np.hstack([ah, zeros, -b[:, :1] * ah])
+    rows_v = np.hstack([zeros, ah, -b[:, 1:] * ah])
+    _, s, vt = np.linalg.svd(np.vstack([rows_u, rows_v]))
+    if s[-2] < 1e-9 * s[0]:
+        return None
+    H = np.linalg.inv(T_dst) @ vt[-1].reshape(3, 3) @ T_src
+    return H / H[2, 2] if abs(H[2, 2]) > 1e-12 else None
+
+def board_view_features(image_points, corner_ids, columns, rows, image_size):
+    """
+    Cheap pose descriptor of one board view, from the homography of the detected corners.
+
+    Returns:
+        (6,) array: outline center x, y (0-1 of the image), scale (sqrt of outline area over
+        image area), horizontal and vertical foreshortening (-1..1, i.e. tilt) and in-plane
+        angle (fraction of a half turn), or None if the homography cannot be fitted.
+    """
+    H = fit_homography(charuco_board_points(corner_ids, columns), np.asarray(image_points).reshape(-1, 2))
+    if H is None:
+        return None
+    outline = np.array([[0, 0, 1], [columns, 0, 1], [columns, rows, 1], [0, rows, 1]], dtype=np.float64)
+    projected = outline @ H.T
+    if np.any(projected[:, 2] <= 1e-12):
+        return None
+    quad = projected[:, :2] / projected[:, 2:]
+    width, height = image_size
+
+    edges = np.linalg.norm(np.roll(quad, -1, axis=0) - quad, axis=1)  # top, right, bottom, left
+    x, y = quad[:, 0], quad[:, 1]
+    area = 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+    top = quad[1] - quad[0]
+    return np.array([
+        quad[:, 0].mean() / width,
+        quad[:, 1].mean() / height,
+        np.sqrt(area / (width * height)),
+        (edges[3] - edges[1]) / max(edges[3] + edges[1], 1e-12),
+        (edges[0] - edges[2]) / max(edges[0] + edges[2], 1e-12),
+        np.arctan2(top[1], top[0]) / np.pi,
+    ])
+
+def coverage_cells(image_points, image_size, grid=(8, 6)):
+    """Boolean (grid_x * grid_y,) mask of the image cells that contain detected corners."""
+    points = np.asarray(image_points, dtype=np.float64).reshape(-1, 2)
+    width, height = image_size
+    cx = np.clip((points[:, 0] / width * grid[0]).astype(int), 0, grid[0] - 1)
+    cy = np.clip((points[:, 1] / height * grid[1]).astype(int), 0, grid[1] - 1)
+    cells = np.zeros(grid[0] * grid[1], dtype=bool)
+    cells[cy * grid[0] + cx] = True
+    return cells
+
+def select_diverse_frames(features, cells, corner_counts, max_frames=40, coverage_weight=1.0,
+                          feature_weights=(1.0, 1.0, 1.0, 2.0, 2.0, 0.5)):
+    """
+    Greedy farthest-point choice of board views that differ in pose and cover new image areas.
+
+    Starts from the view with most corners, then repeatedly adds the view farthest (weighted
+    feature distance) from everything chosen, plus coverage_weight times the fraction of
+    grid cells it would newly cover.
+
+    Args:
+        features: (N, 6) board_view_features rows.
+        cells: (N, C) coverage_cells rows.
+        corner_counts: (N,) detected corners per view.
+
+    Returns:
+        Sorted indices of at most max_frames views.
+    """
+    features = np.asarray(features, dtype=np.float64) * np.asarray(feature_weights)
+    cells = np.asarray(cells, dtype=bool)
+    count = len(features)
+    if count == 0:
+        return []
+    if count <= max_frames:
+        return list(range(count))
+
+    chosen = [int(np.argmax(corner_counts))]
+    covered = cells[chosen[0]].copy()
+    min_dist = np.linalg.norm(features - features[chosen[0]], axis=1)
+    available = np.ones(count, dtype=bool)
+    available[chosen[0]] = False
+    while len(chosen) < max_frames:
+        gain = (cells & ~covered).sum(axis=1) / cells.shape[1]
+        score = np.where(available, min_dist + coverage_weight * gain, -np.inf)
+        best = int(np.argmax(score))
+        chosen.append(best)
+        available[best] = False
+        covered |= cells[best]
+        min_dist = np.minimum(min_dist, np.linalg.norm(features - features[best], axis=1))
+    return sorted(chosen)
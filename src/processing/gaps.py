@@ -0,0 +1,100 @@
+
+import numpy as np
+
+
+def joint_mask_to_channels(valid, dims=3):
+    """Expands a (frames, joints) mask to the matching (frames, joints*dims) channel mask."""
+    return np.repeat(np.asarray(valid, dtype=bool), dims, axis=1)
+
+def channel_mask_to_joints(valid, dims=3):
+    """A joint is valid only if all of its channels are."""
+    valid = np.asarray(valid, dtype=bool)
+    return valid.reshape(valid.shape[0], -1, dims).all(axis=2)
+
+def _neighbours(valid):
+    """Index of the previous and next valid frame for every (frame, channel); -1 / frames if none."""
+    num_frames = valid.shape[0]
+    frame_idx = np.arange(num_frames)[:, None]
+    prev_idx = np.maximum.accumulate(np.where(valid, frame_idx, -1), axis=0)
+    next_idx = np.minimum.accumulate(np.where(valid, frame_idx, num_frames)[::-1], axis=0)[::-1]
+    return prev_idx, next_idx
+
+def hermite(p0, p1, m0, m1, u, span):
+    """Cubic Hermite interpolation at fraction u of an interval of length span with end slopes m0, m1."""
+    u2, u3 = u * u, u * u * u
+    h00 = 2 * u3 - 3 * u2 + 1
+    h10 = u3 - 2 * u2 + u
+    h01 = -2 * u3 + 3 * u2
+    h11 = u3 - u2
+    return h00 * p0 + h10 * span * m0 + h01 * p1 + h11 * span * m1
+
+def fill_gaps(data, valid, times=None, max_gap=10, method="cubic"):
+    """
+    Fills short interior gaps of a (frames, channels) array in one vectorized pass.
+
+    Args:
+        data: (frames, channels) values. Entries where valid is False are ignored.
+        valid: (frames, channels) mask.
+        times: Optional (frames,) timestamps; defaults to frame indices.
+        max_gap: Longest run of missing frames that is interpolated. Longer gaps stay masked.
+        method: "linear", or "cubic" (Hermite with slopes from the samples around the gap).
+
+    Returns:
+        (filled, filled_valid). Leading/trailing gaps and gaps longer than max_gap keep valid=False.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool)
+    num_frames = data.shape[0]
+    if times is None:
+        times = np.arange(num_frames, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+
+    prev_idx, next_idx = _neighbours(valid)
+    fill = ~valid & (prev_idx >= 0) & (next_idx < num_frames) & (next_idx - prev_idx - 1 <= max_gap)
+
+    filled = np.where(valid, data, 0.0)
+    if not fill.any():
+        return filled, valid.copy()
+
+    frames, channels = np.nonzero(fill)
+    i0 = prev_idx[frames, channels]
+    i1 = next_idx[frames, channels]
+    t0, t1 = times[i0], times[i1]
+    span = t1 - t0
+    span = np.where(span > 0, span, 1.0)
+    u = (times[frames] - t0) / span
+    p0 = data[i0, channels]
+    p1 = data[i1, channels]
+
+    if method == "cubic":
+        # Slopes from the valid sample just outside each gap end, else the chord
+        chord = (p1 - p0) / span
+        before = np.maximum(i0 - 1, 0)
+        after = np.minimum(i1 + 1, num_frames - 1)
+        has_before = (i0 > 0) & valid[before, channels]
+        has_after = (i1 < num_frames - 1) & valid[after, channels]
+        dt0 = times[i0] - times[before]
+        dt1 = times[after] - times[i1]
+        m0 = np.where(has_before & (dt0 > 0), (p0 - data[before, channels]) / np.where(dt0 > 0, dt0, 1.0), chord)
+        m1 = np.where(has_after & (dt1 > 0), (data[after, channels] - p1) / np.where(dt1 > 0, dt1, 1.0), chord)
+        values = hermite(p0, p1, m0, m1, u, span)
+    else:
+        values = p0 + u * (p1 - p0)
+
+    filled[frames, channels] = values
+    return filled, valid | fill
+
+def hold_missing(data, valid):
+    """
+    Replaces masked entries with the nearest earlier valid value (later for leading gaps).
+    Channels that are never valid become zeros.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool)
+    num_frames = data.shape[0]
+    prev_idx, next_idx = _neighbours(valid)
+    source = np.where(prev_idx >= 0, prev_idx, next_idx)
+    seen = source < num_frames
+    source = np.minimum(source, num_frames - 1)
+    held = np.take_along_axis(data, source, axis=0)
+    return np.where(seen, held, 0.0)
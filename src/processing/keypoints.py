@@ -0,0 +1,78 @@
+
+import numpy as np
+
+# OpenPose JSON field, joint count and export column prefix of every supported joint set
+JOINT_SETS = {
+    "body": ("pose_keypoints_2d", 25, "Bone"),
+    "hand_left": ("hand_left_keypoints_2d", 21, "LHand"),
+    "hand_right": ("hand_right_keypoints_2d", 21, "RHand"),
+    "face": ("face_keypoints_2d", 70, "Face"),
+}
+
+
+class KeypointSchema:
+    def __init__(self, sets=("body",)):
+        """
+        Named joint sets laid out one after another along the joint axis of every array.
+
+        sets: Any of "body", "hand_left", "hand_right", "face". The body set is always
+              first, so BODY_25 indices (bones, tracking, BVH) stay valid with hands or face enabled.
+        """
+        sets = list(sets)
+        unknown = [name for name in sets if name not in JOINT_SETS]
+        if unknown:
+            raise ValueError(f"Unknown keypoint sets: {unknown}. Choose from {list(JOINT_SETS)}")
+        if "body" not in sets:
+            raise ValueError("The body keypoint set is required (tracking and skeleton fitting use it)")
+        self.sets = [name for name in JOINT_SETS if name in sets]
+
+        self.slices = {}
+        start = 0
+        for name in self.sets:
+            count = JOINT_SETS[name][1]
+            self.slices[name] = slice(start, start + count)
+            start += count
+        self.num_joints = start
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("Keypoints", {}).get("sets", ["body"]))
+
+    @property
+    def body(self):
+        return self.slices["body"]
+
+    def column_names(self):
+        """Export name of every joint: Bone_0..Bone_24, then e.g. LHand_0.., RHand_0.., Face_0.."""
+        names = []
+        for name in self.sets:
+            _, count, prefix = JOINT_SETS[name]
+            names.extend(f"{prefix}_{i}" for i in range(count))
+        return names
+
+    def parse_person(self, person):
+        """One OpenPose person dict as a (num_joints, 3) float32 array; missing sets stay zero."""
+        keypoints = np.zeros((self.num_joints, 3), dtype=np.float32)
+        for name in self.sets:
+            field, count, _ = JOINT_SETS[name]
+            values = np.asarray(person.get(field) or [], dtype=np.float32)
+            values = values[:len(values) - len(values) % 3].reshape(-1, 3)[:count]
+            keypoints[self.slices[name].start:self.slices[name].start + len(values)] = values
+        return keypoints
+
+    def parse_people(self, data):
+        """Every person of an OpenPose JSON document with any keypoints in the schema's sets."""
+        people = []
+        for person in data.get("people", []):
+            if any(person.get(JOINT_SETS[name][0]) for name in self.sets):
+                people.append(self.parse_person(person))
+        return people
+
+    def openpose_flags(self):
+        """Extra OpenPoseDemo arguments needed to produce the enabled sets."""
+        flags = []
+        if "hand_left" in self.sets or "hand_right" in self.sets:
+            flags.append("--hand")
+        if "face" in self.sets:
+            flags.append("--face")
+        return flags
@@ -1,20 +1,36 @@
 
 import os
+import re
 import subprocess
 import json
-import csv
 import shutil
 import glob
 import cv2
 import numpy as np
 
 from capture.audio import AudioRecorder
-from processing.triangulate import triangulate_frame
-from processing.filter import MocapFilter
+from capture.takes import read_take_metadata
+from capture.timestamps import (
+    timestamp_path, read_timestamps, write_timestamps, probe_frame_times, frames_at_times,
+)
+from processing.reconstruct import (
+    reconstruction_settings, keypoint_array, write_keypoint_cache,
+    triangulate_take, track_take, smooth_track,
+)
+from processing.gaps import channel_mask_to_joints
+from processing.resample import resample
+from processing.keypoints import KeypointSchema
+from processing.face import (
+    find_live_link_csv, read_live_link_csv, parse_timecode, face_sample_times, interpolate_channels,
+)
+from processing import export, bvh
 from processing.aligner import AudioAligner
 from utils.config import config
 
 
+OPENPOSE_FRAME_RE = re.compile(r"_(\d{12})_keypoints\.json$")
+
+
 class MocapPipeline:
     def __init__(self, openpose_path=None, output_dir="MocapExports"):
         op_config = config.get("OpenPose", {})
@@ -22,6 +38,10 @@ class MocapPipeline:
         self.net_resolution = op_config.get("net_resolution", "-1x320")
         
         self.output_dir = os.path.abspath(output_dir)
+        self.export_format = config.get("Export", {}).get("format", "csv")
+        self.bvh_scale = config.get("Export", {}).get("bvh_scale", 100.0)
+        self.schema = KeypointSchema.from_config(config)
+        self.exported_files = []
 
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
@@ -79,6 +99,7 @@ class MocapPipeline:
                 'video_path': v_path,
                 'offset': 0.0
             })
+        audio_start = read_take_metadata(scene, take).get("audio_start")
             
         for mob_file in mobile_files:
             fname = os.path.basename(mob_file)
@@ -148,92 +169,109 @@ class MocapPipeline:
                 projections.append(P)
                 active_views.append({
                     "id": view["id"],
+                    "calib_id": calib_id,
                     "json_dir": json_dirs[view["id"]],
                     "frame_offset": int(round(view.get("offset", 0.0) * fps)),
                     "drift_factor": view.get("drift_factor", 1.0),
+                    "frame_times": self.load_frame_times(view, audio_start),
                 })
                 print(f"[Pipeline] Added 3D View: {calib_id}")
             else:
                 print(f"[Pipeline] Skipping View {view['id']} for 3D (No calibration data for {calib_id})")
 
-        # 4. Read JSONs, Triangulate, Filter
+        # 4. Read JSONs, Triangulate every person, Track identities
         print(f"[Pipeline] Triangulating with {len(projections)} views...")
-        mocap_filter = MocapFilter()
-        final_data = []
 
         if len(projections) < 2:
             print("[Pipeline] Not enough calibrated views for triangulation (Need 2+).")
             print("[Pipeline] NOTE: You MUST run the CALIBRATE step for each camera before processing.")
             return False
         
-        if active_views:
-            view_counts = [
-                len(glob.glob(os.path.join(v["json_dir"], "*_keypoints.json")))
-                for v in active_views
-            ]
-            if not view_counts:
-                print("[Pipeline] Error: No valid JSON frames found in any calibrated view.")
-                return False
-            else:
-                available_after_sync = [
-                    int((count - max(0, start_frame - v["frame_offset"])) * v["drift_factor"])
-                    for count, v in zip(view_counts, active_views)
-                ]
-                num_output_frames = min(available_after_sync)
-                if num_output_frames <= 0:
-                    print("[Pipeline] Error: No frames remain after sync alignment.")
-                    return False
-                print(f"[Pipeline] Processing {num_output_frames} synced frames.")
-
-            for out_frame in range(num_output_frames):
-                frame_points = []
-                for view in active_views:
-                    source_start = start_frame - view["frame_offset"]
-                    source_frame = source_start + int(round(out_frame / view["drift_factor"]))
-                    if source_frame < 0:
-                        frame_points.append([])
-                        continue
-                    frame_suffix = f"_{source_frame:012d}_keypoints.json"
-                    candidates = glob.glob(os.path.join(view["json_dir"], f"*{frame_suffix}"))
-                    
-                    if candidates:
-                        json_path = candidates[0]
-                        kps = self.read_openpose_json(json_path)
-                        frame_points.append(kps)
-                    else:
-                        frame_points.append([]) 
-                
-                if len(frame_points) == len(projections):
-                    points_3d = triangulate_frame(projections, frame_points)
-                    timestamp = out_frame / fps
-                    filtered_3d = mocap_filter.filter_frame(timestamp, points_3d)
-                    
-                    row = [timestamp]
-                    for pt in filtered_3d:
-                        if pt is not None:
-                            row.extend(pt)
-                        else:
-                            row.extend([0,0,0])
-                    final_data.append(row)
-        else:
+        if not active_views:
             print("[Pipeline] Error: No active calibrated views available.")
             return False
 
-        if not final_data:
-            print("[Pipeline] Error: Triangulation produced no animation rows. Keeping raw files.")
+        json_indices = [self.index_openpose_jsons(v["json_dir"]) for v in active_views]
+        view_counts = [len(index) for index in json_indices]
+        if not any(view_counts):
+            print("[Pipeline] Error: No valid JSON frames found in any calibrated view.")
             return False
 
-        # 4. Export CSV
-        csv_filename = os.path.join(self.output_dir, f"{scene}_{take}.csv")
-        try:
-            self.write_csv(final_data, csv_filename)
-        except Exception as e:
-            print(f"[Pipeline] Error writing CSV: {e}")
+        available_after_sync = [
+            self.available_frames(v, count, start_frame - v["frame_offset"], fps)
+            for count, v in zip(view_counts, active_views)
+        ]
+        num_output_frames = min(available_after_sync)
+        if num_output_frames <= 0:
+            print("[Pipeline] Error: No frames remain after sync alignment.")
+            return False
+        print(f"[Pipeline] Processing {num_output_frames} synced frames.")
+
+        people_per_view = []
+        for view, json_index in zip(active_views, json_indices):
+            source_frames = self.source_frames(view, start_frame - view["frame_offset"], num_output_frames, fps)
+            frames = []
+            for source_frame in source_frames:
+                json_path = json_index.get(int(source_frame)) if source_frame >= 0 else None
+                frames.append(self.read_openpose_people(json_path) if json_path else [])
+            people_per_view.append(frames)
+        keypoints = keypoint_array(people_per_view, self.schema.num_joints)
+
+        # Synced 2D keypoints outlive the JSON cleanup so settings can be re-tuned without OpenPose
+        write_keypoint_cache(
+            os.path.join(self.output_dir, f"{scene}_{take}_keypoints.npz"),
+            keypoints, projections, fps, [v["id"] for v in active_views], self.schema.sets,
+            calib_ids=[v["calib_id"] for v in active_views],
+        )
+
+        settings = reconstruction_settings(config)
+        points, valid, confidence, _ = triangulate_take(
+            keypoints, projections, settings["min_confidence"], match_joints=self.schema.body
+        )
+        _, tracks = track_take(points, valid, confidence, settings)
+        if not tracks:
+            print("[Pipeline] Error: Triangulation produced no persistent person tracks. Keeping raw files.")
             return False
+        print(f"[Pipeline] Tracked {len(tracks)} persistent person ID(s).")
+
+        # 5. Fit bone lengths, Filter & Export one file per persistent ID
+        export_config = config.get("Export", {})
+        # Retime to the Unreal sequence rate on export (0 keeps capture fps)
+        export_fps = export_config.get("fps", 0)
+        if export_fps and export_fps != fps:
+            print(f"[Pipeline] Resampling export from {fps} fps to {export_fps} fps.")
+        times = np.arange(num_output_frames) / fps
+        face_config = config.get("Face", {})
+        face = self.load_face_curves(scene, take, start_frame / fps, face_config)
+        self.exported_files = []
+        for track_id, (t_points, t_valid, t_conf) in sorted(tracks.items()):
+            filtered, mask = smooth_track(times, t_points, t_valid, t_conf, settings)
+            out_times = times
+            if export_fps and export_fps != fps:
+                out_times, filtered, mask = resample(
+                    times, filtered, mask, export_fps,
+                    method=export_config.get("interpolation", "cubic"),
+                )
+            filtered = filtered.reshape((len(out_times),) + t_points.shape[1:])
+            filtered_valid = channel_mask_to_joints(mask)
+
+            blendshapes = None
+            if face is not None and track_id == face_config.get("actor", 0):
+                names, face_times, face_values = face
+                curves, curves_valid = interpolate_channels(face_times, face_values, out_times)
+                blendshapes = (names, curves, curves_valid)
+
+            try:
+                self.exported_files.append(
+                    self.export_track(scene, take, track_id, out_times, filtered, filtered_valid, blendshapes)
+                )
+            except Exception as e:
+                print(f"[Pipeline] Error writing track {track_id}: {e}")
+                return False
         
-        # 5. Cleanup
-        if self.verify_csv(csv_filename):
-            print("[Pipeline] CSV verified. performing cleanup...")
+        # 6. Cleanup
+        if all(self.verify_export(path) for path in self.exported_files):
+            print("[Pipeline] Exports verified. performing cleanup...")
             for view in views:
                 if view['id'] in json_dirs:
                     shutil.rmtree(json_dirs[view['id']], ignore_errors=True)
@@ -241,8 +279,10 @@ class MocapPipeline:
                 if os.path.exists(view['video_path']):
                     os.remove(view['video_path'])
                     print(f"[Pipeline] Deleted raw video: {view['video_path']}")
+                if os.path.exists(timestamp_path(view['video_path'])):
+                    os.remove(timestamp_path(view['video_path']))
         else:
-            print("[Pipeline] WARNING: CSV verification failed. Keeping raw files.")
+            print("[Pipeline] WARNING: Export verification failed. Keeping raw files.")
 
         return True
 
@@ -282,7 +322,7 @@ class MocapPipeline:
             "--display", "0",
             "--render_pose", "0",
             "--net_resolution", self.net_resolution
-        ]
+        ] + self.schema.openpose_flags()
         
         if not os.path.exists(op_binary):
             print(f"[Pipeline] OpenPose binary not found: {op_binary}")
@@ -300,44 +340,159 @@ class MocapPipeline:
             print(f"[Pipeline] OpenPose failed (Root: {op_root}). Error: {e}")
             return False
 
-    def read_openpose_json(self, json_path):
-        if not os.path.exists(json_path):
+    def load_frame_times(self, view, audio_start=None):
+        """
+        Capture time of every frame of a view on its sync timeline in seconds, or None to
+        assume uniform fps.
+
+        Local recordings use the recorder's _frames.bin sidecar, moved onto the audio
+        timeline with the take's audio_start. Mobile uploads use the container timestamps
+        (variable frame rate), probed with ffprobe once and cached in the same sidecar format.
+        """
+        path = timestamp_path(view["video_path"])
+        if view["type"] == "mobile" and not os.path.exists(path) and self.has_ffmpeg:
+            try:
+                write_timestamps(path, probe_frame_times(view["video_path"]), fps=0)
+            except (OSError, ValueError, subprocess.CalledProcessError) as e:
+                print(f"[Pipeline] Could not read frame times of {view['video_path']}: {e}")
+        if not os.path.exists(path):
+            print(f"[Pipeline] No frame timestamps for view {view['id']}; assuming uniform frame rate.")
+            return None
+        try:
+            stamps = read_timestamps(path)
+        except (OSError, ValueError) as e:
+            print(f"[Pipeline] Ignoring frame timestamps {path}: {e}")
+            return None
+        times = stamps["times"]
+        if view["type"] == "local":
+            if audio_start is None:
+                print(f"[Pipeline] Take metadata has no audio start; view {view['id']} is mapped by frame index.")
+                return None
+            times = times + stamps["wall_offset"] - audio_start
+        if len(stamps["drops"]):
+            print(f"[Pipeline] View {view['id']} dropped {int(stamps['drops'][:, 1].sum())} frames during capture; "
+                  f"mapping frames by time.")
+        return times
+
+    @staticmethod
+    def source_frames(view, source_start, num_output_frames, fps):
+        """
+        Source frame of every output frame for one view, -1 where the view has none.
+
+        With frame_times, output frame k is the frame captured closest to
+        (source_start + k / drift_factor) / fps, within half a frame; otherwise frames are counted.
+        """
+        steps = np.arange(num_output_frames) / view["drift_factor"]
+        if view.get("frame_times") is None:
+            return source_start + np.round(steps).astype(np.int64)
+        return frames_at_times(view["frame_times"], (source_start + steps) / fps, tolerance=0.5 / fps)
+
+    @staticmethod
+    def available_frames(view, count, source_start, fps):
+        """Output frames a view can cover after sync (count = its number of OpenPose frames)."""
+        if view.get("frame_times") is None:
+            return int((count - max(0, source_start)) * view["drift_factor"])
+        times = view["frame_times"][:count]
+        times = times[np.isfinite(times)]
+        if len(times) == 0:
+            return 0
+        return max(0, int(np.floor((times.max() - max(0, source_start) / fps) * fps * view["drift_factor"])) + 1)
+
+    @staticmethod
+    def index_openpose_jsons(json_dir):
+        """Maps frame number -> keypoint JSON path for one OpenPose output folder."""
+        index = {}
+        for path in glob.glob(os.path.join(json_dir, "*_keypoints.json")):
+            match = OPENPOSE_FRAME_RE.search(os.path.basename(path))
+            if match:
+                index.setdefault(int(match.group(1)), path)
+        return index
+
+    def read_openpose_people(self, json_path):
+        """Returns every person in an OpenPose JSON as a (num_joints, 3) (u, v, confidence) array laid out by the schema."""
+        if not json_path or not os.path.exists(json_path):
             return []
             
         with open(json_path, 'r') as f:
             data = json.load(f)
-            
-        if not data['people']:
+        return self.schema.parse_people(data)
+
+    def read_openpose_json(self, json_path):
+        people = self.read_openpose_people(json_path)
+        if not people:
             return []
-            
-        person = data['people'][0]
-        kp = person['pose_keypoints_2d']
-        points = []
-        for i in range(0, len(kp), 3):
-            points.append( kp[i:i+3] )
-        return points
-
-    def write_csv(self, data, filename):
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            header = ["Time"] + [f"Bone_{i}_{axis}" for i in range(25) for axis in ["X","Y","Z"]]
-            writer.writerow(header)
-            writer.writerows(data)
-        print(f"[Pipeline] Exported {filename}")
+        return people[0]
 
-    def verify_csv(self, filename):
-        if not os.path.exists(filename) or os.path.getsize(filename) <= 0:
-            return False
+    def export_track(self, scene, take, track_id, times, points, valid=None, blendshapes=None):
+        """Writes one persistent ID. Track 0 keeps the plain {scene}_{take} name Unreal expects."""
+        stem = f"{scene}_{take}" if track_id == 0 else f"{scene}_{take}_actor{track_id}"
+        if self.export_format == "binary":
+            filename = os.path.join(self.output_dir, f"{stem}.npz")
+            export.write_binary(
+                filename, times, points, valid, track_id=track_id, blendshapes=blendshapes,
+                joint_names=self.schema.column_names(),
+            )
+        elif self.export_format == "bvh":
+            # BVH carries the body skeleton only
+            body = self.schema.body
+            filename = os.path.join(self.output_dir, f"{stem}.bvh")
+            bvh.write_bvh(
+                filename, times, points[:, body], None if valid is None else valid[:, body], scale=self.bvh_scale
+            )
+            if blendshapes is not None:
+                print("[Pipeline] BVH holds no face curves; use the csv or binary format to merge Live Link Face.")
+        else:
+            filename = os.path.join(self.output_dir, f"{stem}.csv")
+            export.write_csv(
+                filename, times, points, valid, blendshapes=blendshapes, joint_names=self.schema.column_names()
+            )
+        return filename
+
+    def load_face_curves(self, scene, take, sync_offset, face_config):
+        """
+        Live Link Face curves for this take placed on the body timeline.
+
+        Args:
+            sync_offset: Seconds from the audio start to the first exported body frame.
+
+        Returns:
+            (names, times, values) or None when there is no usable face take.
+        """
+        if not face_config.get("enabled", True):
+            return None
+        csv_path = find_live_link_csv(face_config.get("csv_dir", "LiveLinkFace"), scene, take)
+        if csv_path is None:
+            print("[Pipeline] No Live Link Face CSV found for this take. Exporting body only.")
+            return None
+        metadata = read_take_metadata(scene, take)
+        if "audio_start" not in metadata:
+            print("[Pipeline] Take metadata has no audio start time; cannot align the face take.")
+            return None
         try:
-            with open(filename, newline='') as f:
-                reader = csv.reader(f)
-                header = next(reader, None)
-                first_row = next(reader, None)
-            expected_cols = 1 + 25 * 3
-            return bool(header and first_row and len(header) == expected_cols and len(first_row) == expected_cols)
-        except Exception as e:
-            print(f"[Pipeline] CSV verification error: {e}")
-            return False
+            timecodes, names, values = read_live_link_csv(csv_path)
+            seconds = parse_timecode(timecodes, face_config.get("timecode_fps", 60))
+            times = face_sample_times(
+                seconds,
+                metadata["audio_start"] + sync_offset,
+                metadata.get("trigger_time"),
+                mode=face_config.get("align", "timecode"),
+                latency=face_config.get("latency", 0.0),
+            )
+        except (OSError, ValueError, StopIteration) as e:
+            print(f"[Pipeline] Could not read Live Link Face take {csv_path}: {e}")
+            return None
+        print(f"[Pipeline] Merging {len(names)} face channels from {os.path.basename(csv_path)}.")
+        return names, times, values
+
+    def verify_export(self, filename):
+        if filename.endswith(".npz"):
+            return export.verify_binary(filename, self.schema.num_joints)
+        if filename.endswith(".bvh"):
+            return bvh.verify_bvh(filename)
+        return self.verify_csv(filename)
+
+    def verify_csv(self, filename):
+        return export.verify_csv(filename, joint_names=self.schema.column_names())
 
     def load_calibration(self):
         calib_path = config.get("Calibration", {}).get("save_path", "calibration.npz")
@@ -0,0 +1,228 @@
+
+import numpy as np
+
+from processing.triangulate import associate_people_across_views, triangulate_points, triangulation_confidence
+from processing.tracker import PersonTracker, split_tracks
+from processing.skeleton import SkeletonFitter
+from processing.filter import MocapFilter
+from processing.smoother import KalmanSmoother
+from processing.gaps import fill_gaps, joint_mask_to_channels
+
+
+def reconstruction_settings(config):
+    """Flattens the [Triangulation], [Tracking], [Skeleton] and [Filter] config sections into one dict."""
+    tri_config = config.get("Triangulation", {})
+    track_config = config.get("Tracking", {})
+    skeleton_config = config.get("Skeleton", {})
+    filter_config = config.get("Filter", {})
+    return {
+        "min_confidence": tri_config.get("min_confidence", 0.1),
+        "max_distance": track_config.get("max_distance", 0.5),
+        "max_missing": track_config.get("max_missing", 15),
+        "min_length": track_config.get("min_length", 10),
+        "skeleton": skeleton_config.get("enabled", True),
+        "skeleton_iterations": skeleton_config.get("iterations", 10),
+        "inlier_tolerance": skeleton_config.get("inlier_tolerance", 0.2),
+        "engine": filter_config.get("engine", "one_euro"),
+        "min_cutoff": filter_config.get("min_cutoff", 1.0),
+        "beta": filter_config.get("beta", 0.0),
+        "max_gap": filter_config.get("max_gap", 10),
+        "interpolation": filter_config.get("interpolation", "cubic"),
+        "kalman_model": filter_config.get("kalman_model", "velocity"),
+        "process_noise": filter_config.get("process_noise", 50.0),
+        "measurement_noise": filter_config.get("measurement_noise", 1e-4),
+    }
+
+def keypoint_array(people_per_view, num_joints=25):
+    """
+    Packs OpenPose people into one dense array.
+
+    Args:
+        people_per_view: For each view, a list over frames of people, each a (joints, 3)
+                         array or list of (u, v, confidence) keypoints.
+
+    Returns:
+        (views, frames, people, num_joints, 3) float32 array. Missing people and joints are zeros.
+    """
+    num_views = len(people_per_view)
+    num_frames = max((len(frames) for frames in people_per_view), default=0)
+    num_people = max((len(people) for frames in people_per_view for people in frames), default=0)
+    keypoints = np.zeros((num_views, num_frames, max(num_people, 1), num_joints, 3), dtype=np.float32)
+    for v, frames in enumerate(people_per_view):
+        for f, people in enumerate(frames):
+            for p, person in enumerate(people):
+                person = np.asarray(person, dtype=np.float32).reshape(-1, 3)[:num_joints]
+                keypoints[v, f, p, :len(person)] = person
+    return keypoints
+
+def write_keypoint_cache(filename, keypoints, projections, fps, view_ids, joint_sets=("body",), calib_ids=None):
+    """
+    Stores one take's synced 2D keypoints and projection matrices for re-processing without OpenPose.
+    calib_ids are the calibration.npz camera names of the views (e.g. cam0, mobile_x).
+    """
+    extra = {} if calib_ids is None else {"calib_ids": np.asarray([str(c) for c in calib_ids])}
+    np.savez_compressed(
+        filename,
+        keypoints=np.asarray(keypoints, dtype=np.float32),
+        projections=np.asarray(projections, dtype=np.float64),
+        fps=np.float64(fps),
+        view_ids=np.asarray([str(v) for v in view_ids]),
+        joint_sets=np.asarray(list(joint_sets)),
+        **extra,
+    )
+    print(f"[Reconstruct] Cached keypoints to {filename}")
+
+def load_keypoint_cache(filename):
+    """Returns the cached take as a dict with keypoints, projections, fps, view_ids, joint_sets and calib_ids (or None)."""
+    with np.load(filename) as data:
+        return {
+            "keypoints": data["keypoints"],
+            "projections": data["projections"],
+            "fps": float(data["fps"]),
+            "view_ids": [str(v) for v in data["view_ids"]],
+            "joint_sets": [str(v) for v in data["joint_sets"]] if "joint_sets" in data.files else ["body"],
+            "calib_ids": [str(v) for v in data["calib_ids"]] if "calib_ids" in data.files else None,
+        }
+
+def associate_take(keypoints, projections, min_confidence=0.1, match_joints=None):
+    """
+    Cross-view person association for every frame of a take.
+
+    Frames where every view sees at most one person need no matching and are handled
+    in one vectorized step; only multi-person frames go through epipolar matching.
+
+    Args:
+        keypoints: (views, frames, people, joints, 3) array from keypoint_array.
+        projections: (views, 3, 4) projection matrices.
+        match_joints: Optional joint index/slice used for matching (e.g. the body set).
+
+    Returns:
+        (frames, slots, views) array: the 2D person index each slot is built from, -1 if unseen.
+    """
+    num_views, num_frames = keypoints.shape[:2]
+    present = (keypoints[..., 2] > 0).any(axis=-1)
+    counts = present.sum(axis=2)
+    simple = (counts <= 1).all(axis=0)
+    if match_joints is None:
+        match_joints = slice(None)
+
+    fundamentals = {}
+    frame_groups = {}
+    for f in np.flatnonzero(~simple):
+        indices = [np.flatnonzero(present[v, f]) for v in range(num_views)]
+        people_per_view = [keypoints[v, f, idx][:, match_joints].tolist() for v, idx in enumerate(indices)]
+        groups = associate_people_across_views(
+            projections, people_per_view, fundamentals=fundamentals, min_confidence=min_confidence
+        )
+        frame_groups[f] = [[indices[v][g[v]] if v in g else -1 for v in range(num_views)] for g in groups]
+
+    num_slots = max([1] + [len(groups) for groups in frame_groups.values()])
+    sources = np.full((num_frames, num_slots, num_views), -1, dtype=np.int64)
+    seen = counts == 1
+    single = simple & (seen.sum(axis=0) >= 2)
+    sources[single, 0] = np.where(seen, present.argmax(axis=2), -1).T[single]
+    for f, groups in frame_groups.items():
+        if groups:
+            sources[f, :len(groups)] = groups
+    return sources
+
+def triangulate_take(keypoints, projections, min_confidence=0.1, match_joints=None, chunk_frames=1024):
+    """
+    Associates and triangulates every person in every frame of a take.
+
+    Triangulation is one batched DLT per chunk of frames, so the cost grows with the
+    number of joints rather than with Python work per joint.
+
+    Args:
+        keypoints: (views, frames, people, joints, 3) array from keypoint_array.
+        projections: (views, 3, 4) projection matrices.
+        min_confidence: 2D detections below this score are ignored.
+        match_joints: Optional joint index/slice used for cross-view matching.
+
+    Returns:
+        points (frames, slots, joints, 3), valid and confidence (frames, slots, joints), and
+        sources (frames, slots, views): the 2D person index each slot was built from, -1 if unseen.
+    """
+    keypoints = np.asarray(keypoints)
+    projections = np.asarray(projections, dtype=np.float64)
+    num_views, num_frames = keypoints.shape[:2]
+    num_joints = keypoints.shape[3]
+    sources = associate_take(keypoints, projections, min_confidence, match_joints)
+    num_slots = sources.shape[1]
+
+    points = np.zeros((num_frames, num_slots, num_joints, 3))
+    valid = np.zeros((num_frames, num_slots, num_joints), dtype=bool)
+    confidence = np.zeros(valid.shape)
+    view_idx = np.arange(num_views)
+    for start in range(0, num_frames, chunk_frames):
+        stop = min(start + chunk_frames, num_frames)
+        src = sources[start:stop]
+        frame_idx = np.arange(start, stop)[:, None, None]
+        # (frames, slots, views, joints, 3) -> (frames, slots, joints, views, 3)
+        observations = keypoints[view_idx, frame_idx, np.maximum(src, 0)]
+        observations = np.where((src >= 0)[..., None, None], observations, 0.0).swapaxes(2, 3)
+        points[start:stop], valid[start:stop] = triangulate_points(projections, observations, min_confidence)
+        confidence[start:stop] = triangulation_confidence(observations, min_confidence)
+    return points, valid, confidence, sources
+
+def track_take(points, valid, confidence, settings):
+    """
+    Links triangulated people into persistent IDs.
+
+    Returns:
+        (ids, tracks): the (frames, slots) ID array and the split_tracks dict.
+    """
+    tracker = PersonTracker(
+        max_distance=settings["max_distance"],
+        max_missing=settings["max_missing"],
+        min_length=settings["min_length"],
+    )
+    ids = tracker.track(points, valid)
+    return ids, split_tracks(points, valid, ids, confidence)
+
+def smooth_track(times, points, valid, confidence, settings):
+    """
+    Bone-length fit, gap fill and smoothing of one persistent ID.
+
+    Args:
+        times: (frames,) timestamps.
+        points: (frames, joints, 3) positions with (frames, joints) valid mask and confidence.
+        settings: Dict from reconstruction_settings.
+
+    Returns:
+        (filtered, mask) as (frames, joints*3) channel arrays.
+    """
+    num_frames = len(times)
+    if settings["skeleton"]:
+        fitter = SkeletonFitter(
+            iterations=settings["skeleton_iterations"],
+            inlier_tolerance=settings["inlier_tolerance"],
+        )
+        points = fitter.fit(points, valid)
+
+    # Short gaps are interpolated, long gaps stay masked and skip the filter
+    data, mask = fill_gaps(
+        points.reshape(num_frames, -1),
+        joint_mask_to_channels(valid),
+        times,
+        max_gap=settings["max_gap"],
+        method=settings["interpolation"],
+    )
+    if settings["engine"] == "kalman":
+        # Zero-lag offline smoothing; interpolated samples carry no measurement weight
+        smoother = KalmanSmoother(
+            model=settings["kalman_model"],
+            process_noise=settings["process_noise"],
+            measurement_noise=settings["measurement_noise"],
+        )
+        filtered = smoother.smooth(
+            times, data, joint_mask_to_channels(valid), np.repeat(confidence, 3, axis=1)
+        )
+    else:
+        mocap_filter = MocapFilter(
+            num_points=points.shape[1],
+            min_cutoff=settings["min_cutoff"],
+            beta=settings["beta"],
+        )
+        filtered = mocap_filter.filter_array(times, data, mask)
+    return filtered, mask
@@ -0,0 +1,82 @@
+
+import numpy as np
+
+from processing.gaps import hermite
+
+
+def sample_slopes(times, data, valid):
+    """
+    Per-sample slopes of a (frames, channels) array: central differences where both
+    neighbours are valid, one-sided differences at gap edges, zero for isolated samples.
+    """
+    num_frames = data.shape[0]
+    slopes = np.zeros_like(data)
+    if num_frames < 2:
+        return slopes
+    dt = np.diff(times)[:, None]
+    dt = np.where(dt > 0, dt, 1.0)
+    step = np.diff(data, axis=0) / dt
+    step_ok = valid[1:] & valid[:-1]
+
+    back = np.zeros_like(data)
+    back_ok = np.zeros(data.shape, dtype=bool)
+    back[1:], back_ok[1:] = step, step_ok
+    fwd = np.zeros_like(data)
+    fwd_ok = np.zeros(data.shape, dtype=bool)
+    fwd[:-1], fwd_ok[:-1] = step, step_ok
+
+    slopes = np.where(back_ok & fwd_ok, 0.5 * (back + fwd), slopes)
+    slopes = np.where(back_ok & ~fwd_ok, back, slopes)
+    slopes = np.where(~back_ok & fwd_ok, fwd, slopes)
+    return slopes
+
+def resample(times, data, valid, target_fps, method="cubic"):
+    """
+    Retimes a take to a new frame rate in one vectorized call.
+
+    Args:
+        times: (frames,) source timestamps in seconds (need not be uniform).
+        data: (frames, channels) values.
+        valid: (frames, channels) mask.
+        target_fps: Output frame rate.
+        method: "cubic" (Hermite with finite-difference slopes) or "linear".
+
+    Returns:
+        (new_times, new_data, new_valid). A target sample is valid only if both
+        source samples around it are valid, so masked gaps are never bridged.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    data = np.asarray(data, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool)
+    num_frames = len(times)
+    if num_frames == 0:
+        return times.copy(), data.copy(), valid.copy()
+
+    duration = times[-1] - times[0]
+    count = int(np.floor(duration * target_fps + 1e-6)) + 1
+    new_times = times[0] + np.arange(count) / float(target_fps)
+    if num_frames == 1:
+        return new_times, np.repeat(data, count, axis=0), np.repeat(valid, count, axis=0)
+
+    i0 = np.clip(np.searchsorted(times, new_times, side="right") - 1, 0, num_frames - 2)
+    i1 = i0 + 1
+    span = times[i1] - times[i0]
+    span = np.where(span > 0, span, 1.0)
+    u = np.clip((new_times - times[i0]) / span, 0.0, 1.0)[:, None]
+    span = span[:, None]
+
+    p0, p1 = data[i0], data[i1]
+    v0, v1 = valid[i0], valid[i1]
+    if method == "cubic":
+        slopes = sample_slopes(times, data, valid)
+        values = hermite(p0, p1, slopes[i0], slopes[i1], u, span)
+    else:
+        values = p0 + u * (p1 - p0)
+
+    # Samples landing exactly on a source frame only need that frame
+    at_start = (u == 0.0)
+    at_end = (u == 1.0)
+    new_valid = (v0 & v1) | (at_start & v0) | (at_end & v1)
+    values = np.where(at_start & v0, p0, values)
+    values = np.where(at_end & v1, p1, values)
+    return new_times, np.where(new_valid, values, 0.0), new_valid
@@ -0,0 +1,230 @@
+
+import os
+import re
+import time
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.sparse import coo_matrix
+from scipy.spatial.transform import Rotation
+
+from processing.bundle import NUM_INTRINSICS, project_points
+from processing.keypoints import KeypointSchema
+from processing.reconstruct import triangulate_take
+
+
+def pose_from_projection(projection, camera_matrix):
+    """Splits P = K [R | t] with known K into (rvec, tvec); R is re-orthonormalized."""
+    Rt = np.linalg.solve(np.asarray(camera_matrix, dtype=np.float64), np.asarray(projection, dtype=np.float64))
+    u, _, vt = np.linalg.svd(Rt[:, :3])
+    R = u @ vt
+    if np.linalg.det(R) < 0:
+        R = -R
+        Rt = -Rt
+    return Rotation.from_matrix(R).as_rotvec(), Rt[:, 3]
+
+def projection_from_pose(camera_matrix, rvec, tvec):
+    R = Rotation.from_rotvec(np.ravel(rvec)).as_matrix()
+    return np.asarray(camera_matrix, dtype=np.float64) @ np.hstack([R, np.reshape(tvec, (3, 1))])
+
+def collect_observations(cache, min_confidence=0.5, max_points=20000):
+    """
+    Confident multi-view body keypoints of a cached take, as bundle adjustment input.
+
+    Every body joint triangulated with the cached projections and seen with at least
+    min_confidence by two or more views becomes one 3D point; up to max_points of them
+    are kept, spread evenly over the take.
+
+    Returns:
+        (points (N, 3) initial positions, cam_idx (M,), point_idx (M,), image_points (M, 2))
+    """
+    keypoints = cache["keypoints"]
+    projections = cache["projections"]
+    body = KeypointSchema(cache.get("joint_sets", ["body"])).body
+    keypoints = keypoints[..., body, :]
+    points, valid, _, sources = triangulate_take(keypoints, projections, min_confidence)
+
+    num_views, num_frames = keypoints.shape[:2]
+    view_idx = np.arange(num_views)
+    frame_idx = np.arange(num_frames)[:, None, None]
+    # (frames, slots, views, joints, 3) 2D detections each slot was built from
+    observations = keypoints[view_idx, frame_idx, np.maximum(sources, 0)]
+    observations = np.where((sources >= 0)[..., None, None], observations, 0.0)
+    confident = observations[..., 2] >= min_confidence  # (frames, slots, views, joints)
+    usable = valid & (confident.sum(axis=2) >= 2)
+
+    f, s, j = np.nonzero(usable)
+    if len(f) > max_points:
+        keep = np.linspace(0, len(f) - 1, max_points).round().astype(int)
+        f, s, j = f[keep], s[keep], j[keep]
+    seen = confident[f, s, :, j]  # (N, views)
+    point_idx, cam_idx = np.nonzero(seen)
+    image_points = observations[f[point_idx], s[point_idx], cam_idx, j[point_idx], :2].astype(np.float64)
+    return points[f, s, j], cam_idx, point_idx, image_points
+
+def camera_frame_points(poses, axis_length=1.0):
+    """(C, 3, 3) camera center plus one point along its x and optical axes, in world coordinates."""
+    R = Rotation.from_rotvec(poses[:, :3]).as_matrix()
+    centers = -np.einsum("cji,cj->ci", R, poses[:, 3:])
+    return centers[:, None] + np.concatenate([np.zeros((len(poses), 1, 3)), axis_length * R[:, :2]], axis=1)
+
+def align_to_reference(poses, reference_poses, iterations=20):
+    """
+    Similarity transform (scale, rotation, translation) of the world that best maps refined
+    cameras onto their reference poses, robustly: reprojection is unchanged by it, and the
+    L1-style weights keep cameras that did not move in place while a bumped one keeps its offset.
+
+    Returns:
+        (scale, R, T) with x_reference = scale * R @ x + T.
+    """
+    source = camera_frame_points(np.asarray(poses, dtype=np.float64))
+    target = camera_frame_points(np.asarray(reference_poses, dtype=np.float64))
+    weights = np.ones(len(source))
+    for _ in range(iterations):
+        w = np.repeat(weights, source.shape[1]) / weights.sum()
+        src = source.reshape(-1, 3)
+        dst = target.reshape(-1, 3)
+        mu_s = w @ src
+        mu_d = w @ dst
+        a = src - mu_s
+        b = dst - mu_d
+        u, sig, vt = np.linalg.svd((b * w[:, None]).T @ a)
+        d = np.sign(np.linalg.det(u @ vt))
+        D = np.diag([1.0, 1.0, d])
+        R = u @ D @ vt
+        scale = np.trace(np.diag(sig) @ D) / (w @ (a * a).sum(axis=1))
+        T = mu_d - scale * R @ mu_s
+        errors = np.linalg.norm((source @ R.T) * scale + T - target, axis=2).mean(axis=1)
+        weights = 1.0 / np.maximum(errors, 1e-6)
+    return scale, R, T
+
+def apply_similarity(poses, points, scale, R, T):
+    """Moves cameras and points by x' = scale * R @ x + T without changing any projection."""
+    R_old = Rotation.from_rotvec(poses[:, :3]).as_matrix()
+    R_cam = R_old @ R.T
+    centers = -np.einsum("cji,cj->ci", R_old, poses[:, 3:])
+    centers = scale * centers @ R.T + T
+    t = -np.einsum("cij,cj->ci", R_cam, centers)
+    return np.hstack([Rotation.from_matrix(R_cam).as_rotvec(), t]), scale * points @ R.T + T
+
+def refine_extrinsics(camera_matrices, poses, points, cam_idx, point_idx, image_points,
+                      prior=0.05, f_scale=3.0, max_nfev=50):
+    """
+    Re-optimizes camera extrinsics and the 3D keypoints together by minimizing reprojection error.
+
+    Projection is pinhole with the calibrated K (no distortion), as in the pipeline's
+    triangulation. Keypoints cannot tell where the rig is or how large it is, so every
+    camera gets a weak prior (prior, in rad and m) towards its starting pose for the solve,
+    and the result is then moved back by align_to_reference: cameras that did not move
+    stay where the board calibration put them, a bumped one keeps its correction.
+    The Jacobian is passed as a sparse structure (one camera and one point per residual).
+
+    Returns:
+        (poses (C, 6), points (N, 3), error_before, error_after) with errors as median pixel distances.
+    """
+    camera_matrices = np.asarray(camera_matrices, dtype=np.float64)
+    poses0 = np.asarray(poses, dtype=np.float64)
+    points0 = np.asarray(points, dtype=np.float64)
+    num_cams = len(poses0)
+    num_points = len(points0)
+    intrinsics = np.zeros((num_cams, NUM_INTRINSICS))
+    intrinsics[:, :4] = camera_matrices[:, [0, 1, 0, 1], [0, 1, 2, 2]]
+
+    def unpack(x):
+        return x[:num_cams * 6].reshape(num_cams, 6), x[num_cams * 6:].reshape(num_points, 3)
+
+    def reprojection(x):
+        cams, pts = unpack(x)
+        R = Rotation.from_rotvec(cams[:, :3]).as_matrix()
+        cam = np.einsum("mij,mj->mi", R[cam_idx], pts[point_idx]) + cams[cam_idx, 3:]
+        return project_points(cam, intrinsics[cam_idx]) - image_points
+
+    def residuals(x):
+        return np.concatenate([reprojection(x).ravel(), (x[:num_cams * 6] - poses0.ravel()) / prior])
+
+    num_obs = len(cam_idx)
+    rows = np.repeat(np.arange(2 * num_obs).reshape(-1, 2), 9, axis=1).ravel()
+    cols = np.tile(np.hstack([cam_idx[:, None] * 6 + np.arange(6), num_cams * 6 + point_idx[:, None] * 3 + np.arange(3)]), 2).ravel()
+    prior_rows = 2 * num_obs + np.arange(num_cams * 6)
+    sparsity = coo_matrix(
+        (np.ones(len(rows) + len(prior_rows)), (np.r_[rows, prior_rows], np.r_[cols, np.arange(num_cams * 6)])),
+        shape=(2 * num_obs + num_cams * 6, num_cams * 6 + num_points * 3),
+    ).tocsr()
+
+    x0 = np.concatenate([poses0.ravel(), points0.ravel()])
+    error_before = float(np.median(np.linalg.norm(reprojection(x0), axis=1)))
+    start = time.perf_counter()
+    # Same two stages as bundle_adjust: plain least squares, then Huber if keypoints disagree
+    result = least_squares(residuals, x0, jac_sparsity=sparsity, method="trf", ftol=1e-6, max_nfev=max_nfev)
+    if np.any(np.abs(result.fun) > 3 * f_scale):
+        result = least_squares(
+            residuals, result.x, jac_sparsity=sparsity, method="trf",
+            loss="huber", f_scale=f_scale, max_nfev=max_nfev,
+        )
+    error_after = float(np.median(np.linalg.norm(reprojection(result.x), axis=1)))
+    print(f"[SelfCal] {num_cams} cameras, {num_points} points, {num_obs} keypoints: median error "
+          f"{error_before:.2f} -> {error_after:.2f} px in {time.perf_counter() - start:.1f}s")
+    cams, pts = unpack(result.x)
+    cams, pts = apply_similarity(cams, pts, *align_to_reference(cams, poses0))
+    return cams, pts, error_before, error_after
+
+def self_calibrate(cache, calibration, min_confidence=0.5, max_points=20000, **solver_options):
+    """
+    Refines the extrinsics of a calibration.npz-style dict from one cached take.
+
+    Args:
+        cache: Dict from load_keypoint_cache (needs calib_ids).
+        calibration: Mapping with mtx_/rvec_/tvec_ entries per camera.
+
+    Returns:
+        (refined calibration dict, error_before, error_after) in median pixels, or None
+        if the take has too few confident multi-view keypoints.
+    """
+    calib_ids = cache.get("calib_ids")
+    if not calib_ids:
+        print("[SelfCal] Keypoint cache has no calibration ids; re-process the take to refresh it.")
+        return None
+    missing = [cid for cid in calib_ids if any(f"{kind}_{cid}" not in calibration for kind in ("mtx", "rvec", "tvec"))]
+    if missing:
+        print(f"[SelfCal] The calibration has no entries for {', '.join(missing)}; "
+              f"it was re-calibrated with a different camera set. Re-process the take first.")
+        return None
+    camera_matrices = [np.asarray(calibration[f"mtx_{cid}"], dtype=np.float64) for cid in calib_ids]
+    poses = []
+    for cid, K, P in zip(calib_ids, camera_matrices, cache["projections"]):
+        rvec, tvec = pose_from_projection(P, K)
+        current = projection_from_pose(K, calibration[f"rvec_{cid}"], calibration[f"tvec_{cid}"])
+        if not np.allclose(current, P, rtol=1e-6, atol=1e-6):
+            print(f"[SelfCal] {cid}: the take was processed with a different calibration; starting from the take's.")
+        poses.append(np.concatenate([rvec, tvec]))
+
+    points, cam_idx, point_idx, image_points = collect_observations(cache, min_confidence, max_points)
+    if len(points) < 50:
+        print(f"[SelfCal] Only {len(points)} confident multi-view keypoints; need at least 50.")
+        return None
+    cams, _, error_before, error_after = refine_extrinsics(
+        camera_matrices, poses, points, cam_idx, point_idx, image_points, **solver_options
+    )
+    refined = dict(calibration)
+    for cid, pose in zip(calib_ids, cams):
+        refined[f"rvec_{cid}"] = pose[:3].reshape(3, 1)
+        refined[f"tvec_{cid}"] = pose[3:].reshape(3, 1)
+    return refined, error_before, error_after
+
+def write_calibration_version(calibration, save_path):
+    """
+    Writes a calibration dict as the next free version next to save_path
+    (calibration.npz -> calibration_v1.npz, calibration_v2.npz, ...).
+
+    Returns:
+        The path written.
+    """
+    stem, ext = os.path.splitext(save_path)
+    directory = os.path.dirname(save_path) or "."
+    pattern = re.compile(re.escape(os.path.basename(stem)) + r"_v(\d+)" + re.escape(ext) + "$")
+    versions = [int(m.group(1)) for m in map(pattern.match, os.listdir(directory)) if m]
+    path = f"{stem}_v{max(versions, default=0) + 1}{ext}"
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **calibration)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,102 @@
+
+import numpy as np
+
+BODY_25_NAMES = [
+    "Nose", "Neck", "RShoulder", "RElbow", "RWrist", "LShoulder", "LElbow", "LWrist",
+    "MidHip", "RHip", "RKnee", "RAnkle", "LHip", "LKnee", "LAnkle",
+    "REye", "LEye", "REar", "LEar",
+    "LBigToe", "LSmallToe", "LHeel", "RBigToe", "RSmallToe", "RHeel",
+]
+
+# OpenPose BODY_25 bones as (parent, child), rooted at MidHip (8)
+BODY_25_BONES = [
+    (8, 1), (1, 0), (1, 2), (2, 3), (3, 4), (1, 5), (5, 6), (6, 7),
+    (8, 9), (9, 10), (10, 11), (8, 12), (12, 13), (13, 14),
+    (0, 15), (15, 17), (0, 16), (16, 18),
+    (14, 19), (19, 20), (14, 21), (11, 22), (22, 23), (11, 24),
+]
+
+
+def bone_lengths(points, valid, bones=BODY_25_BONES):
+    """
+    Per-frame bone lengths.
+
+    Args:
+        points: (frames, joints, 3) positions.
+        valid: (frames, joints) mask.
+
+    Returns:
+        (frames, bones) lengths, NaN where either end of the bone is missing.
+    """
+    parents, children = np.asarray(bones).T
+    lengths = np.linalg.norm(points[:, children] - points[:, parents], axis=-1)
+    both = valid[:, children] & valid[:, parents]
+    return np.where(both, lengths, np.nan)
+
+
+class SkeletonFitter:
+    def __init__(self, bones=BODY_25_BONES, iterations=10, inlier_tolerance=0.2):
+        """
+        iterations: Constraint solver sweeps over all bones
+        inlier_tolerance: Relative deviation from the first median that still counts as an inlier frame
+        """
+        self.bones = list(bones)
+        self.iterations = int(iterations)
+        self.inlier_tolerance = float(inlier_tolerance)
+
+    def estimate_lengths(self, points, valid):
+        """
+        Robust per-actor bone lengths over the whole take.
+
+        Returns:
+            (bones,) lengths, NaN for bones never seen.
+        """
+        lengths = bone_lengths(points, valid, self.bones)
+        if not np.isfinite(lengths).any():
+            return np.full(len(self.bones), np.nan)
+        first = _nanmedian(lengths)
+        inlier = np.abs(lengths - first) <= self.inlier_tolerance * first
+        return _nanmedian(np.where(inlier, lengths, np.nan))
+
+    def fit(self, points, valid, lengths=None):
+        """
+        Projects every frame onto a skeleton with fixed bone lengths.
+
+        Distance constraints are solved Gauss-Seidel style bone by bone, each step
+        vectorized over all frames. Missing joints are left untouched.
+
+        Returns:
+            (frames, joints, 3) constrained positions.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        valid = np.asarray(valid, dtype=bool)
+        if lengths is None:
+            lengths = self.estimate_lengths(points, valid)
+
+        # Joint-major copy so every per-joint slice is contiguous
+        joints = np.ascontiguousarray(points.transpose(1, 0, 2))
+        active = []
+        for (parent, child), length in zip(self.bones, lengths):
+            if np.isfinite(length) and length > 0:
+                both = valid[:, parent] & valid[:, child]
+                active.append((parent, child, length, both))
+
+        for _ in range(self.iterations):
+            for parent, child, length, both in active:
+                delta = joints[child] - joints[parent]
+                current = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+                scale = 0.5 * (current - length) / np.maximum(current, 1e-9)
+                scale[~both] = 0.0
+                delta *= scale[:, None]
+                joints[parent] += delta
+                joints[child] -= delta
+        return joints.transpose(1, 0, 2).copy()
+
+
+def _nanmedian(values):
+    """np.nanmedian over frames without the all-NaN RuntimeWarning."""
+    seen = np.isfinite(values).any(axis=0)
+    result = np.full(values.shape[1], np.nan)
+    if seen.any():
+        result[seen] = np.nanmedian(values[:, seen], axis=0)
+    return result
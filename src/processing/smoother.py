@@ -0,0 +1,143 @@
+
+import numpy as np
+from scipy.linalg.lapack import dpbtrf, dpbtrs
+
+
+def motion_model(model, dt, process_noise):
+    """
+    Transition matrix and process noise for a continuous white-noise motion model.
+
+    Args:
+        model: "velocity" (state: position, velocity) or "acceleration" (adds acceleration).
+        dt: Frame interval in seconds.
+        process_noise: Spectral density of the driving noise (acceleration or jerk).
+
+    Returns:
+        (A, Q) as (d, d) arrays.
+    """
+    q = float(process_noise)
+    if model == "acceleration":
+        A = np.array([
+            [1.0, dt, 0.5 * dt * dt],
+            [0.0, 1.0, dt],
+            [0.0, 0.0, 1.0],
+        ])
+        Q = q * np.array([
+            [dt**5 / 20, dt**4 / 8, dt**3 / 6],
+            [dt**4 / 8, dt**3 / 3, dt**2 / 2],
+            [dt**3 / 6, dt**2 / 2, dt],
+        ])
+    elif model == "velocity":
+        A = np.array([[1.0, dt], [0.0, 1.0]])
+        Q = q * np.array([
+            [dt**3 / 3, dt**2 / 2],
+            [dt**2 / 2, dt],
+        ])
+    else:
+        raise ValueError(f"Unknown motion model: {model}")
+    return A, Q
+
+
+class KalmanSmoother:
+    def __init__(self, model="velocity", process_noise=50.0, measurement_noise=1e-4, prior_variance=1e6):
+        """
+        Offline zero-lag smoother: Kalman filter plus Rauch-Tung-Striebel backward pass.
+
+        process_noise: Increase to follow fast motion more closely
+        measurement_noise: Position variance (world units^2) of a full-confidence joint
+        prior_variance: Variance of the (diffuse) initial state
+        """
+        self.model = model
+        self.process_noise = float(process_noise)
+        self.measurement_noise = float(measurement_noise)
+        self.prior_variance = float(prior_variance)
+
+    def smooth(self, times, data, valid=None, confidence=None):
+        """
+        Smooths a whole take.
+
+        The RTS smoothed means are the minimiser of a block-tridiagonal least-squares
+        problem, so instead of stepping the recursions frame by frame in Python we
+        assemble that system in banded form and let LAPACK factorise it: the banded
+        Cholesky factorisation is the forward (filter) sweep and the back
+        substitution is the backward (RTS) sweep. Channels sharing the same weights
+        (x, y, z of one joint) are solved together as extra right-hand sides.
+
+        Args:
+            times: (frames,) timestamps; the median interval is used as dt.
+            data: (frames, channels) positions.
+            valid: Optional (frames, channels) mask. Masked samples carry no measurement.
+            confidence: Optional (frames, channels) per-sample confidence in (0, 1]; scales measurement noise.
+
+        Returns:
+            (frames, channels) smoothed positions. Channels that are never valid are returned unchanged.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        num_frames, num_channels = data.shape
+        if valid is None:
+            valid = np.ones(data.shape, dtype=bool)
+        valid = np.asarray(valid, dtype=bool)
+        if confidence is None:
+            confidence = np.ones(data.shape)
+        weights = np.where(valid, np.clip(confidence, 1e-3, None), 0.0) / self.measurement_noise
+
+        out = data.copy()
+        if num_frames < 2:
+            return out
+
+        dt = float(np.median(np.diff(times)))
+        if dt <= 0:
+            dt = 1.0 / 30.0
+        ab = self._base_bands(num_frames, dt)
+        d = ab.shape[0] // 2
+
+        # Channel-major weights and Fortran-ordered right-hand sides, as LAPACK wants them
+        columns = np.ascontiguousarray(weights.T)
+        weighted = np.where(valid, weights * data, 0.0)
+        rhs = np.zeros((num_frames * d, num_channels), order="F")
+        rhs[::d] = weighted
+        # Diffuse prior centred on the first measurement
+        first = np.argmax(columns > 0, axis=1)
+        rhs[0] += data[first, np.arange(num_channels)] / self.prior_variance
+
+        # Group channels with identical weights so they share one factorisation
+        groups = {}
+        for c in np.flatnonzero(columns.any(axis=1)):
+            groups.setdefault(columns[c].tobytes(), []).append(c)
+
+        bands = np.empty_like(ab)
+        for chans in groups.values():
+            np.copyto(bands, ab)
+            bands[0, ::d] += columns[chans[0]]
+            factor, info = dpbtrf(bands, lower=1, overwrite_ab=1)
+            if info != 0:
+                raise np.linalg.LinAlgError(f"Smoother system is not positive definite (info={info})")
+            # x, y, z of a joint are consecutive channels: a slice is solved in place, without a copy
+            if chans[-1] - chans[0] == len(chans) - 1:
+                chans = slice(chans[0], chans[-1] + 1)
+            state, info = dpbtrs(factor, rhs[:, chans], lower=1, overwrite_b=1)
+            out[:, chans] = state[::d]
+        return out
+
+    def _base_bands(self, num_frames, dt):
+        """Lower banded (LAPACK) form of the measurement-free information matrix."""
+        A, Q = motion_model(self.model, dt, self.process_noise)
+        d = A.shape[0]
+        Qi = np.linalg.inv(Q)
+        u = 2 * d - 1
+
+        # Diagonal blocks: transition terms plus the diffuse prior on the first state
+        diag = np.zeros((num_frames, d, d))
+        diag[:-1] += A.T @ Qi @ A
+        diag[1:] += Qi
+        diag[0] += np.eye(d) / self.prior_variance
+        off = -A.T @ Qi  # block (t, t+1)
+
+        ab = np.zeros((u + 1, num_frames * d))
+        starts = np.arange(num_frames) * d
+        for k in range(d):
+            for l in range(d):
+                if k >= l:
+                    ab[k - l, starts + l] = diag[:, k, l]
+                ab[d + l - k, starts[:-1] + k] = off[k, l]
+        return ab
@@ -0,0 +1,221 @@
+
+import csv
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from processing.reconstruct import load_keypoint_cache, triangulate_take, track_take, smooth_track
+from processing.gaps import channel_mask_to_joints
+from processing.keypoints import KeypointSchema
+
+# Settings that change triangulation or tracking; everything else only re-runs the filter
+TRIANGULATION_KEYS = ("min_confidence", "max_distance", "max_missing", "min_length")
+RESULT_COLUMNS = ["score", "reprojection_px", "jitter", "coverage", "tracks"]
+
+
+def parameter_grid(**values):
+    """
+    Cartesian product of setting values, e.g. parameter_grid(min_cutoff=[0.5, 1.0], beta=[0.0, 0.1]).
+    Earlier keywords vary slowest, so list triangulation settings first to keep shared work together.
+    """
+    keys = list(values)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(values[k] for k in keys))]
+
+def project(projections, points):
+    """
+    Projects (frames, joints, 3) points into every view.
+
+    Returns:
+        (views, frames, joints, 2) pixel coordinates and a (views, frames, joints) in-front-of-camera mask.
+    """
+    projections = np.asarray(projections, dtype=np.float64)
+    homogeneous = np.concatenate([points, np.ones(points.shape[:-1] + (1,))], axis=-1)
+    image = np.einsum("vik,fjk->vfji", projections, homogeneous)
+    depth = image[..., 2]
+    in_front = depth > 1e-9
+    uv = image[..., :2] / np.where(in_front, depth, 1.0)[..., None]
+    return uv, in_front
+
+def track_observations(keypoints, sources, ids, track_id):
+    """
+    Gathers the 2D detections one persistent ID was triangulated from.
+
+    Returns:
+        (views, frames, joints, 3) array of (u, v, confidence), zeros where the view did not see the person.
+    """
+    num_views, num_frames = keypoints.shape[:2]
+    person = np.full((num_frames, num_views), -1, dtype=np.int64)
+    frames, slots = np.nonzero(ids == track_id)
+    person[frames] = sources[frames, slots]
+    observations = np.zeros((num_views, num_frames) + keypoints.shape[3:], dtype=np.float64)
+    for v in range(num_views):
+        seen = np.flatnonzero(person[:, v] >= 0)
+        observations[v, seen] = keypoints[v, seen, person[seen, v]]
+    return observations
+
+def reprojection_residuals(points, valid, observations, projections, min_confidence=0.1):
+    """
+    Pixel distance between reconstructed joints and every confident 2D detection of them.
+
+    Returns:
+        1D array of residuals (one per view, frame and joint that has both).
+    """
+    uv, in_front = project(projections, points)
+    use = (observations[..., 2] >= min_confidence) & valid[None] & in_front
+    return np.linalg.norm(uv - observations[..., :2], axis=-1)[use]
+
+def acceleration_magnitudes(points, valid, fps):
+    """Second-difference acceleration (units/s^2) wherever three consecutive frames are valid."""
+    accel = (points[2:] - 2 * points[1:-1] + points[:-2]) * fps * fps
+    both = valid[2:] & valid[1:-1] & valid[:-2]
+    return np.linalg.norm(accel, axis=-1)[both]
+
+def evaluate_settings(cache, settings, eval_confidence=0.1, tracked=None):
+    """
+    Reconstructs a cached take with one set of settings and scores it.
+
+    Reprojection error is measured against every 2D detection above eval_confidence,
+    independent of the swept threshold, so dropping detections cannot hide error.
+    It also rises with filter lag, which balances the jitter metric.
+
+    Args:
+        cache: Dict from load_keypoint_cache.
+        settings: Dict from reconstruction_settings with any swept values applied.
+        eval_confidence: 2D score a detection needs to count as ground truth.
+        tracked: Optional precomputed (sources, ids, tracks) for these triangulation settings.
+
+    Returns:
+        Dict with reprojection_px (mean), jitter (mean acceleration), coverage
+        (fraction of joints seen by 2+ views that were reconstructed) and tracks.
+    """
+    keypoints = cache["keypoints"]
+    projections = cache["projections"]
+    fps = cache["fps"]
+    num_frames = keypoints.shape[1]
+    times = np.arange(num_frames) / fps
+    if tracked is None:
+        tracked = triangulate_and_track(cache, settings)
+    sources, ids, tracks = tracked
+
+    residuals = []
+    accelerations = []
+    observed = 0
+    covered = 0
+    for track_id, (t_points, t_valid, t_conf) in sorted(tracks.items()):
+        filtered, mask = smooth_track(times, t_points, t_valid, t_conf, settings)
+        filtered = filtered.reshape(t_points.shape)
+        joint_valid = channel_mask_to_joints(mask)
+
+        observations = track_observations(keypoints, sources, ids, track_id)
+        residuals.append(reprojection_residuals(filtered, joint_valid, observations, projections, eval_confidence))
+        accelerations.append(acceleration_magnitudes(filtered, joint_valid, fps))
+        observable = (observations[..., 2] >= eval_confidence).sum(axis=0) >= 2
+        observed += int(observable.sum())
+        covered += int((observable & joint_valid).sum())
+
+    residuals = np.concatenate(residuals) if residuals else np.zeros(0)
+    accelerations = np.concatenate(accelerations) if accelerations else np.zeros(0)
+    return {
+        "reprojection_px": float(residuals.mean()) if len(residuals) else math.inf,
+        "jitter": float(accelerations.mean()) if len(accelerations) else math.inf,
+        "coverage": covered / observed if observed else 0.0,
+        "tracks": len(tracks),
+    }
+
+def triangulate_and_track(cache, settings):
+    """Returns (sources, ids, tracks) for the triangulation and tracking part of settings."""
+    schema = KeypointSchema(cache.get("joint_sets", ["body"]))
+    points, valid, confidence, sources = triangulate_take(
+        cache["keypoints"], cache["projections"], settings["min_confidence"], match_joints=schema.body
+    )
+    ids, tracks = track_take(points, valid, confidence, settings)
+    return sources, ids, tracks
+
+
+# Per-process state: the cache is loaded once per worker, triangulations are reused across filter settings
+_WORKER = {}
+
+def _init_worker(cache_path, base_settings, eval_confidence):
+    _WORKER.clear()
+    _WORKER.update(
+        cache=load_keypoint_cache(cache_path),
+        base_settings=dict(base_settings),
+        eval_confidence=eval_confidence,
+        tracked={},
+    )
+
+def _evaluate(params):
+    settings = dict(_WORKER["base_settings"], **params)
+    key = tuple(settings[k] for k in TRIANGULATION_KEYS)
+    if key not in _WORKER["tracked"]:
+        _WORKER["tracked"][key] = triangulate_and_track(_WORKER["cache"], settings)
+    metrics = evaluate_settings(
+        _WORKER["cache"], settings, _WORKER["eval_confidence"], tracked=_WORKER["tracked"][key]
+    )
+    return dict(params, **metrics)
+
+
+class ParameterSweep:
+    def __init__(self, cache_path, base_settings, eval_confidence=0.1, jitter_weight=1.0, workers=None):
+        """
+        cache_path: {scene}_{take}_keypoints.npz written by the pipeline
+        base_settings: Dict from reconstruction_settings; swept values override it
+        eval_confidence: 2D score a detection needs to count in the reprojection metric
+        jitter_weight: Importance of smoothness relative to reprojection accuracy in the score
+        workers: Process count (None = CPU count, 1 = run in this process)
+        """
+        self.cache_path = cache_path
+        self.base_settings = dict(base_settings)
+        self.eval_confidence = float(eval_confidence)
+        self.jitter_weight = float(jitter_weight)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, grid):
+        """
+        Evaluates every settings dict of the grid.
+
+        Returns:
+            Result rows (swept values plus metrics), best first.
+        """
+        # Keep combinations sharing a triangulation together so each worker triangulates it once
+        grid = sorted(grid, key=lambda params: tuple(
+            str(dict(self.base_settings, **params)[k]) for k in TRIANGULATION_KEYS
+        ))
+        print(f"[Sweep] Evaluating {len(grid)} settings on {self.workers} worker(s)...")
+        init_args = (self.cache_path, self.base_settings, self.eval_confidence)
+        if self.workers <= 1:
+            _init_worker(*init_args)
+            rows = [_evaluate(params) for params in grid]
+        else:
+            chunksize = max(1, math.ceil(len(grid) / (self.workers * 4)))
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=init_args
+            ) as pool:
+                rows = list(pool.map(_evaluate, grid, chunksize=chunksize))
+        return self.rank(rows)
+
+    def rank(self, rows):
+        """
+        Scores rows relative to the best reprojection error and jitter of the sweep, lower is better.
+        The score is divided by coverage so settings that drop joints cannot win by omission.
+        """
+        best_error = min((r["reprojection_px"] for r in rows if r["reprojection_px"] > 0), default=1.0)
+        best_jitter = min((r["jitter"] for r in rows if r["jitter"] > 0), default=1.0)
+        for row in rows:
+            score = row["reprojection_px"] / best_error + self.jitter_weight * row["jitter"] / best_jitter
+            row["score"] = score / row["coverage"] if row["coverage"] > 0 else math.inf
+        return sorted(rows, key=lambda r: r["score"])
+
+    @staticmethod
+    def write_table(rows, filename):
+        """Writes ranked rows as CSV: rank, swept settings, then metrics."""
+        params = [k for k in rows[0] if k not in RESULT_COLUMNS] if rows else []
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["rank"] + params + RESULT_COLUMNS)
+            for rank, row in enumerate(rows, 1):
+                writer.writerow([rank] + [row[k] for k in params + RESULT_COLUMNS])
+        print(f"[Sweep] Wrote {len(rows)} ranked settings to {filename}")
@@ -0,0 +1,142 @@
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class PersonTracker:
+    def __init__(self, max_distance=0.5, max_missing=15, min_length=10, min_joints=4):
+        """
+        max_distance: Largest mean joint distance (world units) for a detection to continue a track
+        max_missing: Frames a track survives without a detection (occlusion buffer)
+        min_length: Tracks seen in fewer frames are discarded as noise
+        min_joints: Detections with fewer valid joints are ignored
+        """
+        self.max_distance = float(max_distance)
+        self.max_missing = int(max_missing)
+        self.min_length = int(min_length)
+        self.min_joints = int(min_joints)
+
+    def track(self, points, valid):
+        """
+        Links per-frame person skeletons into persistent identities.
+
+        Args:
+            points: (frames, slots, joints, 3) skeletons. Slot order within a frame is arbitrary.
+            valid: (frames, slots, joints) bool mask of triangulated joints.
+
+        Returns:
+            ids: (frames, slots) int array with the persistent ID of every detection, -1 if unassigned.
+                 IDs are numbered 0..N-1 in order of first appearance.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        valid = np.asarray(valid, dtype=bool)
+        num_frames, num_slots = valid.shape[:2]
+        ids = np.full((num_frames, num_slots), -1, dtype=np.int64)
+
+        # Active track state, one row per live track
+        track_ids = []
+        last_pos = np.zeros((0,) + points.shape[2:])
+        last_valid = np.zeros((0,) + valid.shape[2:], dtype=bool)
+        velocity = np.zeros_like(last_pos)
+        last_seen = np.zeros(0, dtype=np.int64)
+        lengths = []
+
+        for f in range(num_frames):
+            det_slots = np.flatnonzero(valid[f].sum(axis=1) >= self.min_joints)
+            det_pos = points[f, det_slots]
+            det_valid = valid[f, det_slots]
+
+            matched_tracks = np.zeros(len(track_ids), dtype=bool)
+            matched_dets = np.zeros(len(det_slots), dtype=bool)
+
+            if track_ids and len(det_slots):
+                gap = (f - last_seen)[:, None, None]
+                predicted = last_pos + velocity * gap
+                cost = self._cost(predicted, last_valid, det_pos, det_valid)
+                rows, cols = linear_sum_assignment(cost)
+                keep = cost[rows, cols] <= self.max_distance
+                for t, d in zip(rows[keep], cols[keep]):
+                    dv = det_valid[d]
+                    both = dv & last_valid[t]
+                    new_vel = (det_pos[d] - last_pos[t]) / max(f - last_seen[t], 1)
+                    velocity[t][both] = 0.5 * velocity[t][both] + 0.5 * new_vel[both]
+                    last_pos[t][dv] = det_pos[d][dv]
+                    last_valid[t] |= dv
+                    last_seen[t] = f
+                    ids[f, det_slots[d]] = track_ids[t]
+                    lengths[track_ids[t]] += 1
+                    matched_tracks[t] = True
+                    matched_dets[d] = True
+
+            # Tracks that have been occluded for too long are retired
+            alive = matched_tracks | (f - last_seen <= self.max_missing)
+            track_ids = [tid for tid, keep in zip(track_ids, alive) if keep]
+            last_pos, last_valid = last_pos[alive], last_valid[alive]
+            velocity, last_seen = velocity[alive], last_seen[alive]
+
+            # Unmatched detections start new tracks
+            new = np.flatnonzero(~matched_dets)
+            if len(new):
+                for d in new:
+                    ids[f, det_slots[d]] = len(lengths)
+                    track_ids.append(len(lengths))
+                    lengths.append(1)
+                last_pos = np.concatenate([last_pos, det_pos[new]])
+                last_valid = np.concatenate([last_valid, det_valid[new]])
+                velocity = np.concatenate([velocity, np.zeros_like(det_pos[new])])
+                last_seen = np.concatenate([last_seen, np.full(len(new), f)])
+
+        # Drop short-lived tracks and renumber the survivors by first appearance
+        lengths = np.asarray(lengths, dtype=np.int64)
+        remap = np.full(len(lengths) + 1, -1, dtype=np.int64)
+        kept = np.flatnonzero(lengths >= self.min_length)
+        remap[kept] = np.arange(len(kept))
+        return remap[ids]
+
+    def _cost(self, predicted, pred_valid, det_pos, det_valid):
+        """Mean distance over joints valid in both skeletons, falling back to centroid distance."""
+        both = pred_valid[:, None, :] & det_valid[None, :, :]
+        dist = np.linalg.norm(predicted[:, None] - det_pos[None, :], axis=-1)
+        shared = both.sum(axis=-1)
+        cost = np.where(both, dist, 0.0).sum(axis=-1) / np.maximum(shared, 1)
+
+        pred_centroid = self._centroid(predicted, pred_valid)
+        det_centroid = self._centroid(det_pos, det_valid)
+        centroid_dist = np.linalg.norm(pred_centroid[:, None] - det_centroid[None, :], axis=-1)
+        cost = np.where(shared > 0, cost, centroid_dist)
+        # linear_sum_assignment needs finite costs
+        return np.where(np.isfinite(cost), cost, 1e9)
+
+    @staticmethod
+    def _centroid(pos, mask):
+        count = np.maximum(mask.sum(axis=-1, keepdims=True), 1)
+        return np.where(mask[..., None], pos, 0.0).sum(axis=-2) / count
+
+
+def split_tracks(points, valid, ids, confidence=None):
+    """
+    Gathers tracked detections into one full-length array per persistent ID.
+
+    Args:
+        confidence: Optional (frames, slots, joints) per-joint confidence; defaults to 1 for valid joints.
+
+    Returns:
+        Dict {track_id: (points (frames, joints, 3), valid (frames, joints), confidence (frames, joints))}.
+        Frames where the person is absent are marked invalid with zero confidence.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool)
+    if confidence is None:
+        confidence = valid.astype(np.float64)
+    num_frames = valid.shape[0]
+    tracks = {}
+    for tid in np.unique(ids[ids >= 0]):
+        frames, slots = np.nonzero(ids == tid)
+        t_points = np.zeros((num_frames,) + points.shape[2:])
+        t_valid = np.zeros((num_frames,) + valid.shape[2:], dtype=bool)
+        t_conf = np.zeros(t_valid.shape)
+        t_points[frames] = points[frames, slots]
+        t_valid[frames] = valid[frames, slots]
+        t_conf[frames] = confidence[frames, slots]
+        tracks[int(tid)] = (t_points, t_valid, t_conf)
+    return tracks
@@ -1,6 +1,7 @@
 
 import numpy as np
 import cv2
+from scipy.optimize import linear_sum_assignment
 
 def DLT(P_list, points_list):
     """
@@ -52,7 +53,7 @@ def DLT(P_list, points_list):
 
     return X
 
-def triangulate_frame(projection_matrices, keypoints_per_camera):
+def triangulate_frame(projection_matrices, keypoints_per_camera, min_confidence=0.1):
     """
     Triangulates all keypoints for a single frame.
     
@@ -60,6 +61,7 @@ def triangulate_frame(projection_matrices, keypoints_per_camera):
         projection_matrices: List of P matrices.
         keypoints_per_camera: List of keypoint lists. 
                               shape: (num_cameras, num_keypoints, 2) or dicts.
+        min_confidence: 2D detections below this OpenPose score are ignored.
                               
     Returns:
         List of 3D points.
@@ -83,7 +85,7 @@ def triangulate_frame(projection_matrices, keypoints_per_camera):
                 points_2d.append(None)
                 continue
             # Check confidence if available? OpenPose usually gives (x, y, confidence)
-            if len(kp) >= 3 and kp[2] < 0.1: # Low confidence
+            if len(kp) >= 3 and kp[2] < min_confidence: # Low confidence
                 points_2d.append(None)
             else:
                 points_2d.append(kp[:2])
@@ -92,3 +94,184 @@ def triangulate_frame(projection_matrices, keypoints_per_camera):
         points_3d.append(pt_3d)
         
     return points_3d
+
+def keypoint_confidence(keypoints_per_camera, min_confidence=0.1):
+    """
+    Per-keypoint triangulation confidence for one person.
+
+    Returns:
+        List with the mean 2D confidence of the views used for each keypoint,
+        0.0 where fewer than two views see it.
+    """
+    num_keypoints = max((len(kps) for kps in keypoints_per_camera if kps), default=0)
+    confidence = []
+    for i in range(num_keypoints):
+        scores = []
+        for kps in keypoints_per_camera:
+            if i >= len(kps) or not kps[i] or len(kps[i]) < 2:
+                continue
+            score = kps[i][2] if len(kps[i]) >= 3 else 1.0
+            if score >= min_confidence:
+                scores.append(score)
+        confidence.append(sum(scores) / len(scores) if len(scores) >= 2 else 0.0)
+    return confidence
+
+def fundamental_from_projections(P1, P2):
+    """
+    Fundamental matrix mapping points in view 1 to epipolar lines in view 2.
+    """
+    # Camera centre of view 1 is the null space of P1
+    _, _, vh = np.linalg.svd(P1)
+    C1 = vh[-1]
+    e2 = P2 @ C1
+    e2_cross = np.array([
+        [0, -e2[2], e2[1]],
+        [e2[2], 0, -e2[0]],
+        [-e2[1], e2[0], 0],
+    ])
+    return e2_cross @ P2 @ np.linalg.pinv(P1)
+
+def epipolar_distance(F, kps1, kps2, min_confidence=0.1):
+    """
+    Mean symmetric epipolar distance (pixels) between two 2D skeletons.
+
+    Args:
+        F: Fundamental matrix from view 1 to view 2.
+        kps1, kps2: (num_keypoints, 3) arrays of (u, v, confidence).
+
+    Returns:
+        Distance in pixels, or np.inf if the skeletons share no confident joints.
+    """
+    n = min(len(kps1), len(kps2))
+    kps1 = np.asarray(kps1[:n], dtype=np.float64)
+    kps2 = np.asarray(kps2[:n], dtype=np.float64)
+    if n == 0:
+        return np.inf
+    both = (kps1[:, 2] >= min_confidence) & (kps2[:, 2] >= min_confidence)
+    if not np.any(both):
+        return np.inf
+
+    x1 = np.column_stack([kps1[both, :2], np.ones(both.sum())])
+    x2 = np.column_stack([kps2[both, :2], np.ones(both.sum())])
+    l2 = x1 @ F.T
+    l1 = x2 @ F
+    d2 = np.abs(np.sum(x2 * l2, axis=1)) / np.maximum(np.hypot(l2[:, 0], l2[:, 1]), 1e-12)
+    d1 = np.abs(np.sum(x1 * l1, axis=1)) / np.maximum(np.hypot(l1[:, 0], l1[:, 1]), 1e-12)
+    return float(np.mean(0.5 * (d1 + d2)))
+
+def associate_people_across_views(projection_matrices, people_per_camera, max_epipolar_distance=30.0,
+                                  fundamentals=None, min_confidence=0.1):
+    """
+    Groups the 2D people seen by each camera into cross-view person hypotheses.
+
+    Args:
+        projection_matrices: List of P matrices.
+        people_per_camera: For each camera, a list of people, each a list of (u, v, confidence) keypoints.
+        max_epipolar_distance: Largest mean epipolar distance (pixels) accepted for a match.
+        fundamentals: Optional dict {(i, j): F} of precomputed fundamental matrices.
+        min_confidence: Joints below this score do not contribute to the epipolar cost.
+
+    Returns:
+        List of groups, each a dict {camera index: person index}.
+        Groups seen by fewer than two cameras are dropped.
+    """
+    num_cams = len(projection_matrices)
+    counts = [len(people) for people in people_per_camera]
+
+    # Common single-person case: no association needed
+    if max(counts, default=0) <= 1:
+        group = {cam_idx: 0 for cam_idx, count in enumerate(counts) if count}
+        return [group] if len(group) >= 2 else []
+
+    if fundamentals is None:
+        fundamentals = {}
+
+    def get_F(i, j):
+        if (i, j) not in fundamentals:
+            fundamentals[(i, j)] = fundamental_from_projections(projection_matrices[i], projection_matrices[j])
+        return fundamentals[(i, j)]
+
+    # Greedy view-by-view association: every group maps camera index -> person index
+    groups = []
+    for cam_idx in range(num_cams):
+        people = people_per_camera[cam_idx]
+        if not people:
+            continue
+        unmatched = list(range(len(people)))
+        if groups:
+            cost = np.full((len(groups), len(people)), np.inf)
+            for g, group in enumerate(groups):
+                for p, kps in enumerate(people):
+                    dists = [
+                        epipolar_distance(
+                            get_F(other_cam, cam_idx), people_per_camera[other_cam][other_p], kps, min_confidence
+                        )
+                        for other_cam, other_p in group.items()
+                    ]
+                    dists = [d for d in dists if np.isfinite(d)]
+                    if dists:
+                        cost[g, p] = np.mean(dists)
+            finite_cost = np.where(np.isfinite(cost), cost, 1e9)
+            rows, cols = linear_sum_assignment(finite_cost)
+            for g, p in zip(rows, cols):
+                if cost[g, p] <= max_epipolar_distance:
+                    groups[g][cam_idx] = p
+                    unmatched.remove(p)
+        for p in unmatched:
+            groups.append({cam_idx: p})
+
+    return [group for group in groups if len(group) >= 2]
+
+def match_people_across_views(projection_matrices, people_per_camera, max_epipolar_distance=30.0,
+                              fundamentals=None, min_confidence=0.1):
+    """
+    Like associate_people_across_views, but returns the grouped keypoints.
+
+    Returns:
+        List of groups, each a list of per-camera keypoint lists ([] where the person is unseen),
+        ready for triangulate_frame.
+    """
+    groups = associate_people_across_views(
+        projection_matrices, people_per_camera, max_epipolar_distance, fundamentals, min_confidence
+    )
+    return [
+        [people_per_camera[cam_idx][group[cam_idx]] if cam_idx in group else [] for cam_idx in range(len(projection_matrices))]
+        for group in groups
+    ]
+
+def triangulate_points(projection_matrices, observations, min_confidence=0.1):
+    """
+    Batched DLT over any number of points at once.
+
+    Gives the same estimate as DLT: the eigenvector of A^T A with the smallest
+    eigenvalue is the smallest right singular vector of A. Unseen or low-confidence
+    views contribute zero rows.
+
+    Args:
+        projection_matrices: (views, 3, 4) array.
+        observations: (..., views, 3) array of (u, v, confidence); confidence 0 where unseen.
+        min_confidence: 2D detections below this score are ignored.
+
+    Returns:
+        points (..., 3) and a (...) valid mask (two or more confident views, not at infinity).
+    """
+    P = np.asarray(projection_matrices, dtype=np.float64)
+    observations = np.asarray(observations, dtype=np.float64)
+    use = (observations[..., 2] >= min_confidence)[..., None]
+    row_u = (observations[..., 0:1] * P[:, 2] - P[:, 0]) * use
+    row_v = (observations[..., 1:2] * P[:, 2] - P[:, 1]) * use
+    M = np.einsum("...vi,...vj->...ij", row_u, row_u) + np.einsum("...vi,...vj->...ij", row_v, row_v)
+    _, vectors = np.linalg.eigh(M)
+    X = vectors[..., 0]
+    w = X[..., 3]
+    valid = (use[..., 0].sum(axis=-1) >= 2) & (np.abs(w) > 1e-12)
+    points = X[..., :3] / np.where(valid, w, 1.0)[..., None]
+    return np.where(valid[..., None], points, 0.0), valid
+
+def triangulation_confidence(observations, min_confidence=0.1):
+    """Batched keypoint_confidence over (..., views, 3) observations; returns (...) scores."""
+    scores = np.asarray(observations, dtype=np.float64)[..., 2]
+    use = scores >= min_confidence
+    count = use.sum(axis=-1)
+    mean = np.where(use, scores, 0.0).sum(axis=-1) / np.maximum(count, 1)
+    return np.where(count >= 2, mean, 0.0)
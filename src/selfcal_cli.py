@@ -0,0 +1,53 @@
+import os
+import argparse
+import sys
+
+import numpy as np
+
+from processing.reconstruct import load_keypoint_cache
+from processing.selfcal import self_calibrate, write_calibration_version
+from utils.config import config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refine camera extrinsics from the actor keypoints of a cached take")
+    parser.add_argument("scene", help="Scene name (e.g. Scene_01)")
+    parser.add_argument("take", help="Take number (e.g. 001)")
+    parser.add_argument("--min-confidence", type=float, default=0.5, help="2D confidence a keypoint needs to be used")
+    parser.add_argument("--max-points", type=int, default=20000, help="Most 3D keypoints used in the solve")
+    parser.add_argument("--apply", action="store_true",
+                        help="Also make the refined calibration the active one (the old one is kept as a version)")
+    parser.add_argument("--output-dir", type=str, default="MocapExports", help="Folder with the keypoint cache")
+    args = parser.parse_args()
+
+    cache_path = os.path.join(args.output_dir, f"{args.scene}_{args.take}_keypoints.npz")
+    if not os.path.exists(cache_path):
+        print(f"Keypoint cache {cache_path} not found. Process the take once to create it.")
+        sys.exit(1)
+    calib_path = config.get("Calibration", {}).get("save_path", "calibration.npz")
+    if not os.path.exists(calib_path):
+        print(f"Calibration {calib_path} not found. Run the board calibration first.")
+        sys.exit(1)
+
+    with np.load(calib_path) as data:
+        calibration = {key: data[key] for key in data.files}
+    outcome = self_calibrate(
+        load_keypoint_cache(cache_path), calibration,
+        min_confidence=args.min_confidence, max_points=args.max_points,
+    )
+    if outcome is None:
+        sys.exit(1)
+    refined, error_before, error_after = outcome
+    if error_after >= error_before:
+        print(f"Reprojection error did not drop ({error_before:.2f} -> {error_after:.2f} px); calibration unchanged.")
+        sys.exit(1)
+
+    if args.apply:
+        previous = write_calibration_version(calibration, calib_path)
+        tmp_path = calib_path + ".tmp.npz"
+        np.savez(tmp_path, **refined)
+        os.replace(tmp_path, calib_path)
+        print(f"Applied refined calibration to {calib_path} (previous one kept as {previous}).")
+    else:
+        path = write_calibration_version(refined, calib_path)
+        print(f"Refined calibration written to {path}. Copy it over {calib_path} or re-run with --apply to use it.")
@@ -0,0 +1,46 @@
+import os
+import argparse
+import sys
+from processing.reconstruct import reconstruction_settings
+from processing.sweep import ParameterSweep, parameter_grid
+from utils.config import config
+
+
+def parse_values(text, default):
+    """Comma separated floats, or the single config default when the flag is omitted."""
+    if not text:
+        return [default]
+    return [float(v.strip()) for v in text.split(",") if v.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-process a cached take over a grid of settings")
+    parser.add_argument("scene", help="Scene name (e.g. Scene_01)")
+    parser.add_argument("take", help="Take number (e.g. 001)")
+    parser.add_argument("--confidence", type=str, help="Comma separated 2D confidence thresholds")
+    parser.add_argument("--min-cutoff", type=str, help="Comma separated One Euro min_cutoff values")
+    parser.add_argument("--beta", type=str, help="Comma separated One Euro beta values")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--jitter-weight", type=float, default=1.0, help="Smoothness vs. accuracy weight in the score")
+    parser.add_argument("--output-dir", type=str, default="MocapExports", help="Folder with the keypoint cache")
+    args = parser.parse_args()
+
+    cache_path = os.path.join(args.output_dir, f"{args.scene}_{args.take}_keypoints.npz")
+    if not os.path.exists(cache_path):
+        print(f"Keypoint cache {cache_path} not found. Process the take once to create it.")
+        sys.exit(1)
+
+    settings = reconstruction_settings(config)
+    grid = parameter_grid(
+        min_confidence=parse_values(args.confidence, settings["min_confidence"]),
+        min_cutoff=parse_values(args.min_cutoff, settings["min_cutoff"]),
+        beta=parse_values(args.beta, settings["beta"]),
+    )
+
+    sweep = ParameterSweep(cache_path, settings, jitter_weight=args.jitter_weight, workers=args.workers)
+    rows = sweep.run(grid)
+    sweep.write_table(rows, os.path.join(args.output_dir, f"{args.scene}_{args.take}_sweep.csv"))
+
+    print("Best settings:")
+    for row in rows[:5]:
+        print(f"  confidence={row['min_confidence']} min_cutoff={row['min_cutoff']} beta={row['beta']}"
+              f"  reprojection={row['reprojection_px']:.2f}px jitter={row['jitter']:.2f} coverage={row['coverage']:.0%}")
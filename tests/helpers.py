@@ -0,0 +1,26 @@
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+
+def camera_ring(count, radius=2.5):
+    """World-to-camera rotation vectors and translations of cameras looking at the origin."""
+    poses = []
+    for c in range(count):
+        angle = 2 * np.pi * c / count
+        center = np.array([radius * np.sin(angle), -1.0, -radius * np.cos(angle)])
+        z = -center / np.linalg.norm(center)
+        x = np.cross([0, 1, 0], z)
+        x /= np.linalg.norm(x)
+        R = np.vstack([x, np.cross(z, x), z])
+        poses.append((Rotation.from_matrix(R).as_rotvec(), -R @ center))
+    return poses
+
+def camera_rig():
+    """(3, 3, 4) projections of three 640x480 cameras 5 m from the origin, turned 0 and +-0.5 rad."""
+    K = np.array([[800.0, 0, 320], [0, 800.0, 240], [0, 0, 1]])
+    projections = []
+    for angle in (0.0, 0.5, -0.5):
+        c, s = np.cos(angle), np.sin(angle)
+        R = np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+        projections.append(K @ np.hstack((R, [[0], [0], [5.0]])))
+    return np.array(projections)
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.bundle import intrinsics_matrices, intrinsics_vector, project_points, refine_calibration
+from processing.frame_selection import charuco_board_points
+
+from helpers import camera_ring
+
+K = np.array([[900.0, 0, 640], [0, 900.0, 360], [0, 0, 1]])
+DIST = np.array([[0.05, -0.1, 0.0, 0.0, 0.0]])
+
+
+def synthetic_rig(num_cams=3, num_sets=8, noise=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    truth = camera_ring(num_cams)
+    ids = np.arange(24)
+    board = np.column_stack([charuco_board_points(ids, 5) * 0.04, np.zeros(len(ids))])
+    results, views = {}, {}
+    for c, (r, t) in enumerate(truth):
+        cid = f"cam{c}"
+        results[f"mtx_{cid}"], results[f"dist_{cid}"] = K, DIST
+        # Single-image poses carry a few mm / mrad of error
+        results[f"rvec_{cid}"] = (r + rng.normal(0, 0.01, 3)).reshape(3, 1)
+        results[f"tvec_{cid}"] = (t + rng.normal(0, 0.02, 3)).reshape(3, 1)
+        views[cid] = {}
+    for s in range(num_sets):
+        R_s = np.eye(3) if s == 0 else Rotation.from_rotvec(rng.normal(0, 0.3, 3)).as_matrix()
+        t_s = np.zeros(3) if s == 0 else rng.normal(0, 0.2, 3)
+        world = board @ R_s.T + t_s
+        for c, (r, t) in enumerate(truth):
+            R_c = Rotation.from_rotvec(r).as_matrix()
+            uv = project_points(world @ R_c.T + t, np.tile(intrinsics_vector(K, DIST), (len(ids), 1)))
+            views[f"cam{c}"][f"img_{s:04d}.jpg"] = (
+                ids, uv + rng.normal(0, noise, uv.shape),
+                Rotation.from_matrix(R_c @ R_s).as_rotvec() + rng.normal(0, 0.01, 3),
+                R_c @ t_s + t + rng.normal(0, 0.01, 3),
+            )
+    return truth, results, views
+
+
+class BundleTests(unittest.TestCase):
+    def test_intrinsics_vector_round_trip(self):
+        mtx, dist = intrinsics_matrices(intrinsics_vector(K, DIST))
+
+        np.testing.assert_allclose(mtx, K)
+        np.testing.assert_allclose(dist, DIST)
+
+    def test_refinement_recovers_camera_poses(self):
+        truth, results, views = synthetic_rig()
+
+        refined, rms_before, rms_after = refine_calibration(results, views, columns=5, square_length=0.04)
+
+        self.assertGreater(rms_before, 2.0)
+        self.assertLess(rms_after, 0.5)
+        for c, (r, t) in enumerate(truth):
+            before = np.abs(results[f"tvec_cam{c}"].ravel() - t).max()
+            after = np.abs(refined[f"tvec_cam{c}"].ravel() - t).max()
+            self.assertLess(after, before)
+            self.assertLess(after, 5e-3)
+            np.testing.assert_allclose(refined[f"rvec_cam{c}"].ravel(), r, atol=5e-3)
+        np.testing.assert_allclose(refined["mtx_cam0"], K)
+
+    def test_needs_the_reference_set(self):
+        _, results, views = synthetic_rig(num_sets=3)
+        for cam_views in views.values():
+            del cam_views["img_0000.jpg"]
+
+        self.assertIsNone(refine_calibration(results, views, columns=5, square_length=0.04))
+
+
+if __name__ == "__main__":
+    unittest.main()
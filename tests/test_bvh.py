@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.bvh import (
+    euler_zxy_to_matrix,
+    forward_kinematics,
+    matrix_to_euler_zxy,
+    rest_offsets,
+    solve_rotations,
+    verify_bvh,
+    write_bvh,
+)
+
+
+def posed_skeleton(num_frames=50, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = rest_offsets(rng.uniform(0.05, 0.5, 24))
+    local = euler_zxy_to_matrix(rng.uniform(-60, 60, (num_frames, 25, 3)))
+    root = rng.normal(size=(num_frames, 3))
+    return forward_kinematics(local, root, offsets), offsets, local
+
+
+class BvhTests(unittest.TestCase):
+    def test_solved_rotations_reproduce_joint_positions(self):
+        points, offsets, _ = posed_skeleton()
+
+        rotations = solve_rotations(points)
+        rebuilt = forward_kinematics(rotations, points[:, 8], offsets)
+
+        np.testing.assert_allclose(rebuilt, points, atol=1e-9)
+        np.testing.assert_allclose(np.linalg.det(rotations), 1.0, atol=1e-9)
+
+    def test_euler_conversion_round_trips(self):
+        _, _, local = posed_skeleton(num_frames=10)
+
+        np.testing.assert_allclose(euler_zxy_to_matrix(matrix_to_euler_zxy(local)), local, atol=1e-12)
+
+    def test_write_bvh_with_missing_joints(self):
+        points, _, _ = posed_skeleton(num_frames=20)
+        valid = np.ones(points.shape[:2], dtype=bool)
+        valid[5:8, 4] = False
+        valid[:, 23] = False
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "take.bvh")
+            write_bvh(path, np.arange(20) / 30.0, points, valid)
+            self.assertTrue(verify_bvh(path))
+            with open(path) as f:
+                text = f.read()
+
+        self.assertIn("ROOT MidHip", text)
+        self.assertIn("Frames: 20", text)
+        self.assertIn("Frame Time: 0.033333", text)
+        motion = np.loadtxt(text.split("Frame Time: 0.033333\n")[1].splitlines())
+        self.assertEqual(motion.shape, (20, 6 + 24 * 3))
+        self.assertTrue(np.all(np.isfinite(motion)))
+        np.testing.assert_allclose(motion[:, :3], points[:, 8] * 100.0, atol=1e-3)
+
+
+if __name__ == "__main__":
+    unittest.main()
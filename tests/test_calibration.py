@@ -1,7 +1,13 @@
+import contextlib
+import io
 import os
 import sys
+import tempfile
 import types
 import unittest
+from unittest import mock
+
+import numpy as np
 
 sys.path.insert(0, os.path.abspath("src"))
 
@@ -21,7 +27,49 @@ sys.modules.setdefault("cv2.aruco", aruco_stub)
 sys.modules.setdefault("requests", types.SimpleNamespace(post=lambda *args, **kwargs: None))
 sys.modules.setdefault("toml", types.SimpleNamespace(load=lambda path: {}))
 
+import calibrate_cli
 from calibrate_cli import calibration_complete_ids
+from processing import calibrate
+
+
+def fake_opencv(visible_dictionary):
+    """cv2/aruco stand-ins whose board is only found with one dictionary; counts image decodes."""
+    names = ["DICT_6X6_250", "DICT_4X4_50", "DICT_4X4_100", "DICT_5X5_100", "DICT_5X5_250", "DICT_6X6_100", "DICT_6X6_1000"]
+    decoded = []
+
+    def imread(path, flags=None):
+        if "broken" in path:
+            raise RuntimeError("corrupt image")
+        decoded.append(path)
+        return np.zeros((4, 6))
+
+    def detect_markers(gray, dictionary, parameters=None):
+        if dictionary == visible_dictionary:
+            return [np.zeros((1, 4, 2))] * 4, np.arange(4).reshape(-1, 1), []
+        return [], None, []
+
+    aruco = types.SimpleNamespace(
+        getPredefinedDictionary=lambda name: name,
+        CharucoBoard=lambda size, square, marker, dictionary: types.SimpleNamespace(dictionary=dictionary),
+        DetectorParameters=lambda: None,
+        detectMarkers=detect_markers,
+        interpolateCornersCharuco=lambda corners, ids, gray, board: (True, np.zeros((10, 1, 2)), np.arange(10)),
+        calibrateCameraCharuco=lambda *args: (0.3, np.eye(3), np.zeros(5), [], []),
+        estimatePoseCharucoBoard=lambda *args: (True, np.zeros(3), np.ones(3)),
+        **{name: name for name in names},
+    )
+    cv2 = types.SimpleNamespace(
+        imread=imread,
+        IMREAD_GRAYSCALE=0,
+        resize=lambda gray, size, fx, fy, interpolation: gray[::2, ::2],
+        INTER_AREA=3,
+        cornerSubPix=lambda gray, points, window, zero_zone, criteria: points,
+        TERM_CRITERIA_EPS=2,
+        TERM_CRITERIA_MAX_ITER=1,
+        Laplacian=lambda gray, depth: np.arange(4.0),
+        CV_64F=6,
+    )
+    return cv2, aruco, decoded
 
 
 class CalibrationTests(unittest.TestCase):
@@ -37,6 +85,126 @@ class CalibrationTests(unittest.TestCase):
 
         self.assertEqual(calibration_complete_ids(data), ["cam0"])
 
+    def test_each_image_is_decoded_once_for_intrinsics_and_pose(self):
+        cv2, aruco, decoded = fake_opencv("DICT_4X4_50")
+        images = [f"cam0/img_{i:04d}.jpg" for i in range(10)]
+        with mock.patch.object(calibrate, "cv2", cv2), mock.patch.object(calibrate, "aruco", aruco):
+            calibrator = calibrate.CameraCalibrator(workers=1)
+            mtx, dist, ret = calibrator.calibrate_intrinsics(images)
+            rvec, tvec = calibrator.estimate_pose(images[0], mtx, dist)
+
+        self.assertEqual(calibrator.board_key, ("DICT_4X4_50", False))
+        self.assertEqual(sorted(decoded), images)
+        self.assertEqual(ret, 0.3)
+        np.testing.assert_allclose(tvec, 1.0)
+
+    def test_detection_cache_skips_unchanged_images(self):
+        cv2, aruco, decoded = fake_opencv("DICT_4X4_50")
+        with tempfile.TemporaryDirectory() as tmp:
+            images = []
+            for i in range(4):
+                images.append(os.path.join(tmp, f"img_{i:04d}.jpg"))
+                with open(images[-1], "w") as f:
+                    f.write(str(i))
+            cache_dir = os.path.join(tmp, "cache")
+            with mock.patch.object(calibrate, "cv2", cv2), mock.patch.object(calibrate, "aruco", aruco), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                first = calibrate.CameraCalibrator(workers=1, cache_dir=cache_dir).calibrate_intrinsics(images)
+                decoded.clear()
+                second_calibrator = calibrate.CameraCalibrator(workers=1, cache_dir=cache_dir)
+                second = second_calibrator.calibrate_intrinsics(images)
+                self.assertEqual(decoded, [])
+
+                with open(images[0], "w") as f:
+                    f.write("changed")
+                calibrate.CameraCalibrator(workers=1, cache_dir=cache_dir).calibrate_intrinsics(images)
+                self.assertEqual(decoded, [images[0]])
+                # A different board config does not reuse the entries
+                decoded.clear()
+                calibrate.CameraCalibrator(rows=9, workers=1, cache_dir=cache_dir).calibrate_intrinsics(images)
+                self.assertEqual(len(decoded), 4)
+
+        self.assertEqual(second_calibrator.board_key, ("DICT_4X4_50", False))
+        self.assertEqual(first[2], second[2])
+        c_corners = second_calibrator.detections[images[1]]["boards"][("DICT_4X4_50", False)][2]
+        self.assertEqual(c_corners.shape, (10, 1, 2))
+
+    def test_pyramid_markers_map_back_to_full_resolution(self):
+        cv2, aruco, _ = fake_opencv("DICT_6X6_250")
+        coarse = [np.array([[[10.0, 10.0], [20.0, 10.0], [20.0, 20.0], [10.0, 20.0]]], dtype=np.float32)]
+        aruco.detectMarkers = lambda gray, dictionary, parameters=None: (coarse, np.array([[3]]), [])
+        with mock.patch.object(calibrate, "cv2", cv2), mock.patch.object(calibrate, "aruco", aruco):
+            calibrator = calibrate.CameraCalibrator(workers=1, pyramid_scale=0.5, report_speedup=True)
+            result = calibrator.detect_image("cam0/img_0000.jpg", [("DICT_6X6_250", False)])
+
+        corners, ids, c_corners, c_ids = result["boards"][("DICT_6X6_250", False)]
+        np.testing.assert_allclose(corners[0][0, 0], [20.5, 20.5])
+        np.testing.assert_allclose(corners[0][0, 2], [40.5, 40.5])
+        self.assertEqual(len(c_ids), 10)
+        self.assertIn("full_seconds", result)
+
+    def test_failed_camera_does_not_abort_the_others(self):
+        cv2, aruco, _ = fake_opencv("DICT_6X6_250")
+        with tempfile.TemporaryDirectory() as tmp:
+            image_dir = os.path.join(tmp, "calibration_images")
+            for cam_id in ("cam0", "cam1", "mobile_broken"):
+                os.makedirs(os.path.join(image_dir, cam_id))
+                for i in range(3):
+                    with open(os.path.join(image_dir, cam_id, f"img_{i:04d}.jpg"), "w") as f:
+                        f.write(f"{cam_id} {i}")
+            output_file = os.path.join(tmp, "calibration.npz")
+            out = io.StringIO()
+            with mock.patch.object(calibrate, "cv2", cv2), mock.patch.object(calibrate, "aruco", aruco), \
+                    mock.patch.object(calibrate_cli, "config", {"Calibration": {"workers": 1, "detection_cache": ""}}), \
+                    contextlib.redirect_stdout(out):
+                ok = calibrate_cli.run_calibration([0, 1], image_dir=image_dir, output_file=output_file)
+            with np.load(output_file) as data:
+                saved = calibration_complete_ids(data.files)
+
+        self.assertTrue(ok)
+        self.assertEqual(saved, ["cam0", "cam1"])
+        log = out.getvalue()
+        self.assertIn("mobile_broken calibration crashed", log)
+        self.assertLess(log.index("Intrinsics for cam0"), log.index("Intrinsics for cam1"))
+
+    def test_unchanged_cameras_reuse_their_last_solve(self):
+        cv2, aruco, decoded = fake_opencv("DICT_6X6_250")
+        solves = []
+        solve = aruco.calibrateCameraCharuco
+        aruco.calibrateCameraCharuco = lambda *args: solves.append(args) or solve(*args)
+        with tempfile.TemporaryDirectory() as tmp:
+            image_dir = os.path.join(tmp, "calibration_images")
+            for cam_id in ("cam0", "cam1"):
+                os.makedirs(os.path.join(image_dir, cam_id))
+                for i in range(3):
+                    with open(os.path.join(image_dir, cam_id, f"img_{i:04d}.jpg"), "w") as f:
+                        f.write(f"{cam_id} {i}")
+            output_file = os.path.join(tmp, "calibration.npz")
+            settings = {"Calibration": {"workers": 1, "detection_cache": os.path.join(tmp, "cache")}}
+
+            def run():
+                solves.clear()
+                decoded.clear()
+                with mock.patch.object(calibrate, "cv2", cv2), mock.patch.object(calibrate, "aruco", aruco), \
+                        mock.patch.object(calibrate_cli, "config", settings), contextlib.redirect_stdout(io.StringIO()):
+                    self.assertTrue(calibrate_cli.run_calibration([0, 1], image_dir=image_dir, output_file=output_file))
+                with np.load(output_file) as data:
+                    return dict(data)
+
+            first = run()
+            self.assertEqual(len(solves), 2)
+            second = run()
+            self.assertEqual((solves, decoded), ([], []))
+            with open(os.path.join(image_dir, "cam1", "img_0002.jpg"), "w") as f:
+                f.write("moved")
+            run()
+            self.assertEqual(len(solves), 1)
+            self.assertTrue(all("cam1" in path for path in decoded))
+
+        self.assertEqual(sorted(first), sorted(second))
+        for name in first:
+            np.testing.assert_allclose(second[name], first[name])
+
 
 if __name__ == "__main__":
     unittest.main()
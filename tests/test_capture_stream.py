@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.stream import CameraReader, Frame, FrameConsumer, FrameQueue, SynchronizedReader
+
+
+class FakeCapture:
+    """VideoCapture stand-in returning numbered frames; fails after fail_after reads."""
+
+    def __init__(self, fail_after=None):
+        self.reads = 0
+        self.fail_after = fail_after
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.reads += 1
+        time.sleep(0.001)
+        if self.fail_after is not None and self.reads > self.fail_after:
+            return False, None
+        return True, self.reads
+
+    def grab(self):
+        self.reads += 1
+        time.sleep(0.001)
+        return self.fail_after is None or self.reads <= self.fail_after
+
+    def retrieve(self):
+        time.sleep(0.005)  # decoding is the slow part, and happens after every grab of the set
+        return True, self.reads
+
+    def release(self):
+        self.released = True
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class FrameQueueTests(unittest.TestCase):
+    def test_full_queue_drops_oldest(self):
+        frames = FrameQueue(maxsize=2)
+
+        results = [frames.put(Frame(i, 0.0, i)) for i in range(5)]
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(frames.drops, 3)
+        self.assertEqual([frames.get(timeout=0).index for _ in range(2)], [3, 4])
+        self.assertIsNone(frames.get(timeout=0))
+        self.assertEqual(frames.stats(), {"depth": 0, "max_depth": 2, "delivered": 2, "drops": 3})
+
+    def test_latest_skips_older_frames(self):
+        frames = FrameQueue(maxsize=5)
+        for i in range(3):
+            frames.put(Frame(i, 0.0, i))
+
+        self.assertEqual(frames.latest().index, 2)
+        self.assertEqual(frames.depth, 0)
+        self.assertEqual(frames.drops, 0)
+
+
+class CameraReaderTests(unittest.TestCase):
+    def test_every_subscriber_gets_every_frame(self):
+        reader = CameraReader("0", FakeCapture, warmup_frames=2)
+        record = reader.subscribe("record", maxsize=1000)
+        preview = reader.subscribe("preview", maxsize=1)
+        reader.start()
+        wait_until(lambda: reader.frames_read >= 20)
+        reader.unsubscribe("record")
+        reader.stop()
+
+        indices = []
+        while (frame := record.get(timeout=0)) is not None:
+            indices.append(frame.index)
+        self.assertEqual(indices, list(range(len(indices))))
+        self.assertGreaterEqual(len(indices), 20)
+        self.assertEqual(preview.latest().index, reader.frames_read - 1)
+        self.assertGreater(preview.drops, 0)
+        self.assertEqual(set(reader.stats()["queues"]), {"preview"})
+        self.assertGreater(reader.stats()["fps"], 0.0)
+
+    def test_failed_read_reopens_capture(self):
+        opened = []
+
+        def open_capture():
+            opened.append(FakeCapture(fail_after=3))
+            return opened[-1]
+
+        reader = CameraReader("1", open_capture, warmup_frames=0, retry_delay=0.0)
+        reader.start()
+        wait_until(lambda: len(opened) >= 3)
+        reader.stop()
+
+        self.assertGreaterEqual(reader.read_failures, 2)
+        self.assertTrue(opened[0].released)
+
+
+class SynchronizedReaderTests(unittest.TestCase):
+    def test_cameras_are_grabbed_in_lockstep(self):
+        group = SynchronizedReader()
+        channels = [group.add_camera(did, FakeCapture, warmup_frames=0) for did in ("0", "1", "2")]
+        queues = [channel.subscribe("record", maxsize=1000) for channel in channels]
+        wait_until(lambda: all(channel.connected for channel in channels))
+        group.start()
+        wait_until(lambda: all(channel.frames_read >= 10 for channel in channels))
+        group.stop()
+
+        first = [q.get(timeout=0) for q in queues]
+        second = [q.get(timeout=0) for q in queues]
+        self.assertEqual({f.index for f in first}, {0})
+        # Corresponding frames are grabbed closer together than consecutive sets
+        self.assertLess(first[2].timestamp - first[0].timestamp, second[0].timestamp - first[0].timestamp)
+        skew = group.skew_stats()
+        self.assertGreaterEqual(skew["sets"], 10)
+        self.assertGreater(skew["max_ms"], 0.0)
+
+    def test_failed_grab_reopens_only_that_camera(self):
+        opened = {"0": [], "1": []}
+
+        def opener(did, fail_after):
+            def open_capture():
+                opened[did].append(FakeCapture(fail_after=fail_after))
+                return opened[did][-1]
+            return open_capture
+
+        group = SynchronizedReader(retry_delay=0.0)
+        good = group.add_camera("0", opener("0", None), warmup_frames=0)
+        flaky = group.add_camera("1", opener("1", 3), warmup_frames=0)
+        group.start()
+        wait_until(lambda: len(opened["1"]) >= 3 and good.frames_read >= 20)
+        group.stop()
+
+        self.assertEqual(len(opened["0"]), 1)
+        self.assertGreaterEqual(flaky.read_failures, 2)
+        self.assertTrue(opened["1"][0].released)
+        self.assertTrue(opened["0"][0].released)
+
+
+class FrameConsumerTests(unittest.TestCase):
+    def test_slow_consumer_does_not_block_producer(self):
+        frames = FrameQueue(maxsize=3)
+        handled = []
+        closed = threading.Event()
+        consumer = FrameConsumer(frames, lambda f: (time.sleep(0.02), handled.append(f.index)), closed.set).start()
+
+        start = time.perf_counter()
+        for i in range(20):
+            frames.put(Frame(i, 0.0, i))
+        put_seconds = time.perf_counter() - start
+        consumer.stop()
+
+        self.assertLess(put_seconds, 0.1)
+        self.assertTrue(closed.is_set())
+        self.assertEqual(len(handled) + frames.drops, 20)
+        self.assertEqual(handled[-3:], [17, 18, 19])
+
+    def test_errors_are_counted_and_queue_keeps_draining(self):
+        frames = FrameQueue(maxsize=10)
+        for i in range(4):
+            frames.put(Frame(i, 0.0, i))
+        handled = []
+
+        def handle(frame):
+            if frame.index == 1:
+                raise ValueError("disk full")
+            handled.append(frame.index)
+
+        consumer = FrameConsumer(frames, handle).start()
+        consumer.stop()
+
+        self.assertEqual(handled, [0, 2, 3])
+        self.assertEqual(consumer.errors, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.discovery import CameraDiscovery
+
+
+class FakeCapture:
+    def __init__(self, opened):
+        self.opened = opened
+
+    def isOpened(self):
+        return self.opened
+
+    def release(self):
+        pass
+
+
+class FakeCameras:
+    def __init__(self, present, delay=0.0, hang=()):
+        self.present = set(present)
+        self.delay = delay
+        self.hang = set(hang)
+        self.release_hang = threading.Event()
+        self.opens = []
+        self.lock = threading.Lock()
+
+    def __call__(self, index):
+        with self.lock:
+            self.opens.append(index)
+        if index in self.hang:
+            self.release_hang.wait(5)
+        time.sleep(self.delay)
+        return FakeCapture(index in self.present)
+
+
+class CameraDiscoveryTests(unittest.TestCase):
+    def test_probes_indices_in_parallel(self):
+        cameras = FakeCameras({0, 2}, delay=0.2)
+        discovery = CameraDiscovery(cameras, max_devices=5, pattern="/nonexistent/video*")
+
+        start = time.monotonic()
+        found = discovery.scan()
+
+        self.assertEqual(found, [0, 2])
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(sorted(cameras.opens), [0, 1, 2, 3, 4])
+        self.assertFalse(discovery.changed())
+
+    def test_in_use_camera_keeps_cached_result(self):
+        cameras = FakeCameras({0, 1})
+        discovery = CameraDiscovery(cameras, max_devices=2, pattern="/nonexistent/video*")
+        discovery.scan()
+        # Camera 0 is now busy in the preview and would fail a second open
+        cameras.present = {1}
+        cameras.opens.clear()
+
+        self.assertEqual(discovery.scan(in_use=["0"], reprobe=True), [0, 1])
+        self.assertEqual(cameras.opens, [1])
+
+    def test_unsigned_indices_are_not_probed_again_until_a_refresh(self):
+        cameras = FakeCameras({0})
+        discovery = CameraDiscovery(cameras, max_devices=3, pattern="/nonexistent/video*")
+        self.assertEqual(discovery.scan(), [0])
+        cameras.present = {0, 1}
+        cameras.opens.clear()
+
+        self.assertEqual(discovery.scan(), [0])
+        self.assertEqual(cameras.opens, [])
+
+        self.assertEqual(discovery.scan(reprobe=True), [0, 1])
+        self.assertEqual(sorted(cameras.opens), [0, 1, 2])
+
+        # A different list of indices probes them all again
+        cameras.opens.clear()
+        discovery.max_devices = 4
+        self.assertEqual(discovery.scan(), [0, 1])
+        self.assertEqual(sorted(cameras.opens), [0, 1, 2, 3])
+
+    def test_only_changed_nodes_are_probed_again(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in (0, 1):
+                open(os.path.join(tmp, f"video{i}"), "w").close()
+            cameras = FakeCameras({0, 1})
+            discovery = CameraDiscovery(cameras, pattern=os.path.join(tmp, "video*"))
+            self.assertEqual(discovery.scan(), [0, 1])
+            cameras.opens.clear()
+
+            self.assertEqual(discovery.scan(), [0, 1])
+            self.assertEqual(cameras.opens, [])
+
+            # Camera 1 unplugged, camera 2 plugged in
+            os.remove(os.path.join(tmp, "video1"))
+            open(os.path.join(tmp, "video2"), "w").close()
+            cameras.present = {0, 2}
+            self.assertTrue(discovery.changed())
+
+            self.assertEqual(discovery.scan(), [0, 2])
+            self.assertEqual(cameras.opens, [2])
+            self.assertFalse(discovery.changed())
+
+    def test_hung_probe_times_out_and_reports_later(self):
+        cameras = FakeCameras({0, 1}, hang={1})
+        discovery = CameraDiscovery(cameras, max_devices=2, timeout=0.2, pattern="/nonexistent/video*")
+
+        self.assertEqual(discovery.scan(), [0])
+        self.assertFalse(discovery.changed())
+
+        cameras.release_hang.set()
+        deadline = time.monotonic() + 2.0
+        while not discovery.changed() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(discovery.changed())
+        cameras.opens.clear()
+        self.assertEqual(discovery.scan(), [0, 1])
+        # The late result is used as it is, not probed again
+        self.assertEqual(cameras.opens, [])
+        self.assertFalse(discovery.changed())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing import export
+from processing.face import (
+    face_sample_times,
+    interpolate_channels,
+    parse_timecode,
+    read_live_link_csv,
+    seconds_of_day,
+)
+
+
+class FaceTests(unittest.TestCase):
+    def test_parse_timecode_with_subframes_and_midnight(self):
+        seconds = parse_timecode(["23:59:59:30.500", "23:59:59:59", "00:00:00:01"], fps=60)
+
+        np.testing.assert_allclose(seconds, [86399 + 30.5 / 60, 86399 + 59 / 60, 86400 + 1 / 60])
+
+    def test_read_live_link_csv_skips_bookkeeping_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_iPhone.csv")
+            with open(path, "w", newline="") as f:
+                f.write("Timecode,BlendShapeCount,EyeBlinkLeft,JawOpen\n")
+                f.write("10:00:00:00.000,2,0.1,0.2\n")
+                f.write("10:00:00:01.000,2,0.3,0.4\n")
+            timecodes, names, values = read_live_link_csv(path)
+
+        self.assertEqual(names, ["EyeBlinkLeft", "JawOpen"])
+        self.assertEqual(len(timecodes), 2)
+        np.testing.assert_allclose(values, [[0.1, 0.2], [0.3, 0.4]])
+
+    def test_sample_times_from_timecode_and_trigger(self):
+        body_start = 1_700_000_000.25
+        tod = seconds_of_day(body_start)
+        timecode = tod + 0.5 + np.arange(3) / 60.0
+
+        np.testing.assert_allclose(face_sample_times(timecode, body_start), 0.5 + np.arange(3) / 60.0, atol=1e-6)
+        by_trigger = face_sample_times(timecode, body_start, trigger_time=body_start + 0.2, mode="trigger")
+        np.testing.assert_allclose(by_trigger, 0.2 + np.arange(3) / 60.0, atol=1e-6)
+
+    def test_interpolate_channels_marks_frames_outside_face_take(self):
+        times = np.array([0.0, 0.1, 0.2])
+        values = np.array([[0.0, 1.0], [1.0, 1.0], [2.0, 0.0]])
+
+        out, valid = interpolate_channels(times, values, np.array([-0.05, 0.05, 0.15, 0.25]))
+
+        np.testing.assert_array_equal(valid, [False, True, True, False])
+        np.testing.assert_allclose(out[1:3], [[0.5, 1.0], [1.5, 0.5]])
+
+    def test_csv_export_appends_blendshape_columns(self):
+        times = np.arange(3) / 30.0
+        points = np.zeros((3, 25, 3))
+        blendshapes = (["JawOpen"], np.array([[0.0], [0.4], [0.0]]), np.array([False, True, True]))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "take.csv")
+            export.write_csv(path, times, points, blendshapes=blendshapes)
+            self.assertTrue(export.verify_csv(path))
+            with open(path, newline="") as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0][-1], "JawOpen")
+        # Frames before the face take hold its first sample
+        self.assertEqual([float(r[-1]) for r in rows[1:]], [0.4, 0.4, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
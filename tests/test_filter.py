@@ -2,19 +2,54 @@ import os
 import sys
 import unittest
 
+import numpy as np
+
 sys.path.insert(0, os.path.abspath("src"))
 
 from processing.filter import MocapFilter
+from processing.gaps import fill_gaps, hold_missing
 
 
 class FilterTests(unittest.TestCase):
-    def test_missing_points_are_replaced_with_zeroes(self):
+    def test_missing_points_stay_missing(self):
         filt = MocapFilter(num_points=2)
 
         result = filt.filter_frame(0.0, [[1.0, 2.0, 3.0], None])
 
         self.assertEqual(len(result), 2)
-        self.assertEqual(result[1], [0.0, 0.0, 0.0])
+        self.assertEqual(result[0], [1.0, 2.0, 3.0])
+        self.assertIsNone(result[1])
+
+    def test_masked_samples_do_not_pull_state_toward_origin(self):
+        times = np.arange(6) / 30.0
+        data = np.full((6, 1), 5.0)
+        valid = np.ones((6, 1), dtype=bool)
+        data[2:4] = 0.0
+        valid[2:4] = False
+
+        out = MocapFilter(num_points=1).filter_array(times, data, valid)
+
+        np.testing.assert_allclose(out[valid[:, 0], 0], 5.0)
+
+    def test_short_gaps_are_interpolated_and_long_gaps_stay_masked(self):
+        frames = np.arange(30, dtype=float)
+        data = np.column_stack([2.0 * frames, frames ** 2])
+        valid = np.ones_like(data, dtype=bool)
+        valid[5:8, :] = False
+        valid[15:27, 1] = False
+
+        filled, filled_valid = fill_gaps(data, valid, max_gap=5, method="cubic")
+
+        np.testing.assert_allclose(filled[5:8, 0], data[5:8, 0])
+        np.testing.assert_allclose(filled[5:8, 1], data[5:8, 1], atol=1.0)
+        self.assertTrue(filled_valid[5:8].all())
+        self.assertFalse(filled_valid[15:27, 1].any())
+
+    def test_hold_missing_never_writes_origin_for_seen_joints(self):
+        data = np.array([[0.0], [3.0], [0.0], [4.0]])
+        valid = np.array([[False], [True], [False], [True]])
+
+        np.testing.assert_allclose(hold_missing(data, valid)[:, 0], [3.0, 3.0, 3.0, 4.0])
 
 
 if __name__ == "__main__":
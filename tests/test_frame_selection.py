@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.frame_selection import (
+    board_view_features,
+    charuco_board_points,
+    coverage_cells,
+    fit_homography,
+    select_diverse_frames,
+)
+
+
+def board_view(H, columns=5, rows=7):
+    ids = np.arange((columns - 1) * (rows - 1))
+    board = np.column_stack([charuco_board_points(ids, columns), np.ones(len(ids))])
+    image = board @ H.T
+    return (image[:, :2] / image[:, 2:]).reshape(-1, 1, 2), ids.reshape(-1, 1)
+
+
+class FrameSelectionTests(unittest.TestCase):
+    def test_homography_recovers_projection(self):
+        H = np.array([[40.0, 5.0, 300.0], [-3.0, 38.0, 200.0], [0.001, 0.002, 1.0]])
+        corners, ids = board_view(H)
+
+        fitted = fit_homography(charuco_board_points(ids, 5), corners.reshape(-1, 2))
+
+        np.testing.assert_allclose(fitted, H, rtol=1e-6, atol=1e-8)
+        self.assertIsNone(fit_homography(np.zeros((4, 2)), np.zeros((4, 2))))
+
+    def test_features_describe_position_scale_and_tilt(self):
+        frontal = board_view(np.array([[40.0, 0, 300], [0, 40.0, 200], [0, 0, 1]]))
+        tilted = board_view(np.array([[40.0, 0, 300], [0, 40.0, 200], [0.1, 0, 1]]))
+
+        f = board_view_features(*frontal, 5, 7, (1280, 720))
+        t = board_view_features(*tilted, 5, 7, (1280, 720))
+
+        np.testing.assert_allclose(f[:2], [(300 + 100) / 1280, (200 + 140) / 720])
+        np.testing.assert_allclose(f[2], np.sqrt(200 * 280 / (1280 * 720)))
+        np.testing.assert_allclose(f[3:], 0.0, atol=1e-12)
+        self.assertGreater(t[3], 0.1)  # left edge larger than right edge
+
+    def test_selection_prefers_new_poses_and_image_areas(self):
+        size = (1280, 720)
+        views = []
+        for _ in range(10):  # the same view held still
+            views.append(board_view(np.array([[40.0, 0, 100], [0, 40.0, 100], [0, 0, 1]])))
+        views.append(board_view(np.array([[40.0, 0, 900], [0, 40.0, 300], [0, 0, 1]])))
+        views.append(board_view(np.array([[40.0, 0, 500], [0, 40.0, 200], [0.02, 0, 1]])))
+        features = [board_view_features(c, i, 5, 7, size) for c, i in views]
+        cells = [coverage_cells(c, size) for c, _ in views]
+
+        chosen = select_diverse_frames(features, cells, [24] * len(views), max_frames=3)
+
+        self.assertEqual(len(chosen), 3)
+        self.assertIn(10, chosen)
+        self.assertIn(11, chosen)
+        self.assertEqual(select_diverse_frames(features[:2], cells[:2], [24, 24], max_frames=3), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
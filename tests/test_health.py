@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.health import CaptureReport, RateMeter
+
+
+class RateMeterTests(unittest.TestCase):
+    def test_rate_over_sliding_window(self):
+        meter = RateMeter(window=2.0)
+        meter.started = 0.0
+        for i in range(90):
+            meter.tick(now=i / 30.0)
+
+        self.assertAlmostEqual(meter.rate(now=3.0), 30.0, delta=0.5)
+        self.assertEqual(meter.total, 90)
+        # The camera stopped delivering
+        self.assertEqual(meter.rate(now=6.0), 0.0)
+
+    def test_young_meter_uses_its_age(self):
+        meter = RateMeter(window=2.0)
+        meter.started = 0.0
+        for i in range(15):
+            meter.tick(amount=1000, now=i / 30.0)
+
+        self.assertAlmostEqual(meter.rate(now=0.5), 30000.0)
+
+
+class CaptureReportTests(unittest.TestCase):
+    def test_summary_and_report_file(self):
+        report = CaptureReport("S", "001")
+        report.add({"cam0": {"fps": 30.0, "dropped": 0, "connected": True}}, now=report.started + 1)
+        report.add({"cam0": {"fps": 24.0, "dropped": 3, "connected": True}, "audio": {"overflows": 1}},
+                   now=report.started + 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = report.write(os.path.join(tmp, "S_001_capture.json"))
+            with open(path) as f:
+                saved = json.load(f)
+
+        cam = saved["devices"]["cam0"]
+        self.assertEqual(cam["fps"], {"min": 24.0, "mean": 27.0, "max": 30.0, "last": 24.0})
+        self.assertEqual(cam["dropped"]["last"], 3)
+        self.assertNotIn("connected", cam)
+        self.assertEqual(saved["devices"]["audio"]["overflows"]["max"], 1)
+        self.assertEqual(saved["duration"], 2.0)
+        self.assertEqual(len(saved["samples"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
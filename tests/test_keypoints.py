@@ -0,0 +1,93 @@
+import os
+import sys
+import types
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+sys.modules.setdefault("cv2", types.SimpleNamespace())
+
+from processing.keypoints import KeypointSchema
+from processing.reconstruct import keypoint_array, triangulate_take
+from processing.triangulate import DLT, triangulate_points
+
+from helpers import camera_rig
+
+
+def project(projections, X):
+    h = np.einsum("vij,...j->...vi", projections, np.concatenate([X, np.ones(X.shape[:-1] + (1,))], axis=-1))
+    return h[..., :2] / h[..., 2:]
+
+
+class KeypointSchemaTests(unittest.TestCase):
+    def test_layout_puts_body_first(self):
+        schema = KeypointSchema(["face", "hand_left", "body"])
+
+        self.assertEqual(schema.sets, ["body", "hand_left", "face"])
+        self.assertEqual(schema.num_joints, 25 + 21 + 70)
+        self.assertEqual(schema.slices["hand_left"], slice(25, 46))
+        names = schema.column_names()
+        self.assertEqual(names[24], "Bone_24")
+        self.assertEqual(names[25], "LHand_0")
+        self.assertEqual(names[-1], "Face_69")
+        self.assertEqual(schema.openpose_flags(), ["--hand", "--face"])
+
+    def test_body_set_is_required(self):
+        with self.assertRaises(ValueError):
+            KeypointSchema(["hand_left"])
+        with self.assertRaises(ValueError):
+            KeypointSchema(["body", "feet"])
+
+    def test_parse_people_fills_missing_sets_with_zeros(self):
+        schema = KeypointSchema(["body", "hand_right"])
+        data = {"people": [
+            {"pose_keypoints_2d": [1.0, 2.0, 0.9] * 25, "hand_right_keypoints_2d": []},
+            {"pose_keypoints_2d": [], "hand_right_keypoints_2d": []},
+        ]}
+
+        people = schema.parse_people(data)
+
+        self.assertEqual(len(people), 1)
+        self.assertEqual(people[0].shape, (46, 3))
+        np.testing.assert_allclose(people[0][0], [1.0, 2.0, 0.9])
+        self.assertTrue(np.all(people[0][25:] == 0))
+
+    def test_batched_dlt_matches_per_point_dlt(self):
+        projections = camera_rig()
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(40, 3)) * 0.5
+        observations = np.concatenate([project(projections, X) + rng.normal(size=(40, 3, 2)), np.ones((40, 3, 1))], -1)
+        observations[0, 1:, 2] = 0.0  # seen by one view only
+
+        points, valid = triangulate_points(projections, observations)
+
+        self.assertFalse(valid[0])
+        for i in range(1, 40):
+            expected = DLT(list(projections), [tuple(o[:2]) for o in observations[i]])
+            np.testing.assert_allclose(points[i], expected, atol=1e-9)
+
+    def test_triangulate_take_with_hand_joints(self):
+        schema = KeypointSchema(["body", "hand_left", "hand_right"])
+        projections = camera_rig()
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(5, schema.num_joints, 3)) * 0.3
+        uv = project(projections, X)  # (frames, joints, views, 2)
+        per_view = [
+            [[np.column_stack([uv[f, :, v], np.full(schema.num_joints, 0.8)])] for f in range(5)]
+            for v in range(3)
+        ]
+
+        keypoints = keypoint_array(per_view, schema.num_joints)
+        points, valid, confidence, sources = triangulate_take(keypoints, projections, match_joints=schema.body)
+
+        self.assertEqual(points.shape, (5, 1, schema.num_joints, 3))
+        self.assertTrue(valid.all())
+        np.testing.assert_allclose(points[:, 0], X, atol=1e-6)
+        np.testing.assert_allclose(confidence, 0.8, atol=1e-6)
+        np.testing.assert_array_equal(sources, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
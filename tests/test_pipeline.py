@@ -4,6 +4,8 @@ import sys
 import types
 import unittest
 
+import numpy as np
+
 sys.path.insert(0, os.path.abspath("src"))
 
 sys.modules.setdefault("cv2", types.SimpleNamespace(Rodrigues=lambda rvec: (None, None)))
@@ -41,6 +43,19 @@ class PipelineTests(unittest.TestCase):
 
         self.assertTrue(pipeline.verify_csv(path))
 
+    def test_source_frames_follow_capture_times(self):
+        fps = 30.0
+        # Frame 3 was dropped during capture, so the view's frame 3 was captured at 4 / fps
+        view = {"drift_factor": 1.0, "frame_times": np.delete(np.arange(11) / fps, 3)}
+
+        by_time = MocapPipeline.source_frames(view, 1, 6, fps)
+        by_index = MocapPipeline.source_frames(dict(view, frame_times=None), 1, 6, fps)
+
+        np.testing.assert_array_equal(by_time, [1, 2, -1, 3, 4, 5])
+        np.testing.assert_array_equal(by_index, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(MocapPipeline.available_frames(view, 10, 1, fps), 10)
+        self.assertEqual(MocapPipeline.available_frames(dict(view, frame_times=None), 10, 1, fps), 9)
+
 
 if __name__ == "__main__":
     unittest.main()
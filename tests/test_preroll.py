@@ -0,0 +1,41 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.preroll import PreRollBuffer
+
+
+class PreRollBufferTests(unittest.TestCase):
+    def test_keeps_only_the_last_seconds(self):
+        buffer = PreRollBuffer(seconds=30.0)
+        for i in range(90):
+            buffer.add(float(i), i, 100)
+
+        stats = buffer.stats()
+        items = buffer.drain()
+
+        self.assertEqual([item for _, item in items], list(range(59, 90)))
+        self.assertEqual(stats["seconds"], 30.0)
+        self.assertEqual(stats["evicted"], 59)
+        self.assertEqual(stats["bytes"], 3100)
+        self.assertEqual(buffer.stats()["items"], 0)
+        self.assertEqual(buffer.bytes, 0)
+
+    def test_memory_cap_evicts_before_time_limit(self):
+        buffer = PreRollBuffer(seconds=10.0, max_bytes=1000)
+        for i in range(30):
+            buffer.add(i / 30.0, i, 300)
+
+        self.assertEqual([item for _, item in buffer.drain()], [27, 28, 29])
+
+    def test_oversized_item_is_not_kept(self):
+        buffer = PreRollBuffer(seconds=10.0, max_bytes=100)
+        buffer.add(0.0, "big", 500)
+
+        self.assertEqual(buffer.drain(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
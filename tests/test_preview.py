@@ -0,0 +1,81 @@
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+sys.modules.setdefault("cv2", types.SimpleNamespace())
+
+from capture.preview import PreviewRenderer, fit_size
+
+
+def fake_resize(image, size, dst=None, interpolation=None):
+    w, h = size
+    rows = np.arange(h) * image.shape[0] // h
+    cols = np.arange(w) * image.shape[1] // w
+    dst[...] = image[rows][:, cols]
+    return dst
+
+
+def fake_cvt_color(image, code, dst=None):
+    if image.shape != dst.shape:
+        raise AssertionError("color conversion must run on the decimated frame")
+    dst[...] = image[..., ::-1]
+    return dst
+
+
+class PreviewRendererTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            sys.modules["cv2"], create=True,
+            resize=mock.Mock(side_effect=fake_resize), cvtColor=fake_cvt_color, INTER_AREA=3, COLOR_BGR2RGB=4,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fit_size_keeps_aspect_and_never_upscales(self):
+        self.assertEqual(fit_size(1920, 1080), (320, 180))
+        self.assertEqual(fit_size(1080, 1920), (101, 180))
+        self.assertEqual(fit_size(160, 90), (160, 90))
+
+    def test_decimates_before_color_conversion_into_reused_buffers(self):
+        renderer = PreviewRenderer((320, 180))
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        frame[..., 0] = 255  # Blue in BGR
+
+        first = renderer.render(frame)
+        second = renderer.render(frame)
+
+        self.assertEqual(first.shape, (180, 320, 3))
+        self.assertTrue((first[..., 2] == 255).all() and (first[..., 0] == 0).all())
+        self.assertIs(first, second)
+        self.assertEqual(sys.modules["cv2"].resize.call_args.kwargs["interpolation"], 3)
+
+    def test_small_frames_skip_the_resize(self):
+        renderer = PreviewRenderer((320, 180))
+
+        thumb = renderer.render(np.zeros((90, 160, 3), dtype=np.uint8))
+
+        self.assertEqual(thumb.shape, (90, 160, 3))
+        sys.modules["cv2"].resize.assert_not_called()
+
+    def test_stats_report_rate_and_cost(self):
+        renderer = PreviewRenderer()
+        with mock.patch("capture.preview.time.monotonic", side_effect=[0.0, 0.1, 0.2]):
+            for _ in range(3):
+                renderer.render(np.zeros((180, 320, 3), dtype=np.uint8))
+
+        stats = renderer.stats()
+
+        self.assertEqual(stats["frames"], 3)
+        self.assertAlmostEqual(stats["fps"], 10.0)
+        self.assertGreaterEqual(stats["ms"], 0.0)
+        self.assertAlmostEqual(stats["load_ms"], stats["ms"] * stats["fps"])
+
+
+if __name__ == "__main__":
+    unittest.main()
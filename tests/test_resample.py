@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.resample import resample
+
+
+class ResampleTests(unittest.TestCase):
+    def test_resamples_to_target_rate(self):
+        times = np.arange(31) / 30.0
+        data = np.column_stack([times, np.sin(times)])
+        valid = np.ones_like(data, dtype=bool)
+
+        new_times, new_data, new_valid = resample(times, data, valid, 24)
+
+        np.testing.assert_allclose(new_times, np.arange(25) / 24.0)
+        np.testing.assert_allclose(new_data[:, 0], new_times, atol=1e-9)
+        np.testing.assert_allclose(new_data[:, 1], np.sin(new_times), atol=1e-5)
+        self.assertTrue(new_valid.all())
+
+    def test_masked_gaps_are_not_bridged(self):
+        times = np.arange(10) / 10.0
+        data = np.tile(times[:, None], (1, 2))
+        valid = np.ones_like(data, dtype=bool)
+        valid[4:6, 0] = False
+
+        new_times, new_data, new_valid = resample(times, data, valid, 20, method="linear")
+
+        inside = (new_times > 0.3 + 1e-9) & (new_times < 0.6 - 1e-9)
+        self.assertFalse(new_valid[inside, 0].any())
+        self.assertTrue(new_valid[:, 1].all())
+        np.testing.assert_allclose(new_data[:, 1], new_times, atol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
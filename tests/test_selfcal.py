@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+sys.path.insert(0, os.path.abspath("src"))
+
+sys.modules.setdefault("cv2", types.SimpleNamespace())
+
+from processing.reconstruct import load_keypoint_cache, write_keypoint_cache
+from processing.selfcal import pose_from_projection, projection_from_pose, self_calibrate, write_calibration_version
+
+from helpers import camera_ring
+
+K = np.array([[900.0, 0, 640], [0, 900.0, 360], [0, 0, 1]])
+
+
+def synthetic_take(truth, num_frames=60, noise=0.5, seed=0):
+    """Keypoints of a moving 25-joint 'actor' seen by the true cameras."""
+    rng = np.random.default_rng(seed)
+    offsets = rng.normal(0, 0.3, (25, 3))
+    path = np.cumsum(rng.normal(0, 0.02, (num_frames, 3)), axis=0)
+    joints = path[:, None] + offsets[None]
+    keypoints = np.zeros((len(truth), num_frames, 1, 25, 3), dtype=np.float32)
+    for v, (r, t) in enumerate(truth):
+        P = projection_from_pose(K, r, t)
+        h = np.concatenate([joints, np.ones(joints.shape[:-1] + (1,))], axis=-1) @ P.T
+        keypoints[v, :, 0, :, :2] = h[..., :2] / h[..., 2:] + rng.normal(0, noise, (num_frames, 25, 2))
+        keypoints[v, :, 0, :, 2] = 0.9
+    return keypoints
+
+
+class SelfCalibrationTests(unittest.TestCase):
+    def test_pose_from_projection_round_trip(self):
+        rvec, tvec = np.array([0.1, -0.2, 0.3]), np.array([0.5, -0.1, 3.0])
+
+        r, t = pose_from_projection(projection_from_pose(K, rvec, tvec), K)
+
+        np.testing.assert_allclose(r, rvec, atol=1e-12)
+        np.testing.assert_allclose(t, tvec, atol=1e-12)
+
+    def test_bumped_camera_is_pulled_back(self):
+        truth = camera_ring(4)
+        calibration = {}
+        for c, (r, t) in enumerate(truth):
+            calibration[f"mtx_cam{c}"] = K
+            calibration[f"dist_cam{c}"] = np.zeros((1, 5))
+            calibration[f"rvec_cam{c}"] = r.reshape(3, 1)
+            calibration[f"tvec_cam{c}"] = t.reshape(3, 1)
+        # cam2 was knocked after board calibration
+        calibration["rvec_cam2"] = calibration["rvec_cam2"] + np.array([[0.01], [-0.015], [0.005]])
+        calibration["tvec_cam2"] = calibration["tvec_cam2"] + np.array([[0.03], [0.0], [-0.02]])
+        projections = [
+            projection_from_pose(K, calibration[f"rvec_cam{c}"], calibration[f"tvec_cam{c}"]) for c in range(4)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_keypoints.npz")
+            write_keypoint_cache(path, synthetic_take(truth), projections, 30.0, [0, 1, 2, 3],
+                                 calib_ids=[f"cam{c}" for c in range(4)])
+            cache = load_keypoint_cache(path)
+            refined, before, after = self_calibrate(cache, calibration)
+
+            saved = write_calibration_version(refined, os.path.join(tmp, "calibration.npz"))
+            second = write_calibration_version(refined, os.path.join(tmp, "calibration.npz"))
+
+        self.assertGreater(before, 2.0)
+        self.assertLess(after, 1.0)
+        r, t = truth[2]
+        # Compared as rotations: cam2's rotation vector is close to pi and may wrap around
+        angle = (Rotation.from_rotvec(refined["rvec_cam2"].ravel()) * Rotation.from_rotvec(r).inv()).magnitude()
+        self.assertLess(angle, 5e-3)
+        self.assertLess(np.abs(refined["tvec_cam2"].ravel() - t).max(), 1e-2)
+        self.assertEqual(os.path.basename(saved), "calibration_v1.npz")
+        self.assertEqual(os.path.basename(second), "calibration_v2.npz")
+
+    def test_old_cache_without_calibration_ids(self):
+        cache = {"calib_ids": None}
+
+        self.assertIsNone(self_calibrate(cache, {}))
+
+    def test_camera_missing_from_current_calibration(self):
+        # Re-calibrated without cam1 since the take was processed
+        cache = {"calib_ids": ["cam0", "cam1"]}
+        calibration = {"mtx_cam0": K, "rvec_cam0": np.zeros((3, 1)), "tvec_cam0": np.zeros((3, 1))}
+
+        self.assertIsNone(self_calibrate(cache, calibration))
+
+
+if __name__ == "__main__":
+    unittest.main()
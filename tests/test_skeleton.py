@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.skeleton import SkeletonFitter, bone_lengths
+
+
+class SkeletonTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.rest = rng.normal(size=(25, 3)) * 0.3
+        self.points = self.rest[None] + rng.normal(size=(200, 25, 3)) * 0.005
+        self.valid = np.ones((200, 25), dtype=bool)
+
+    def test_outlier_frames_do_not_bias_bone_lengths(self):
+        points = self.points.copy()
+        points[:40, 4] += 1.0  # right wrist flies off in 20% of frames
+        expected = bone_lengths(self.rest[None], np.ones((1, 25), dtype=bool))[0]
+
+        lengths = SkeletonFitter().estimate_lengths(points, self.valid)
+
+        np.testing.assert_allclose(lengths, expected, atol=0.02)
+
+    def test_fit_enforces_fixed_lengths_and_skips_missing_joints(self):
+        valid = self.valid.copy()
+        valid[10, 3] = False
+        fitter = SkeletonFitter(iterations=20)
+        lengths = fitter.estimate_lengths(self.points, valid)
+
+        fitted = fitter.fit(self.points, valid, lengths)
+
+        per_frame = bone_lengths(fitted, valid)
+        self.assertLess(np.nanmax(np.abs(per_frame - lengths)), 1e-3)
+        np.testing.assert_array_equal(fitted[10, 3], self.points[10, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.smoother import KalmanSmoother, motion_model
+
+
+def reference_rts(times, z, valid, confidence, smoother):
+    """Textbook Kalman filter + RTS backward pass for one channel."""
+    dt = np.median(np.diff(times))
+    A, Q = motion_model(smoother.model, dt, smoother.process_noise)
+    d = A.shape[0]
+    m = np.zeros(d)
+    m[0] = z[np.argmax(valid)]
+    P = np.eye(d) * smoother.prior_variance
+    means, covs, pred_means, pred_covs = [], [], [], []
+    for t in range(len(z)):
+        if t > 0:
+            m = A @ m
+            P = A @ P @ A.T + Q
+        pred_means.append(m)
+        pred_covs.append(P)
+        if valid[t]:
+            r = smoother.measurement_noise / max(confidence[t], 1e-3)
+            K = P[:, 0] / (P[0, 0] + r)
+            m = m + K * (z[t] - m[0])
+            P = P - np.outer(K, P[0])
+        means.append(m)
+        covs.append(P)
+    x = means[-1]
+    out = [x[0]]
+    for t in range(len(z) - 2, -1, -1):
+        G = covs[t] @ A.T @ np.linalg.inv(pred_covs[t + 1])
+        x = means[t] + G @ (x - pred_means[t + 1])
+        out.append(x[0])
+    return np.array(out[::-1])
+
+
+class SmootherTests(unittest.TestCase):
+    def test_matches_kalman_rts_recursion(self):
+        rng = np.random.default_rng(0)
+        times = np.arange(200) / 30.0
+        z = np.sin(3 * times) + rng.normal(size=200) * 0.01
+        valid = rng.random(200) > 0.2
+        confidence = rng.random(200)
+
+        for model in ("velocity", "acceleration"):
+            smoother = KalmanSmoother(model=model)
+            result = smoother.smooth(times, z[:, None], valid[:, None], confidence[:, None])[:, 0]
+            np.testing.assert_allclose(result, reference_rts(times, z, valid, confidence, smoother), atol=1e-6)
+
+    def test_smoothing_has_no_lag(self):
+        times = np.arange(300) / 30.0
+        ramp = np.column_stack([times, -2.0 * times])
+
+        result = KalmanSmoother().smooth(times, ramp)
+
+        np.testing.assert_allclose(result, ramp, atol=1e-6)
+
+    def test_long_take_runs_in_bounded_time(self):
+        # 11 minutes at 30 fps, 25 joints with their own confidence (one factorisation each)
+        rng = np.random.default_rng(0)
+        times = np.arange(20000) / 30.0
+        data = rng.normal(size=(20000, 75))
+        confidence = np.repeat(rng.uniform(0.3, 1.0, (20000, 25)), 3, axis=1)
+
+        for model in ("velocity", "acceleration"):
+            start = time.perf_counter()
+            KalmanSmoother(model=model).smooth(times, data, confidence=confidence)
+            self.assertLess(time.perf_counter() - start, 1.5, model)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import csv
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+sys.modules.setdefault("cv2", types.SimpleNamespace())
+
+from processing.reconstruct import write_keypoint_cache, load_keypoint_cache
+from processing.sweep import ParameterSweep, parameter_grid, evaluate_settings
+
+from helpers import camera_rig
+
+SETTINGS = {
+    "min_confidence": 0.1, "max_distance": 0.5, "max_missing": 15, "min_length": 5,
+    "skeleton": False, "skeleton_iterations": 10, "inlier_tolerance": 0.2,
+    "engine": "one_euro", "min_cutoff": 1.0, "beta": 0.0, "max_gap": 10, "interpolation": "cubic",
+    "kalman_model": "velocity", "process_noise": 50.0, "measurement_noise": 1e-4,
+}
+
+
+def synthetic_take(num_frames=40, fps=30.0, pixel_noise=1.0):
+    projections = camera_rig()
+
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(25, 3)) * 0.3
+    t = np.arange(num_frames) / fps
+    points = base[None] + np.stack([0.3 * np.sin(2 * t), 0 * t, 0 * t], axis=1)[:, None]
+    homogeneous = np.concatenate([points, np.ones(points.shape[:2] + (1,))], axis=-1)
+    image = np.einsum("vik,fjk->vfji", projections, homogeneous)
+    uv = image[..., :2] / image[..., 2:] + rng.normal(scale=pixel_noise, size=image[..., :2].shape)
+    keypoints = np.concatenate([uv, np.full(uv.shape[:-1] + (1,), 0.8)], axis=-1)[:, :, None]
+    return keypoints, projections, fps
+
+
+class SweepTests(unittest.TestCase):
+    def test_cache_round_trip(self):
+        keypoints, projections, fps = synthetic_take(num_frames=5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_keypoints.npz")
+            write_keypoint_cache(path, keypoints, projections, fps, [0, "phone.webm"])
+            cache = load_keypoint_cache(path)
+
+        np.testing.assert_allclose(cache["keypoints"], keypoints, rtol=1e-6)
+        np.testing.assert_allclose(cache["projections"], projections)
+        self.assertEqual(cache["fps"], fps)
+        self.assertEqual(cache["view_ids"], ["0", "phone.webm"])
+
+    def test_lower_cutoff_trades_jitter_for_reprojection_error(self):
+        keypoints, projections, fps = synthetic_take()
+        cache = {"keypoints": keypoints, "projections": projections, "fps": fps}
+
+        smooth = evaluate_settings(cache, dict(SETTINGS, min_cutoff=0.5))
+        raw = evaluate_settings(cache, dict(SETTINGS, min_cutoff=1000.0))
+
+        self.assertEqual(raw["tracks"], 1)
+        self.assertAlmostEqual(raw["coverage"], 1.0)
+        self.assertLess(raw["reprojection_px"], 2.0)
+        self.assertLess(smooth["jitter"], raw["jitter"])
+        self.assertGreater(smooth["reprojection_px"], raw["reprojection_px"])
+
+    def test_sweep_writes_ranked_table(self):
+        keypoints, projections, fps = synthetic_take()
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "S_1_keypoints.npz")
+            write_keypoint_cache(cache_path, keypoints, projections, fps, [0, 1, 2])
+            sweep = ParameterSweep(cache_path, SETTINGS, workers=1)
+            grid = parameter_grid(min_confidence=[0.1, 0.5], min_cutoff=[0.5, 2.0], beta=[0.0])
+            rows = sweep.run(grid)
+            table = os.path.join(tmp, "S_1_sweep.csv")
+            sweep.write_table(rows, table)
+            with open(table, newline="") as f:
+                written = list(csv.DictReader(f))
+
+        self.assertEqual(len(rows), 4)
+        scores = [row["score"] for row in rows]
+        self.assertEqual(scores, sorted(scores))
+        self.assertEqual([r["rank"] for r in written], ["1", "2", "3", "4"])
+        self.assertIn("min_cutoff", written[0])
+        self.assertIn("reprojection_px", written[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.takes import read_take_metadata, write_take_metadata
+
+
+class TakeMetadataTests(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_record_start_replaces_an_earlier_attempt(self):
+        write_take_metadata("S", "001", replace=True, audio_start=10.0, trigger_time=10.5)
+        write_take_metadata("S", "001", grab_skew_ms={"mean_ms": 2.0})
+        # The take is recorded again under the same name
+        write_take_metadata("S", "001", replace=True, audio_start=20.0, trigger_time=20.5)
+
+        metadata = read_take_metadata("S", "001")
+
+        self.assertEqual(metadata, {"scene": "S", "take": "001", "audio_start": 20.0, "trigger_time": 20.5})
+
+    def test_later_fields_are_merged(self):
+        write_take_metadata("S", "002", replace=True, audio_start=1.0)
+        write_take_metadata("S", "002", grab_skew_ms={"mean_ms": 2.0})
+
+        metadata = read_take_metadata("S", "002")
+
+        self.assertEqual(metadata["audio_start"], 1.0)
+        self.assertEqual(metadata["grab_skew_ms"], {"mean_ms": 2.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.timestamps import TimestampWriter, frames_at_times, read_timestamps, timestamp_path
+
+
+class TimestampTests(unittest.TestCase):
+    def test_round_trip_with_dropped_frames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = timestamp_path(os.path.join(tmp, "S_1_cam0.mp4"))
+            writer = TimestampWriter(path, fps=30.0, wall_offset=1000.0)
+            # Capture index 2 was dropped in the queue, and the camera stalled for 3 frames after index 4
+            for source, t in [(0, 10.0), (1, 10.033), (3, 10.1), (4, 10.133), (5, 10.267)]:
+                writer.add(t, source)
+            writer.close()
+
+            stamps = read_timestamps(path)
+
+        self.assertTrue(path.endswith("S_1_cam0_frames.bin"))
+        self.assertEqual(stamps["fps"], 30.0)
+        self.assertEqual(stamps["wall_offset"], 1000.0)
+        np.testing.assert_allclose(stamps["times"], [10.0, 10.033, 10.1, 10.133, 10.267])
+        np.testing.assert_array_equal(stamps["drops"], [[2, 1], [4, 3]])
+        self.assertEqual(writer.dropped, 4)
+
+    def test_partial_last_record_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_cam0_frames.bin")
+            writer = TimestampWriter(path, fps=30.0)
+            for i in range(3):
+                writer.add(i / 30.0, i)
+            writer.close()
+            with open(path, "ab") as f:
+                f.write(b"\x00" * 5)
+
+            stamps = read_timestamps(path)
+
+        self.assertEqual(len(stamps["times"]), 3)
+
+    def test_not_a_timestamp_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bad_frames.bin")
+            with open(path, "wb") as f:
+                f.write(b"RIFF" + b"\x00" * 40)
+
+            with self.assertRaises(ValueError):
+                read_timestamps(path)
+
+    def test_frames_at_times_keeps_dropped_frame_missing(self):
+        fps = 30.0
+        # One hour at 30 fps with a single dropped frame (index 1000) early on
+        times = np.delete(np.arange(108001) / fps, 1000)
+        targets = np.arange(108000) / fps
+
+        index = frames_at_times(times, targets, tolerance=0.5 / fps)
+
+        self.assertEqual(index[999], 999)
+        self.assertEqual(index[1000], -1)
+        self.assertEqual(index[1001], 1000)
+        # Counting frames instead would be one frame late for the rest of the take
+        np.testing.assert_allclose(times[index[-1]], targets[-1])
+
+    def test_frames_at_times_skips_unknown_times(self):
+        index = frames_at_times([0.0, np.nan, 0.2], [0.0, 0.1, 0.2], tolerance=0.05)
+
+        np.testing.assert_array_equal(index, [0, -1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
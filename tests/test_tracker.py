@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from processing.tracker import PersonTracker, split_tracks
+
+
+def make_take(num_frames=40, num_joints=5):
+    """Two people walking in opposite directions; slot order flips every frame."""
+    points = np.zeros((num_frames, 2, num_joints, 3))
+    valid = np.ones((num_frames, 2, num_joints), dtype=bool)
+    offsets = np.linspace(0, 0.2, num_joints)[:, None]
+    for f in range(num_frames):
+        a = np.array([0.01 * f, 0.0, 0.0]) + offsets
+        b = np.array([2.0 - 0.01 * f, 1.0, 0.0]) + offsets
+        points[f] = [a, b] if f % 2 == 0 else [b, a]
+    return points, valid
+
+
+class TrackerTests(unittest.TestCase):
+    def test_identities_stay_stable_when_slots_swap(self):
+        points, valid = make_take()
+
+        ids = PersonTracker(min_length=5).track(points, valid)
+
+        self.assertEqual(ids[0].tolist(), [0, 1])
+        self.assertEqual(ids[1].tolist(), [1, 0])
+        self.assertEqual(ids[-1].tolist(), [1, 0])
+
+    def test_short_occlusion_keeps_id(self):
+        points, valid = make_take()
+        valid[10:15, :] = False
+
+        ids = PersonTracker(max_missing=10, min_length=5).track(points, valid)
+
+        self.assertEqual(set(ids[20].tolist()), {0, 1})
+        self.assertTrue(np.all(ids[10:15] == -1))
+
+    def test_person_leaving_and_new_person_entering(self):
+        points, valid = make_take()
+        valid[20:, 1] = False
+        valid[20:, 0] = False
+        points[30:, 0] = 5.0
+        valid[30:, 0] = True
+
+        ids = PersonTracker(max_missing=3, min_length=5).track(points, valid)
+        tracks = split_tracks(points, valid, ids)
+
+        self.assertEqual(sorted(tracks), [0, 1, 2])
+        t_points, t_valid, t_conf = tracks[2]
+        self.assertFalse(t_valid[:30].any())
+        self.assertTrue(t_valid[30:].all())
+        self.assertTrue(np.all(t_conf[:30] == 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
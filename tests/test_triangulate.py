@@ -6,7 +6,7 @@ import numpy as np
 
 sys.path.insert(0, os.path.abspath("src"))
 
-from processing.triangulate import triangulate_frame
+from processing.triangulate import match_people_across_views, triangulate_frame
 
 
 class TriangulateTests(unittest.TestCase):
@@ -21,6 +21,33 @@ class TriangulateTests(unittest.TestCase):
 
         self.assertEqual(result, [None])
 
+    def test_people_are_matched_across_views_by_epipolar_distance(self):
+        K = np.array([[800.0, 0, 320], [0, 800.0, 240], [0, 0, 1]])
+        c, s = np.cos(0.5), np.sin(0.5)
+        R = np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+        projections = [
+            K @ np.hstack((np.eye(3), [[0], [0], [5.0]])),
+            K @ np.hstack((R, [[0], [0], [5.0]])),
+        ]
+        rng = np.random.default_rng(0)
+        person_a = rng.normal(size=(25, 3)) * 0.3
+        person_b = person_a + [1.0, 0.0, 0.5]
+
+        def project(P, X):
+            h = np.hstack((X, np.ones((len(X), 1)))) @ P.T
+            return np.column_stack((h[:, :2] / h[:, 2:], np.ones(len(X)))).tolist()
+
+        people = [
+            [project(projections[0], person_a), project(projections[0], person_b)],
+            [project(projections[1], person_b), project(projections[1], person_a)],
+        ]
+
+        groups = match_people_across_views(projections, people)
+
+        self.assertEqual(len(groups), 2)
+        first = triangulate_frame(projections, groups[0])
+        np.testing.assert_allclose(first[0], person_a[0], atol=1e-6)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import scipy.io.wavfile as wavfile
+
+sys.path.insert(0, os.path.abspath("src"))
+
+from capture.wav import AudioFileWriter, AudioRing, WavStreamWriter
+
+
+def blocks(count, size=512, channels=1):
+    samples = np.arange(count * size * channels, dtype=np.int64) % 30000
+    return list(samples.astype(np.int16).reshape(count, size, channels))
+
+
+class AudioRingTests(unittest.TestCase):
+    def test_wraps_around_in_order(self):
+        ring = AudioRing(1000)
+        data = blocks(5, size=300)
+        out = []
+        for block in data:
+            ring.write(block)
+            views = ring.peek()
+            out.extend(np.concatenate(views))
+            ring.advance(sum(len(view) for view in views))
+
+        np.testing.assert_array_equal(np.array(out), np.concatenate(data))
+        self.assertEqual(ring.dropped, 0)
+
+    def test_full_ring_drops_newest_samples(self):
+        ring = AudioRing(1000)
+        data = blocks(4, size=300)
+        written = [ring.write(block) for block in data]
+
+        self.assertEqual(written, [300, 300, 300, 100])
+        self.assertEqual(ring.dropped, 200)
+        np.testing.assert_array_equal(np.concatenate(ring.peek()), np.concatenate(data)[:1000])
+
+
+class WavStreamTests(unittest.TestCase):
+    def test_streamed_file_matches_samples(self):
+        data = blocks(200, channels=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_audio.wav")
+            ring = AudioRing(4096, channels=2)
+            head = blocks(3, channels=2)
+            writer = AudioFileWriter(ring, path, 44100, channels=2, head=head, poll=0.001).start()
+            for block in data:
+                # Like the audio callback, but faster than real time: wait for room instead of dropping
+                while ring.capacity - ring.available < len(block):
+                    time.sleep(0.001)
+                ring.write(block)
+            writer.stop()
+
+            samplerate, stored = wavfile.read(path)
+
+        self.assertIsNone(writer.error)
+        self.assertEqual(ring.dropped, 0)
+        self.assertEqual(samplerate, 44100)
+        np.testing.assert_array_equal(stored, np.concatenate(head + data))
+        self.assertEqual(writer.frames, len(stored))
+
+    def test_header_update_keeps_partial_file_readable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_audio.wav")
+            wav = WavStreamWriter(path, 48000)
+            wav.write(blocks(1)[0])
+            wav.update_header()
+            # Read while still open, as after a crash
+            _, partial = wavfile.read(path)
+            wav.write(blocks(1)[0])
+            wav.close()
+            _, full = wavfile.read(path)
+
+        self.assertEqual(len(partial), 512)
+        self.assertEqual(len(full), 1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
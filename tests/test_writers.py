@@ -0,0 +1,123 @@
+import contextlib
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath("src"))
+
+sys.modules.setdefault("cv2", types.SimpleNamespace())
+
+from capture.stream import Frame
+from capture.writers import FFmpegEncodeWriter, MJPEGPassthroughWriter, OpenCVWriter, create_writer
+
+# Stand-in ffmpeg: stores its arguments and copies stdin to the output path (last argument)
+FAKE_FFMPEG = f"""#!{sys.executable}
+import json, sys
+with open(sys.argv[-1] + ".args.json", "w") as f:
+    json.dump(sys.argv[1:], f)
+with open(sys.argv[-1], "wb") as f:
+    f.write(sys.stdin.buffer.read())
+"""
+
+
+# Stand-in ffmpeg that logs far more than a pipe buffer to stderr, then fails
+NOISY_FFMPEG = f"""#!{sys.executable}
+import sys
+while sys.stdin.buffer.read(4096):
+    sys.stderr.write("x" * 65536)
+sys.stderr.write("last error line")
+sys.exit(1)
+"""
+
+
+def fake_ffmpeg(directory, script=FAKE_FFMPEG):
+    path = os.path.join(directory, "ffmpeg")
+    with open(path, "w") as f:
+        f.write(script)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+class WriterTests(unittest.TestCase):
+    def test_mjpeg_passthrough_stores_camera_bytes_unchanged(self):
+        jpegs = [b"\xff\xd8frame-%d\xff\xd9" % i for i in range(5)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_cam0.mp4")
+            writer = create_writer("mjpeg", path, fps=30, ffmpeg=fake_ffmpeg(tmp))
+            for i, data in enumerate(jpegs):
+                writer.write(Frame(i, 0.0, None, data))
+            writer.close()
+
+            with open(path, "rb") as f:
+                stored = f.read()
+            with open(path + ".args.json") as f:
+                args = json.load(f)
+            on_disk = writer.stats()["file_megabytes"]
+
+        self.assertIsInstance(writer, MJPEGPassthroughWriter)
+        self.assertEqual(stored, b"".join(jpegs))
+        self.assertIn("copy", args)
+        self.assertEqual(args[args.index("-f") + 1], "mjpeg")
+        stats = writer.stats()
+        self.assertEqual(stats["frames"], 5)
+        self.assertEqual(stats["reencoded"], 0)
+        self.assertAlmostEqual(stats["megabytes"], len(b"".join(jpegs)) / 1e6)
+        self.assertAlmostEqual(on_disk, stats["megabytes"])
+        self.assertGreaterEqual(stats["latency_ms"], 0.0)
+        self.assertGreater(stats["input_mb_per_second"], 0.0)
+
+    def test_ffmpeg_pipe_receives_raw_frames(self):
+        image = np.arange(4 * 6 * 3, dtype=np.uint8).reshape(4, 6, 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_cam1.mp4")
+            writer = create_writer("ffmpeg", path, fps=25, ffmpeg=fake_ffmpeg(tmp), preset="veryfast")
+            writer.write(Frame(0, 0.0, image))
+            writer.write(Frame(1, 0.0, image[::-1]))
+            writer.close()
+
+            with open(path, "rb") as f:
+                stored = f.read()
+            with open(path + ".args.json") as f:
+                args = json.load(f)
+
+        self.assertIsInstance(writer, FFmpegEncodeWriter)
+        self.assertEqual(stored, image.tobytes() + np.ascontiguousarray(image[::-1]).tobytes())
+        self.assertEqual(args[args.index("-s") + 1], "6x4")
+        self.assertEqual(args[args.index("-framerate") + 1], "25")
+        self.assertEqual(args[args.index("-preset") + 1], "veryfast")
+        self.assertEqual(writer.stats()["megabytes"], 2 * image.nbytes / 1e6)
+
+    def test_ffmpeg_error_output_does_not_block_writes(self):
+        image = np.zeros((64, 64, 3), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S_1_cam1.mp4")
+            writer = create_writer("ffmpeg", path, fps=25, ffmpeg=fake_ffmpeg(tmp, NOISY_FFMPEG))
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                for i in range(20):
+                    writer.write(Frame(i, 0.0, image))
+                writer.close()
+
+        self.assertEqual(writer.frames, 20)
+        self.assertIn("ffmpeg failed", output.getvalue())
+        self.assertTrue(output.getvalue().rstrip().endswith("last error line"))
+
+    def test_missing_ffmpeg_falls_back_to_opencv(self):
+        writer = create_writer("mjpeg", "S_1_cam0.mp4", ffmpeg="definitely-not-ffmpeg")
+
+        self.assertIsInstance(writer, OpenCVWriter)
+
+    def test_unknown_writer(self):
+        with self.assertRaises(ValueError):
+            create_writer("gif", "S_1_cam0.mp4")
+
+
+if __name__ == "__main__":
+    unittest.main()